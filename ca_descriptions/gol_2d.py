@@ -44,9 +44,31 @@ def setup(args):
 
     # ---- Override the defaults below (these may be changed at anytime) ----
 
+    # no random numbers are used, so the GUI caches runs without a seed
+    config.deterministic = True
     # config.state_colors = [(0,0,0),(1,1,1)]
     # config.num_generations = 150
     # config.grid_dims = (200,200)
+    # use a lookup table for the rule instead of transition_func
+    # config.rule_string = "B3/S23"
+    # which is packed 64 cells to a word unless config.backend = "array"
+    # record the timeline straight to disk for runs too large for memory
+    # config.stream_timeline = True
+    # or store a keyframe every 50 generations and only the changes between
+    # config.timeline_keyframes = 50
+    # record every 10th generation (the final one is always recorded)
+    # config.record_stride = 10
+    # or only the given generations, or only the final generation
+    # config.record_generations = [0, 50, 100]
+    # config.record_final_only = True
+    # for large grids record only (row, col, rows, cols) windows of the grid
+    # config.record_regions = [(0, 0, 50, 50), (100, 100, 50, 50)]
+    # and the whole grid sampled every 4th row and column
+    # config.record_downsample = 4
+    # checkpoint long runs every 1000 generations or 10 minutes, so a
+    # stopped run can be resumed with utils.run_ca(config, resume=True)
+    # config.checkpoint_generations = 1000
+    # config.checkpoint_seconds = 600
 
     # ----------------------------------------------------------------------
 
@@ -70,7 +92,7 @@ def main():
     # save updated config to file
     config.save()
     # save timeline to file
-    utils.save(timeline, config.timeline_path)
+    timeline.save(config.timeline_path)
 
 
 if __name__ == "__main__":
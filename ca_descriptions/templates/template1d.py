@@ -62,7 +62,7 @@ def main():
     # run the grid and save each timestep to timeline
     timeline = grid.run()
     # save timeline and config
-    utils.save(timeline, config.timeline_path)
+    timeline.save(config.timeline_path)
     config.save()
 
 if __name__ == "__main__":
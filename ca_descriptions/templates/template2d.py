@@ -63,7 +63,7 @@ def main():
     # Save updated config to file
     config.save()
     # Save timeline to file
-    utils.save(timeline, config.timeline_path)
+    timeline.save(config.timeline_path)
 
 if __name__ == "__main__":
     main()
@@ -12,8 +12,7 @@ sys.path.append(main_dir_loc + 'capyle/ca')
 sys.path.append(main_dir_loc + 'capyle/guicomponents')
 # -------------------------------------------
 
-import numpy as np
-from capyle.ca import Grid1D
+from capyle.ca import Grid1D, WolframRule
 import capyle.utils as utils
 
 
@@ -28,6 +27,11 @@ def setup(args):
 
     # ---- Override the defaults below (these may be changed at anytime) ----
     config.wrap = True
+    # no random numbers are used, so the GUI caches runs without a seed
+    config.deterministic = True
+    # rule numbers of larger radius neighbourhoods or more states may be
+    # used, eg. config.states = (0, 1, 2) and config.totalistic = True
+    # config.totalistic = False
     # config.state_colors = [(0,0,0),(1,1,1)]
     # config.num_generations = 100
     # config.grid_dims = (200,200)
@@ -40,45 +44,21 @@ def setup(args):
     return config
 
 
-def transition_function(grid, neighbourstates, neighbourcounts, rulebool):
-    left, center, right = neighbourstates
-    left = left == 1
-    center = center == 1
-    right = right == 1
-    not_left, not_center, not_right = (np.invert(left),
-                                       np.invert(center),
-                                       np.invert(right))
-    rule_application = np.array([
-        rulebool[0] & left     & center     & right,
-        rulebool[1] & left     & center     & not_right,
-        rulebool[2] & left     & not_center & right,
-        rulebool[3] & left     & not_center & not_right,
-        rulebool[4] & not_left & center     & right,
-        rulebool[5] & not_left & center     & not_right,
-        rulebool[6] & not_left & not_center & right,
-        rulebool[7] & not_left & not_center & not_right,
-        ])
-
-    newrow = rule_application[0]
-    for i in range(rule_application.shape[0] - 1):
-        newrow += rule_application[i+1]
-    return newrow
-
-
 def main():
     config = setup(sys.argv[1:])
 
-    # Translate rule numer to boolean array:
-    # 30 -> [0,0,0,1,1,1,1,0] -> [F,F,F,T,T,T,T,F]
-    rulebool = utils.int_to_binary(config.rule_num) * True
+    # Translate the rule number to a lookup table of next states:
+    # 30 -> [0,1,1,1,1,0,0,0], the next state of each neighbourhood
+    # 000, 001, 010 ... 111
+    radius = len(config.nhood_arr) // 2
+    rule = WolframRule(config.rule_num, len(config.states), radius,
+                       config.totalistic)
 
-    # Create grid object
-    # passing transition function and rulebool as tuple to
-    # keep track of rulebool
-    grid = Grid1D(config, (transition_function, rulebool))
+    # Create grid object, stepped with the rule's lookup table
+    grid = Grid1D(config, rule)
 
     timeline = grid.run()
-    utils.save(timeline, config.timeline_path)
+    timeline.save(config.timeline_path)
     config.save()
 
 if __name__ == "__main__":
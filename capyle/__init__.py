@@ -1,3 +1,17 @@
 import utils
-from playbackcontrols import _PlaybackControls
-from display import Display
+from runcache import RunCache, PrerunCache
+from runner import InProcessRun, BackgroundRun, load_description
+from worker import DescriptionWorker
+
+
+def __getattr__(name):
+    """Import the GUI, which needs tkinter and matplotlib, on first use so
+    the engine can be imported without it"""
+    if name == 'Display':
+        from display import Display
+        return Display
+    if name == '_PlaybackControls':
+        from playbackcontrols import _PlaybackControls
+        return _PlaybackControls
+    raise AttributeError(("module {!r} has no "
+                          + "attribute {!r}").format(__name__, name))
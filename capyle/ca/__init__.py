@@ -1,5 +1,11 @@
-from neighbourhood import Neighbourhood
+from neighbourhood import Neighbourhood, radius_nhood
 from caconfig import CAConfig
-from grid import Grid
+from rules import LifeLikeRule, WolframRule, parse_rule, num_rules
+from bitboard import BitBoard
+from timeline import (Timeline, DiagramTimeline, DeltaTimeline,
+                      PackedTimeline, RegionTimeline, LiveTimeline,
+                      load_timeline)
+from progress import RunProgress
+from grid import Grid, set_in_process_run
 from grid1d import Grid1D, randomise1d
 from grid2d import Grid2D, randomise2d
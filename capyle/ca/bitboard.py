@@ -0,0 +1,191 @@
+import numpy as np
+
+
+class BitBoard(object):
+    """A two state grid packed 64 cells to a machine word, stepped with a
+    Life-like rule using bitwise logic on whole words
+
+    Note:
+        Each row of the grid is stored as a row of uint64 words, cell c of
+        the row being bit c + 1 (least significant first). Bit 0 and bit
+        cols + 1 are ghost cells holding the wrapped (or dead) cells either
+        side of the row, and a ghost row above and below the grid hold the
+        wrapped rows, in the same way as the wrapping grid of Grid2D.
+
+        The neighbours of a cell are the bits of the words shifted one bit
+        left or right and one row up or down, which are added with bit
+        sliced adders into planes holding each bit of the neighbour count.
+        The rule is then a boolean formula of the count planes.
+    """
+    WORD_BITS = 64
+
+    def __init__(self, shape, neighbourhood, birth, survival, wrap=True):
+        """Allocate the packed grid
+
+        Args:
+            shape ((int, int)): the rows and columns of the grid
+            neighbourhood (numpy.ndarray): 3x3 array of which neighbours
+                are counted, the centre is ignored
+            birth (set): the neighbour counts a dead cell is born with
+            survival (set): the neighbour counts an alive cell survives with
+            wrap (bool or int): True to wrap the grid, otherwise the state
+                (0 or 1) of the cells surrounding the grid
+        """
+        rows, cols = shape
+        self.shape = shape
+        self.wrap = wrap
+        num_words = -(-(cols + 2) // self.WORD_BITS)
+        self.words = np.zeros((rows + 2, num_words), dtype=np.uint64)
+        # (row, col) offset of each counted neighbour
+        nhood = np.asarray(neighbourhood) != 0
+        self.offsets = [(int(r) - 1, int(c) - 1)
+                        for r, c in zip(*np.nonzero(nhood))
+                        if (r, c) != (1, 1)]
+        num_neighbours = len(self.offsets)
+        self.birth = sorted(b for b in birth if b <= num_neighbours)
+        self.survival = sorted(s for s in survival if s <= num_neighbours)
+        self.num_planes = max(1, num_neighbours.bit_length())
+        # the bits of each row that are cells of the grid
+        self.mask = self._pack(np.ones((1, cols), dtype=bool))[0]
+
+    def _pack(self, cells):
+        """Pack a (rows, cols) boolean array into rows of words, leaving
+        the ghost bits clear"""
+        rows, cols = cells.shape
+        bits = np.zeros((rows, self.words.shape[1] * self.WORD_BITS),
+                        dtype=bool)
+        bits[:, 1:cols + 1] = cells
+        packed = np.packbits(bits, axis=1, bitorder='little')
+        return packed.view('<u8').astype(np.uint64, copy=False)
+
+    def pack(self, grid):
+        """Set the packed grid from an array of 0s and 1s"""
+        self.words[1:-1] = self._pack(grid != 0)
+        self.refresh_wrap()
+
+    def unpack(self, out):
+        """Write the cells of the packed grid into an array as 0s and 1s"""
+        rows, cols = self.shape
+        packed = self.words[1:-1].astype('<u8', copy=False).view(np.uint8)
+        bits = np.unpackbits(packed, axis=1, count=cols + 1,
+                             bitorder='little')
+        out[:, :] = bits[:, 1:]
+        return out
+
+    def packed_cells(self):
+        """The cells of the packed grid, one bit per cell in row major
+        order (least significant first), as pack_states packs them
+
+        Note:
+            When the rows are a whole number of bytes long the bytes are
+            taken from the words, shifted past the ghost bit, without
+            unpacking the cells
+        """
+        rows, cols = self.shape
+        if cols % 8 == 0:
+            words = self._shifted(1)[1:-1]
+            packed = words.astype('<u8', copy=False).view(np.uint8)
+            return packed[:, :cols // 8].ravel()
+        packed = self.words[1:-1].astype('<u8', copy=False).view(np.uint8)
+        bits = np.unpackbits(packed, axis=1, count=cols + 1,
+                             bitorder='little')
+        return np.packbits(bits[:, 1:], bitorder='little')
+
+    def _get_bits(self, words, bit):
+        """The given bit of each row, as 0 or 1 words"""
+        word, shift = divmod(bit, self.WORD_BITS)
+        return (words[:, word] >> np.uint64(shift)) & np.uint64(1)
+
+    def _set_bits(self, words, bit, values):
+        """Set the given bit of each row to 0 or 1 words"""
+        word, shift = divmod(bit, self.WORD_BITS)
+        shift = np.uint64(shift)
+        cleared = words[:, word] & ~(np.uint64(1) << shift)
+        words[:, word] = cleared | (values << shift)
+
+    def refresh_wrap(self):
+        """Update the ghost cells around the grid"""
+        cols = self.shape[1]
+        rows = self.words[1:-1]
+        if self.wrap is True:
+            left = self._get_bits(rows, cols)
+            right = self._get_bits(rows, 1)
+            self._set_bits(rows, 0, left)
+            self._set_bits(rows, cols + 1, right)
+            self.words[0] = self.words[-2]
+            self.words[-1] = self.words[1]
+        else:
+            dead = np.uint64(1 if self.wrap == 1 else 0)
+            self._set_bits(rows, 0, dead)
+            self._set_bits(rows, cols + 1, dead)
+            edge = self.mask | self._ghost_bits() if dead else 0
+            self.words[0] = edge
+            self.words[-1] = edge
+
+    def _ghost_bits(self):
+        """A row with only the two ghost bits set"""
+        ghosts = np.zeros((1, self.words.shape[1]), dtype=np.uint64)
+        self._set_bits(ghosts, 0, np.uint64(1))
+        self._set_bits(ghosts, self.shape[1] + 1, np.uint64(1))
+        return ghosts[0]
+
+    def _shifted(self, dc):
+        """The words shifted so each bit holds the cell dc columns along"""
+        words = self.words
+        if dc == 0:
+            return words
+        one, top = np.uint64(1), np.uint64(self.WORD_BITS - 1)
+        if dc < 0:
+            # bit p takes bit p - 1, carrying the top bit of the word before
+            shifted = words << one
+            shifted[:, 1:] |= words[:, :-1] >> top
+        else:
+            # bit p takes bit p + 1, carrying the low bit of the word after
+            shifted = words >> one
+            shifted[:, :-1] |= words[:, 1:] << top
+        return shifted
+
+    def count_planes(self):
+        """Add up the neighbours of every cell
+
+        Returns:
+            list: the bit planes of the neighbour counts, least significant
+                first, bit i of each count being the matching bit of the
+                i-th plane
+        """
+        rows = self.shape[0]
+        shifted = {dc: self._shifted(dc) for dc in set(
+            dc for _, dc in self.offsets)}
+        planes = [np.zeros((rows, self.words.shape[1]), dtype=np.uint64)
+                  for _ in range(self.num_planes)]
+        carry = np.empty_like(planes[0])
+        for dr, dc in self.offsets:
+            np.copyto(carry, shifted[dc][1 + dr:rows + 1 + dr])
+            # ripple the neighbour through a bit sliced counter
+            for plane in planes:
+                np.bitwise_xor(plane, carry, out=plane)
+                # a bit is carried where the plane was set and now is not
+                np.bitwise_and(carry, ~plane, out=carry)
+        return planes
+
+    def _count_equals(self, planes, n):
+        """Words with the bits set of the cells with n neighbours"""
+        result = None
+        for i, plane in enumerate(planes):
+            bit = plane if (n >> i) & 1 else ~plane
+            result = bit.copy() if result is None else result & bit
+        return result
+
+    def step(self):
+        """Apply the rule to every cell, 64 cells per operation"""
+        planes = self.count_planes()
+        alive = self.words[1:-1]
+        born = np.zeros_like(alive)
+        for n in self.birth:
+            born |= self._count_equals(planes, n)
+        survive = np.zeros_like(alive)
+        for n in self.survival:
+            survive |= self._count_equals(planes, n)
+        nextgen = (born & ~alive) | (survive & alive)
+        np.bitwise_and(nextgen, self.mask, out=self.words[1:-1])
+        self.refresh_wrap()
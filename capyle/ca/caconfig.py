@@ -20,6 +20,57 @@ class CAConfig(object):
         self.initial_grid = None
         # default wrapping behaviour is True
         self.wrap = True
+        # pass neighbour states as read-only views rather than copies
+        self.neighbour_views = False
+        # Life-like or Generations rule string eg. "B3/S23", replacing
+        # the transition function with a lookup table
+        self.rule_string = None
+        # compile the transition function into a lookup table
+        self.compile_transition = False
+        # whether 1D rule numbers are totalistic Wolfram codes
+        self.totalistic = False
+        # 'bitboard' to pack two state Life-like grids 64 cells to a word,
+        # 'array' to never do so, or None to pack them when supported
+        self.backend = None
+        # record the timeline straight into a file mapped into memory,
+        # rather than keeping it in memory until the run ends
+        self.stream_timeline = False
+        # stream the timeline so the GUI can show the frames recorded so
+        # far while the run goes on, set by the GUI rather than descriptions
+        self.live_timeline = False
+        # the RunProgress file the run reports its progress to and checks
+        # for being cancelled, set by utils.run_ca rather than descriptions
+        self.progress_path = None
+        # store a full keyframe every this many frames of the timeline and
+        # only the changed cells in between, None stores every frame
+        self.timeline_keyframes = None
+        # record every this many generations of the run, the final
+        # generation is always recorded
+        self.record_stride = 1
+        # the generations to record, overriding the stride
+        self.record_generations = None
+        # only record the final generation of the run
+        self.record_final_only = False
+        # only record these (row, col, rows, cols) windows of the grid
+        self.record_regions = None
+        # also record the whole grid sampled every this many rows and cols
+        self.record_downsample = None
+        # save a checkpoint of the run every this many generations and/or
+        # seconds, None for neither
+        self.checkpoint_generations = None
+        self.checkpoint_seconds = None
+        # continue the run from its last checkpoint, if there is one
+        self.resume = False
+        # carry on from the end of the last run when only the number of
+        # generations has increased, rather than running from the start
+        self.extend_runs = True
+        # seed the random number generators at the start of the run, so
+        # transition functions using them give the same run each time (and
+        # only seeded runs are cached by the GUI)
+        self.seed = None
+        # descriptions using no random numbers give the same run for the
+        # same config every time, so are cached by the GUI without a seed
+        self.deterministic = False
         self.default_paths()
 
     def fill_in_defaults(self):
@@ -53,7 +104,9 @@ class CAConfig(object):
 
     def default_paths(self):
         self.path = self.ROOT_PATH + '/temp/config.pkl'
-        self.timeline_path = self.ROOT_PATH + '/temp/timeline.pkl'
+        self.timeline_path = self.ROOT_PATH + '/temp/timeline.tl'
+        self.checkpoint_path = self.ROOT_PATH + '/temp/checkpoint.pkl'
+        self.last_run_path = self.ROOT_PATH + '/temp/last_run.pkl'
 
     def neighbourhood(self):
         if self.nhood_arr is None:
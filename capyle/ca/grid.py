@@ -1,11 +1,38 @@
+import os
+import time
+import pickle
+import random
+import hashlib
+import inspect
+import threading
 import numpy as np
-from capyle.ca import Neighbourhood
-from capyle.utils import scale_array, verify_gens
-import tkinter as tk
+from capyle.ca import (Neighbourhood, Timeline, DeltaTimeline, RegionTimeline,
+                       RunProgress, load_timeline)
+from capyle.utils import scale_array, verify_gens, save, load
+
+# the run that Grid.run reports to in each thread, when a description is
+# run in the GUI's process rather than a subprocess of its own
+_in_process = threading.local()
+
+
+def set_in_process_run(run):
+    """Make Grid.run in this thread report to the given run rather than to
+    the progress file named by the config, or stop doing so if run is None
+
+    Args:
+        run: an object with the report(generation, total, rate) and
+            cancelled() methods of a RunProgress, and a
+            finished(ca_config, timeline) method taking the result
+    """
+    _in_process.run = run
 
 
 class Grid(object):
     """Superclass to the Grid1D and Grid2D classes"""
+    # the least number of seconds between reports of the progress of a run
+    PROGRESS_INTERVAL = 0.25
+    # the frames and bytes written to the checkpoint's frames file so far
+    _checkpointed = None
 
     def __init__(self):
         pass
@@ -35,6 +62,133 @@ class Grid(object):
             self.grid[0, :] = g[0]
         self.refresh_wrap()
 
+    def set_transition_func(self, transition_func):
+        """Store the transition function, along with any additional
+        arguments the user wishes to keep track of for use in it
+
+        Note:
+            A transition function with an argument named 'out' is passed a
+            preallocated array to write the next state into, rather than
+            returning a new array. Every cell of out must be written.
+
+            The grid, the neighbour states and out are of the grid's type,
+            the smallest that holds every state (eg. uint8 for states
+            (0, 1)), and the neighbour counts are uint8, so arithmetic on
+            them wraps around or truncates as it does for that type. Cast
+            them first (eg. grid.astype(int)) to do arithmetic that can go
+            out of the range of the states. The array returned must only
+            hold values the grid's type holds, or a ValueError is raised.
+
+        Args:
+            transition_func (function or tuple): the transition function,
+                or a tuple of the function followed by additional arguments
+        """
+        self.additional_args = None
+        if type(transition_func) == tuple and len(transition_func) > 1:
+            self.transition_func = transition_func[0]
+            self.additional_args = transition_func[1:]
+        else:
+            self.transition_func = transition_func
+        try:
+            params = inspect.signature(self.transition_func).parameters
+        except (TypeError, ValueError):
+            # builtins and other callables without a signature
+            params = {}
+        self.transition_takes_out = 'out' in params
+
+    def store_next_states(self, out, new):
+        """Copy the next states returned by the transition function into
+        the grid, checking they fit its type rather than casting them
+
+        Args:
+            out (numpy.ndarray): the part of the grid to copy into
+            new (numpy.ndarray): the next states
+
+        Raises:
+            ValueError: if any of the states can not be held by the grid
+                (eg. 0.5 or 256 in a uint8 grid)
+        """
+        new = np.asarray(new)
+        if not np.can_cast(new.dtype, out.dtype):
+            stored = new.astype(out.dtype)
+            if not np.array_equal(stored, new):
+                bad = new[stored != new].flat[0]
+                raise ValueError(
+                    ('Transition function returned {v}, which the grid of '
+                     'type {t} for the states {s} can not hold').format(
+                         v=bad, t=out.dtype, s=self.ca_config.states))
+            new = stored
+        out[...] = new
+
+    def apply_transition(self, grid, neighbourstates, neighbourcounts,
+                         out=None):
+        """Call the transition function with any additional arguments
+
+        Args:
+            grid (numpy.ndarray): the current grid
+            neighbourstates (numpy.ndarray): the neighbour states
+            neighbourcounts (numpy.ndarray): the neighbour counts by state
+            out (numpy.ndarray): the array to write the next state into,
+                only passed if the transition function takes out
+
+        Returns:
+            numpy.ndarray: the value returned by the transition function
+        """
+        args = () if self.additional_args is None else self.additional_args
+        if out is not None:
+            return self.transition_func(grid, neighbourstates,
+                                        neighbourcounts, *args, out=out)
+        return self.transition_func(grid, neighbourstates, neighbourcounts,
+                                    *args)
+
+    def set_state_encoding(self, states):
+        """Prepare the lookup used to translate state values into dense
+        state indices (0 to k-1) for counting
+
+        Args:
+            states (tuple): the states of the CA in the order given
+                in the CAConfig
+        """
+        states = np.array(states)
+        self.num_states = len(states)
+        # the smallest unsigned integer type that can hold every index
+        # plus the extra 'no state' index used for wrap borders
+        self.index_dtype = np.min_scalar_type(self.num_states)
+        # state values sorted for searching and the original position
+        # of each of them in the states tuple
+        self._state_order = np.argsort(states, kind='stable')
+        self._sorted_states = states[self._state_order]
+        # if the states are simply 0..k-1 the values are their own indices
+        self._states_are_indices = np.array_equal(
+            states, np.arange(self.num_states))
+
+    def encode_states(self, values):
+        """Translate an array of state values into an array of indices
+        into the states tuple
+
+        Note:
+            Values that are not one of the states (eg. a dead wrap border)
+            are given the index len(states), so they are never counted
+
+        Args:
+            values (numpy.ndarray): array of state values
+
+        Returns:
+            numpy.ndarray: array of state indices with the same shape
+        """
+        values = np.asarray(values)
+        k = self.num_states
+        if (self._states_are_indices and values.dtype.kind in 'ui' and
+                values.dtype.itemsize <= np.dtype(self.index_dtype).itemsize):
+            # already a compact index encoding, any value outside of
+            # 0..k-1 simply never matches an index when counting
+            return values
+        pos = np.searchsorted(self._sorted_states, values)
+        np.clip(pos, 0, k - 1, out=pos)
+        indices = self._state_order[pos].astype(self.index_dtype)
+        indices[self._sorted_states[pos] != values] = k
+        return indices
+
     def set_neighbourhood(self, ca_config):
         """Sets self.neighbourhood with a Neighbourhood object
         from ca_config
@@ -52,88 +206,539 @@ class Grid(object):
         saving each timestep to an array 'timeline'
 
         Note:
-            The actual running of the CA is done by the self.runca
-            which is passed to the progress bar so that it can be
-            updated
+            The actual running of the CA is done by self._runca, which
+            reports its progress to the run in this process, if any, or
+            else to the progress file named by the config, if any. If the
+            run is cancelled through either, it stops early and the
+            timeline holds the frames recorded until then.
+
+        Note:
+            If the config resumes the run, the run continues from the last
+            checkpoint saved, if there is one for the same run. Otherwise
+            if the last run was the same apart from running fewer
+            generations, the run carries on from where it finished
 
         Returns:
-            numpy.ndarray: contains the grid state for each timestep
+            Timeline: contains the grid state for each timestep
         """
         num_generations = verify_gens(self.ca_config.num_generations)
-        timeline = np.empty(num_generations + 1, dtype=np.ndarray)
-        # Progress window
-        # pass in the run function and timeline to the progress bar
-        # progress bar executes these
-        gui = _ProgressWindow(num_generations, self._runca, timeline)
+        generations = self.recorded_generations(num_generations)
+        if self.ca_config.seed is not None:
+            np.random.seed(self.ca_config.seed)
+            random.seed(self.ca_config.seed)
+        fingerprint = self.run_fingerprint()
+        resumed = None
+        if self.ca_config.resume:
+            resumed = self.load_checkpoint(num_generations, generations)
+        if resumed is None and self.ca_config.extend_runs:
+            resumed = self.load_last_run(num_generations, generations,
+                                         fingerprint)
+        if resumed is None:
+            timeline, first = self.new_timeline(generations), 0
+        else:
+            timeline, first = resumed
+        in_process = getattr(_in_process, 'run', None)
+        progress = in_process
+        if progress is None:
+            progress = RunProgress.open(self.ca_config.progress_path)
+        generation = self._runca(num_generations, progress, timeline, first,
+                                 generations)
+        self.report_progress(progress, generation, num_generations,
+                             force=True)
+        if generation < num_generations:
+            print("[WARNING] Run cancelled at generation {g} of {n}".format(
+                g=generation, n=num_generations))
+            # kept so the run can be resumed from where it was cancelled
+            if self.checkpointing():
+                self.checkpoint(generation, num_generations, timeline,
+                                cancelled=True)
+            timeline.truncate(sum(1 for g in generations if g <= generation))
+        else:
+            # the run is over so there is nothing to resume
+            self.clear_checkpoint()
+        self._checkpointed = None
+        if self.ca_config.extend_runs:
+            self.save_last_run(num_generations, fingerprint, generation)
+        if in_process is not None:
+            # handed over before the description saves the timeline
+            in_process.finished(self.ca_config, timeline)
         return timeline
 
-    def _runca(self, num_generations, progressbar, timeline):
+    def recorded_generations(self, num_generations):
+        """The generations of the run saved to the timeline
+
+        Note:
+            By default every generation is recorded. The config can instead
+            record only the final generation, the generations it lists, or
+            every record_stride generations, the final generation always
+            being recorded
+
+        Args:
+            num_generations (int): the number of generations to be run
+
+        Returns:
+            list: the generation numbers recorded, in order
+        """
+        config = self.ca_config
+        if config.record_final_only:
+            return [num_generations]
+        if config.record_generations is not None:
+            requested = set(int(g) for g in config.record_generations)
+            generations = sorted(g for g in requested
+                                 if 0 <= g <= num_generations)
+            if len(generations) < len(requested):
+                print(("[WARNING] Only generations 0 to {n} can be " +
+                       "recorded, ignoring the others").format(
+                           n=num_generations))
+            if not generations:
+                generations = [num_generations]
+            return generations
+        stride = int(config.record_stride)
+        if stride < 1:
+            print(("[WARNING] Invalid record stride {s}, recording " +
+                   "every generation").format(s=stride))
+            stride = 1
+        generations = list(range(0, num_generations + 1, stride))
+        if generations[-1] != num_generations:
+            generations.append(num_generations)
+        return generations
+
+    def set_recorded(self, num_generations, recorded=None):
+        """Keep the generations recorded by the run about to be started,
+        for its checkpoints, finding them if not given"""
+        if recorded is None:
+            recorded = self.recorded_generations(num_generations)
+        self._recorded = list(recorded)
+        return self._recorded
+
+    def new_timeline(self, generations):
+        """Create the timeline the run saves each timestep to
+
+        Args:
+            generations (list): the generations to be recorded, as given by
+                recorded_generations
+
+        Note:
+            If the config sets regions of interest or a downsample factor,
+            only those windows and the coarse frame of the grid are kept.
+            Otherwise if it sets a keyframe interval, the timeline stores
+            keyframes and the changes between them, or if the config
+            streams the timeline (or the GUI follows it live, or the run
+            is checkpointed), the timeline is a file mapped into memory,
+            written to as the CA is run
+
+        Returns:
+            Timeline: an empty timeline with a frame for each recorded
+                generation
+        """
+        config = self.ca_config
+        generations = list(generations)
+        num_frames = len(generations)
+        # every generation from 0 needs no numbering of its own
+        if generations == list(range(num_frames)):
+            generations = None
+        if config.record_regions or config.record_downsample is not None:
+            return RegionTimeline.empty(
+                num_frames, self.grid.shape, self.grid.dtype,
+                config.record_regions or [], config.record_downsample,
+                config.states, generations)
+        if config.timeline_keyframes is not None:
+            return DeltaTimeline(self.grid.shape, self.grid.dtype,
+                                 config.states, config.timeline_keyframes,
+                                 generations=generations)
+        if (config.stream_timeline or config.live_timeline or
+                self.checkpointing()):
+            return Timeline.create(config.timeline_path, num_frames,
+                                   self.grid.shape, self.grid.dtype,
+                                   config.states, generations)
+        return self.empty_timeline(num_frames, generations)
+
+    def empty_timeline(self, num_frames, generations):
+        """Allocate the timeline of a run recorded to memory
+
+        Args:
+            num_frames (int): the number of frames to allocate
+            generations (list): the generation of each frame, or None if
+                every generation from 0 is recorded
+
+        Returns:
+            Timeline: the empty timeline
+        """
+        return Timeline.empty(num_frames, self.grid.shape, self.grid.dtype,
+                              self.ca_config.states, generations)
+
+    def _runca(self, num_generations, progress, timeline, first=0,
+               recorded=None):
         """Running the CA for given generations,
-        saving each timestep to an array 'timeline'
+        saving the recorded timesteps to an array 'timeline'
 
         Note:
-            This function is passed to the progress bar for it to execute
+            Generations that are not recorded are never copied out of
+            the grid
+
+        Args:
+            progress (RunProgress): where to report the progress, and
+                check for the run being cancelled, or None
+            first (int): the generation the grid is at, when resuming a
+                run whose earlier frames are already recorded
+            recorded (list): the generations recorded, as given by
+                recorded_generations, found again if not given
+
+        Returns:
+            int: the generation reached, before num_generations if the run
+                was cancelled
         """
-        # save initial state
-        timeline[0] = np.copy(self.grid)
-        for i in range(num_generations):
-            # calculate the next timestep and save it
+        recorded = self.set_recorded(num_generations, recorded)
+        # the frames already recorded
+        frame = sum(1 for g in recorded if g <= first)
+        if first == 0 and frame == 1:
+            # save initial state
+            self.record_frame(timeline, 0)
+        if first == 0 or self._checkpointed is None:
+            self._checkpointed = (0, 0)
+        self._last_checkpoint = time.time()
+        self.start_progress(first)
+        for i in range(first, num_generations):
+            # calculate the next timestep and save it if recorded
             self.step()
-            timeline[i+1] = np.copy(self.grid)
-            # update the progress bar every 10 generations
-            if (i+1) % 10 == 9:
-                progressbar.set(i+1)
-
-
-class _ProgressWindow(object):
-    WINDOW_TITLE = 'Running...'
-    MAX_WIDTH = 200
-    HEIGHT = 20
-
-    def __init__(self, maxval, run, timeline):
-        """Create a progress bar window, and use the function 'run' to
-        run the CA, update the variable timeline, and the progress gui
-
-        Args:
-            maxval (int): The number of generation to be run by the CA
-            run (function): The run function that actuall executes the CA
-            timeline (numpy.ndarray): the array object to save the grid state
-                for each timestep
-        """
-        self.maxval = maxval
-        self.root = tk.Tk()
-        # set title
-        self.root.wm_title(self.WINDOW_TITLE)
-        # lift to top layer
-        self.root.lift()
-        self.root.attributes('-topmost', True)
-        self.root.after_idle(self.root.attributes, '-topmost', False)
-        #disable close
-        self.root.protocol('WM_DELETE_WINDOW', self.noclose)
-
-        self.progress_canvas = tk.Canvas(self.root,
-                                         height=self.HEIGHT,
-                                         width=self.MAX_WIDTH)
-        bar = self.progress_canvas.create_rectangle(0, 0, 0,
-                                                    self.HEIGHT, fill="blue")
-        self.progress_canvas.pack()
-        self.root.after(1, run(maxval, self, timeline))
-
-    def noclose(self):
-        pass
+            if frame < len(recorded) and recorded[frame] == i + 1:
+                self.record_frame(timeline, frame)
+                frame += 1
+            if self.checkpoint_due(i + 1):
+                self.checkpoint(i + 1, num_generations, timeline)
+            # reported every PROGRESS_INTERVAL seconds, but checked for
+            # being cancelled every generation
+            if self.report_progress(progress, i + 1, num_generations):
+                return i + 1
+        return num_generations
+
+    def record_frame(self, timeline, i):
+        """Record the grid as frame i of the timeline"""
+        timeline[i] = self.grid
+
+    def start_progress(self, generation):
+        """Start timing the run from the given generation, for reporting
+        its progress"""
+        self._progress_time = time.time()
+        self._progress_generation = generation
+
+    def report_progress(self, progress, generation, num_generations,
+                        force=False):
+        """Report the progress of the run, if PROGRESS_INTERVAL seconds
+        have passed since it was last reported
+
+        Args:
+            progress (RunProgress): where to report the progress, or None
+            generation (int): the generation the grid is at
+            num_generations (int): the number of generations of the run
+            force (bool): report the progress however recently it was
+                last reported
+
+        Returns:
+            bool: whether the run has been cancelled
+        """
+        if progress is None:
+            return False
+        now = time.time()
+        elapsed = now - self._progress_time
+        if force or elapsed >= self.PROGRESS_INTERVAL:
+            ran = generation - self._progress_generation
+            rate = ran / elapsed if elapsed > 0 else 0.0
+            progress.report(generation, num_generations, rate)
+            self.start_progress(generation)
+        return progress.cancelled()
+
+    def checkpointing(self):
+        """Whether the config sets checkpoints of the run"""
+        return (self.ca_config.checkpoint_generations is not None or
+                self.ca_config.checkpoint_seconds is not None)
+
+    def checkpoint_due(self, generation):
+        """Whether a checkpoint should be saved after the given generation,
+        every checkpoint_generations generations or checkpoint_seconds
+        seconds as set in the config"""
+        config = self.ca_config
+        if (config.checkpoint_generations is not None and
+                generation % config.checkpoint_generations == 0):
+            return True
+        return (config.checkpoint_seconds is not None and
+                time.time() - self._last_checkpoint >=
+                config.checkpoint_seconds)
+
+    def checkpoint(self, generation, num_generations, timeline,
+                   cancelled=False):
+        """Save everything needed to continue the run from this generation
 
-    def set(self, val):
-        """Set the progress bar to the given generation number
+        Note:
+            The checkpoint is written alongside and renamed into place, so
+            a run killed while saving leaves the previous checkpoint
+            intact. A timeline streamed to a file is flushed, and otherwise
+            only the frames recorded since the last checkpoint are written,
+            so each checkpoint of a long run takes as long as the last.
 
         Args:
-            val (int): The generation number (translated to a progress bar
-                length)
+            generation (int): the generation the grid is at
+            num_generations (int): the number of generations of the run
+            timeline (Timeline): the timeline being recorded
+            cancelled (bool): the run was cancelled at this generation, so
+                a streamed timeline is resumed from the timeline the run
+                saves rather than the file it was recorded into
         """
-        if val >= self.maxval:
-            self.root.destroy()
+        state = self._run_state(generation, num_generations)
+        num_frames = sum(1 for g in state['recorded'] if g <= generation)
+        state.update(self._timeline_state(timeline, num_frames))
+        state['cancelled'] = cancelled
+        path = self.ca_config.checkpoint_path
+        save(state, path + '.part')
+        os.replace(path + '.part', path)
+        self._last_checkpoint = time.time()
+
+    def _run_state(self, generation, num_generations):
+        """The state of the grid and everything else the next generation
+        depends on, to continue the run from later"""
+        return {
+            'filepath': self.ca_config.filepath,
+            'num_generations': num_generations,
+            'recorded': list(self._recorded),
+            'generation': generation,
+            'grid': np.copy(self.grid),
+            'current_gen': getattr(self, 'current_gen', None),
+            'wrap': self.ca_config.wrap,
+            'additional_args': self.additional_args,
+            'numpy_random': np.random.get_state(),
+            'random': random.getstate(),
+        }
+
+    def _restore_run_state(self, state):
+        """Set the grid and everything else back to a saved run state"""
+        self.ca_config.wrap = state['wrap']
+        self.grid[:, :] = state['grid']
+        if state['current_gen'] is not None:
+            self.current_gen = state['current_gen']
+        self.refresh_wrap()
+        self.additional_args = state['additional_args']
+        np.random.set_state(state['numpy_random'])
+        random.setstate(state['random'])
+
+    def _timeline_state(self, timeline, num_frames):
+        """Save the frames recorded since the last checkpoint, returning
+        the state of the timeline to save in the checkpoint
+
+        Note:
+            The frames of a timeline that is not streamed are appended to
+            a file alongside the checkpoint, the checkpoint keeping how
+            much of the file it covers
+
+        Args:
+            timeline (Timeline): the timeline being recorded
+            num_frames (int): the number of frames recorded so far
+        """
+        stream_path = getattr(timeline, 'stream_path', None)
+        if stream_path is not None:
+            # the frames are already in the file, only flush them
+            timeline.frames.flush()
+            return {'stream_path': stream_path, 'num_frames': num_frames}
+        saved, size = self._checkpointed
+        with open(self.ca_config.checkpoint_path + '.frames', 'r+b'
+                  if saved else 'wb') as f:
+            # past anything written after the last checkpoint was saved
+            f.seek(size)
+            for i in range(saved, num_frames):
+                pickle.dump(_frame_record(timeline, i), f, -1)
+            f.truncate()
+            size = f.tell()
+        self._checkpointed = (num_frames, size)
+        return {'stream_path': None, 'num_frames': num_frames,
+                'frames_size': size}
+
+    def _restore_timeline(self, state, generations):
+        """The timeline recorded up to a checkpoint, or None if it can not
+        be restored"""
+        if state['stream_path'] is not None and not state['cancelled']:
+            return Timeline.reopen(state['stream_path'])
+        timeline = self.new_timeline(generations)
+        if state['stream_path'] is not None:
+            # a cancelled run's frames are in the timeline it saved
+            path = self.ca_config.timeline_path
+            if not os.path.isfile(path):
+                return None
+            previous = load_timeline(path)
+            if len(previous) != state['num_frames']:
+                return None
+            # the saved timeline must be of the cancelled run
+            last = state['recorded'][len(previous) - 1] if previous else -1
+            if (last == state['generation'] and
+                    not np.array_equal(previous[-1], state['grid'])):
+                return None
+            for i in range(len(previous)):
+                timeline[i] = previous[i]
+            return timeline
+        with open(self.ca_config.checkpoint_path + '.frames', 'rb') as f:
+            for i in range(state['num_frames']):
+                _restore_frame(timeline, i, pickle.load(f))
+        self._checkpointed = (state['num_frames'], state['frames_size'])
+        return timeline
+
+    def load_checkpoint(self, num_generations, generations):
+        """Restore the grid to the last checkpoint saved by this run
+
+        Args:
+            num_generations (int): the number of generations to be run
+            generations (list): the generations to be recorded
+
+        Returns:
+            (Timeline, int): the timeline recorded so far and the
+                generation to continue from, or None if there is no
+                checkpoint of the same run
+        """
+        path = self.ca_config.checkpoint_path
+        if not os.path.isfile(path):
+            return None
+        state = load(path)
+        if (state['filepath'] != self.ca_config.filepath or
+                state['num_generations'] != num_generations or
+                state['recorded'] != list(generations)):
+            print("[WARNING] The checkpoint is of a different run, " +
+                  "starting from the first generation")
+            return None
+        try:
+            timeline = self._restore_timeline(state, generations)
+        except (OSError, EOFError, KeyError, pickle.UnpicklingError):
+            timeline = None
+        if timeline is None:
+            print("[WARNING] The frames of the checkpoint are missing, " +
+                  "starting from the first generation")
+            return None
+        self._restore_run_state(state)
+        return timeline, state['generation']
+
+    def clear_checkpoint(self):
+        """Remove the checkpoint of the run, if any"""
+        path = self.ca_config.checkpoint_path
+        for name in (path, path + '.frames'):
+            if os.path.isfile(name):
+                os.remove(name)
+
+    def run_fingerprint(self):
+        """A hash of everything the generations of a run depend on apart
+        from how many there are: the description, the config fields
+        affecting the rule or the random numbers, the initial grid and any
+        additional arguments
+
+        Returns:
+            str: the hex digest, or None if the additional arguments can not
+                be pickled to be hashed
+        """
+        config = self.ca_config
+        key = hashlib.sha256()
+        with open(config.filepath, 'rb') as f:
+            key.update(f.read())
+        fields = (config.dimensions, tuple(config.states), config.wrap,
+                  config.rule_num, config.rule_string, config.totalistic,
+                  config.seed, config.neighbour_views)
+        key.update(repr(fields).encode())
+        nhood = np.asarray(self.neighbourhood.neighbourhood, dtype=float)
+        key.update(nhood.tobytes())
+        key.update(repr(self.grid.shape).encode())
+        key.update(np.ascontiguousarray(self.grid).tobytes())
+        try:
+            key.update(pickle.dumps(self.additional_args, -1))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return None
+        return key.hexdigest()
+
+    def extendable(self):
+        """Whether a later run can carry on from the end of this one"""
+        config = self.ca_config
+        return not (config.record_regions or
+                    config.record_downsample is not None)
+
+    def save_last_run(self, num_generations, fingerprint, generation=None):
+        """Save the final state of a completed run, so a run of the same CA
+        for more generations can carry on from it
+
+        Args:
+            num_generations (int): the number of generations of the run
+            fingerprint (str): the run_fingerprint from before the run
+            generation (int): the generation the run reached, if it was
+                cancelled before num_generations
+        """
+        path = self.ca_config.last_run_path
+        if fingerprint is None or not self.extendable():
+            if os.path.isfile(path):
+                os.remove(path)
             return
-        p = val/self.maxval
-        w = int(p * self.MAX_WIDTH)
-        self.progress_canvas.create_rectangle(0, 0, w, self.HEIGHT,
-                                              fill="blue")
-        self.root.update()
+        if generation is None:
+            generation = num_generations
+        state = self._run_state(generation, num_generations)
+        state['recorded'] = [g for g in state['recorded'] if g <= generation]
+        state['fingerprint'] = fingerprint
+        # where the description saves the timeline, which may change
+        # between runs (eg. the GUI saves each run to its own file)
+        state['timeline_path'] = self.ca_config.timeline_path
+        save(state, path + '.part')
+        os.replace(path + '.part', path)
+
+    def load_last_run(self, num_generations, generations, fingerprint):
+        """Carry on from the end of the last run if it was of the same CA
+        for fewer generations, copying its frames into a new timeline
+
+        Note:
+            The timeline of the last run is loaded from where it was saved,
+            so only the new generations are run
+
+        Args:
+            num_generations (int): the number of generations to be run
+            generations (list): the generations to be recorded
+            fingerprint (str): the run_fingerprint of this run
+
+        Returns:
+            (Timeline, int): the timeline recorded up to the end of the last
+                run and the generation to continue from, or None if the
+                run must start from the first generation
+        """
+        path = self.ca_config.last_run_path
+        if (fingerprint is None or not self.extendable() or
+                not os.path.isfile(path)):
+            return None
+        state = load(path)
+        last = state['generation']
+        timeline_path = state.get('timeline_path',
+                                  self.ca_config.timeline_path)
+        if (state['fingerprint'] != fingerprint or
+                state['filepath'] != self.ca_config.filepath or
+                last >= num_generations or
+                not os.path.isfile(timeline_path)):
+            return None
+        previous = load_timeline(timeline_path)
+        frames = {previous.generation(i): i for i in range(len(previous))}
+        # the saved timeline must be of the last run
+        if (len(previous) != len(state['recorded']) or
+                (last in frames and not np.array_equal(
+                    previous[frames[last]], state['grid']))):
+            return None
+        copied = [g for g in generations if g <= last]
+        if any(g not in frames for g in copied):
+            return None
+        timeline = self.new_timeline(generations)
+        for i, g in enumerate(copied):
+            timeline[i] = previous[frames[g]]
+        self._restore_run_state(state)
+        return timeline, last
+
+
+def _frame_record(timeline, i):
+    """Frame i of a timeline as saved in a checkpoint, the frame of each
+    view for a RegionTimeline"""
+    if isinstance(timeline, RegionTimeline):
+        return [np.copy(view[i]) for view in timeline.views]
+    return np.copy(timeline[i])
+
+
+def _restore_frame(timeline, i, record):
+    """Record frame i of a timeline from a checkpoint"""
+    if isinstance(timeline, RegionTimeline):
+        for view, frame in zip(timeline.views, record):
+            view[i] = frame
+    else:
+        timeline[i] = record
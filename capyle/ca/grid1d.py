@@ -1,6 +1,7 @@
+import time
 import numpy as np
-from capyle.ca import Neighbourhood, Grid
-from capyle.utils import gens_to_dims, clip_numeric
+from capyle.ca import Neighbourhood, Grid, WolframRule, DiagramTimeline
+from capyle.utils import gens_to_dims, clip_numeric, states_dtype
 
 
 class Grid1D(Grid):
@@ -25,18 +26,29 @@ class Grid1D(Grid):
 
         # calculate the grid dimensions from the generations
         numrows, numcols = gens_to_dims(ca_config.num_generations)
-        # wrapsize is the width of the columns at either side (hidden)
-        # used for wrapping behavior
-        # a wrapsize of 1 leads to 2 extra columns (1 either side of the grid)
-        wrapsize = 1
-        self.wrapping_grid = np.zeros((numrows, numcols + wrapsize*2))
-
         # set neighbourhood
         self.set_neighbourhood(ca_config)
+        # lookup used to count neighbours by state index
+        self.set_state_encoding(ca_config.states)
+
+        # wrapsize is the width of the columns at either side (hidden)
+        # used for wrapping behavior, the radius of the neighbourhood
+        # a wrapsize of 1 leads to 2 extra columns (1 either side of the grid)
+        wrapsize = self.neighbourhood.radius
+        if wrapsize > numcols:
+            raise ValueError(
+                'Neighbourhood radius {r} larger than the grid'.format(
+                    r=wrapsize))
+        self.wrapsize = wrapsize
+        # store the grid in the smallest type that holds every state
+        # as well as the dead (0) state used when not wrapping
+        self.dtype = states_dtype(ca_config.states, 0)
+        self.wrapping_grid = np.zeros((numrows, numcols + wrapsize*2),
+                                      dtype=self.dtype)
 
         # initial grid
         self.wrapping_grid.fill(ca_config.states[0])
-        self.grid = self.wrapping_grid[:, 1:-1]
+        self.grid = self.wrapping_grid[:, wrapsize:-wrapsize]
         if ca_config.initial_grid is not None:
             self.set_grid(ca_config.initial_grid)
         self.refresh_wrap()
@@ -45,61 +57,183 @@ class Grid1D(Grid):
         self.current_gen = 0
 
         # handle transition function and any addional variables passed
-        self.additional_args = None
-        if type(transition_func) == tuple and len(transition_func) > 1:
-            self.transition_func = transition_func[0]
-            self.additional_args = transition_func[1:]
-        else:
-            self.transition_func = transition_func
+        self.set_transition_func(transition_func)
+
+        # Wolfram codes are stepped with a lookup table
+        self.lookup_values = None
+        if isinstance(self.transition_func, WolframRule):
+            self.set_lookup_rule(self.transition_func)
 
     def refresh_wrap(self):
         """ Update the wrapping border of the grid to reflect any changes """
+        w = self.wrapsize
         if not self.ca_config.wrap:
             # if not wrapping set outer borders to 'dead'
-            self.wrapping_grid[:, 0] = 0
-            self.wrapping_grid[:, -1] = 0
+            self.wrapping_grid[:, :w] = 0
+            self.wrapping_grid[:, -w:] = 0
         else:
             # if wrapping set to grid states
-            self.wrapping_grid[:, 0] = self.grid[:, -1]
-            self.wrapping_grid[:, -1] = self.grid[:, 0]
+            self.wrapping_grid[:, :w] = self.grid[:, -w:]
+            self.wrapping_grid[:, -w:] = self.grid[:, :w]
 
     def get_neighbour_arrays(self):
         """ Get the states of the cells left and right neighbours
-        and apply the neighbourhood """
+        and apply the neighbourhood
+
+        Returns:
+            tuple: the left, self and right states, or for a neighbourhood
+                of radius r the 2r + 1 states from left to right
+        """
         nhood_bool = (self.neighbourhood.neighbourhood == 1)
-        self_states = self.grid[self.current_gen]
-        left_neighbour_states = (nhood_bool[0] *
-                                 self.wrapping_grid[self.current_gen, :-2])
-        right_neighbour_states = (nhood_bool[2] *
-                                  self.wrapping_grid[self.current_gen, 2:])
-        return left_neighbour_states, self_states, right_neighbour_states
+        row = self.wrapping_grid[self.current_gen]
+        width = self.grid.shape[1]
+        neighbour_states = [nhood_bool[j] * row[j:j + width]
+                            for j in range(len(nhood_bool))]
+        neighbour_states[self.wrapsize] = self.grid[self.current_gen]
+        return tuple(neighbour_states)
 
     def count_neighbours(self, neighbourstates):
-        l, c, r = neighbourstates
+        """Return a (k, cols) array of how many neighbours of each state
+        each cell has, where k is the number of states"""
         states = self.ca_config.states
-        counts = np.empty(len(states), dtype=np.ndarray)
-        for i, s in enumerate(states):
-            counts[i] = (l == s) + (r == s)
+        counts = np.zeros((len(states), self.grid.shape[1]), dtype=np.uint8)
+        for j, n in enumerate(neighbourstates):
+            if j == self.wrapsize:
+                # the cell itself
+                continue
+            for i, s in enumerate(states):
+                counts[i] += (n == s)
         return counts
 
+    def set_lookup_rule(self, rule):
+        """Step the grid with the lookup table of a Wolfram code instead of
+        calling a transition function
+
+        Args:
+            rule (WolframRule): the rule, with the same number of states
+                and radius as the grid
+        """
+        if rule.num_states != self.num_states:
+            raise ValueError('Rule has {n} states, {s} given'.format(
+                n=rule.num_states, s=self.ca_config.states))
+        if rule.radius != self.wrapsize:
+            raise ValueError(
+                'Rule has radius {r}, neighbourhood has radius {n}'.format(
+                    r=rule.radius, n=self.wrapsize))
+        # translate the next state indices into state values up front
+        states = np.array(self.ca_config.states).astype(self.dtype)
+        self.lookup_values = states[rule.table()]
+        self.lookup_rule = rule
+
+    def _lookup_row(self):
+        """Look up the next row of the grid, encoding the window of
+        states around each cell as a single index into the table"""
+        k = self.num_states
+        width = self.grid.shape[1]
+        w = self.wrapsize
+        row = self.encode_states(self.wrapping_grid[self.current_gen])
+        if not self.ca_config.wrap and 0 not in self.ca_config.states:
+            # the dead border (0) is not one of the states, so is read as
+            # state index 0 rather than indexing past the table
+            row = np.copy(row)
+            row[:w] = 0
+            row[-w:] = 0
+        # cells outside of the neighbourhood count as state index 0, apart
+        # from the cell itself, as in get_neighbour_arrays
+        nhood = self.neighbourhood.neighbourhood != 0
+        nhood[self.wrapsize] = True
+        index = np.zeros(width, dtype=np.intp)
+        for j in range(len(nhood)):
+            if not self.lookup_rule.totalistic:
+                # leftmost cell is the most significant digit
+                index *= k
+            if nhood[j]:
+                index += row[j:j + width]
+        return np.take(self.lookup_values, index)
+
     def step(self):
         """ Calculate the next timestep by applying the transistion function
-        and save the new state to grid """
+        and save the new state to grid
+
+        Note:
+            If the transition function takes an 'out' argument it is passed
+            the next row of the grid to write the new states into directly
+        """
+
+        nextrow = self.grid[self.current_gen + 1]
+        if self.lookup_values is not None:
+            nextrow[:] = self._lookup_row()
+            self.current_gen += 1
+            self.refresh_wrap()
+            return
 
         ns = self.get_neighbour_arrays()
         nc = self.count_neighbours(ns)
-        if self.additional_args is None:
-            # if no additional variables supplied
-            newrow = self.transition_func(self.grid, ns, nc)
+        if self.transition_takes_out:
+            newrow = self.apply_transition(self.grid, ns, nc, out=nextrow)
         else:
-            # otherwise pass in the arguments to the transision function
-            newrow = self.transition_func(self.grid, ns, nc,
-                                          *self.additional_args)
+            newrow = self.apply_transition(self.grid, ns, nc)
 
         self.current_gen += 1
-        self.grid[self.current_gen] = newrow
+        if newrow is not None and newrow is not nextrow:
+            self.store_next_states(nextrow, newrow)
         self.refresh_wrap()
 
+    def new_timeline(self, generations):
+        """The grid already holds every generation, so the timeline is the
+        grid itself, revealed up to each recorded generation
+
+        Args:
+            generations (list): the generations to be recorded, as given by
+                recorded_generations
+
+        Returns:
+            DiagramTimeline: the timeline backed by the grid
+        """
+        generations = list(generations)
+        num_rows = generations[-1] + 1
+        if generations == list(range(num_rows)):
+            generations = None
+        return DiagramTimeline(self.grid[:num_rows], np.copy(self.grid[-1]),
+                               generations)
+
+    def extendable(self):
+        # the width of the grid depends on the number of generations
+        return False
+
+    def _timeline_state(self, timeline, num_frames):
+        # the timeline is the grid, which is saved anyway
+        return {}
+
+    def _restore_timeline(self, state, generations):
+        return self.new_timeline(generations)
+
+    def _runca(self, num_generations, progress, timeline, first=0,
+               recorded=None):
+        """Run the CA for given generations, each generation is written
+        into the grid (and so the timeline) as it is stepped
+
+        Note:
+            The diagram holds every generation whichever are recorded, the
+            recorded generations only choose the frames displayed
+
+        Returns:
+            int: the generation reached, before num_generations if the run
+                was cancelled
+        """
+        self.set_recorded(num_generations, recorded)
+        self._last_checkpoint = time.time()
+        self.start_progress(first)
+        for i in range(first, num_generations):
+            self.step()
+            if self.checkpoint_due(i + 1):
+                self.checkpoint(i + 1, num_generations, timeline)
+            # reported every PROGRESS_INTERVAL seconds, but checked for
+            # being cancelled every generation
+            if self.report_progress(progress, i + 1, num_generations):
+                return i + 1
+        return num_generations
+
 
 def randomise1d(grid, background_state, proportions):
     """ Randomise a 2D grid for a 1D cellular automata
@@ -1,9 +1,33 @@
+import os
+import sys
+import time
+import pickle
+import hashlib
 import numpy as np
-from capyle.ca import Grid, Neighbourhood
-from capyle.utils import clip_numeric
+from numpy.lib.stride_tricks import sliding_window_view
+from capyle.ca import (Grid, Neighbourhood, LifeLikeRule, BitBoard,
+                       PackedTimeline)
+from capyle.utils import clip_numeric, states_dtype
 
 
 class Grid2D(Grid):
+    # (row, col) of the NW N NE, W E, SW S SE neighbours in the 3x3
+    # neighbourhood, the centre cell is not a neighbour
+    NEIGHBOUR_OFFSETS = [(0, 0), (0, 1), (0, 2),
+                         (1, 0), (1, 2),
+                         (2, 0), (2, 1), (2, 2)]
+    # state of the cells surrounding the grid when wrap is False
+    DEAD_WRAP_STATE = -100
+    # largest lookup table a transition function will be compiled into
+    MAX_LOOKUP_SIZE = 2**22
+    # number of probes repeated to check a transition function is
+    # deterministic before compiling it
+    PROBE_SAMPLE = 1000
+    # steps timed of a compiled transition function and of the function
+    # itself, the fastest of which are compared
+    LOOKUP_TIMINGS = 3
+    # packed grid stepped instead of the array of states, if any
+    bitboard = None
 
     def __init__(self, ca_config, transition_func):
         # create superclass
@@ -17,13 +41,30 @@ class Grid2D(Grid):
 
         # store a handle on config object
         self.ca_config = ca_config
+        # lookup used to count neighbours by state index
+        self.set_state_encoding(ca_config.states)
 
-        # wrap size is 1 col & row all the way round the grid
-        wrapsize = 1
+        # set neighbourhood
+        self.set_neighbourhood(ca_config)
+        # pass read-only views of the neighbours instead of new arrays
+        self.neighbour_views = ca_config.neighbour_views
+
+        # wrap size is as many cols & rows all the way round the grid as
+        # the radius of the neighbourhood (1 for a 3x3 neighbourhood)
+        wrapsize = self.neighbourhood.radius
+        if not (numrows >= wrapsize and numcols >= wrapsize):
+            raise ValueError(
+                'Grid size {g} smaller than neighbourhood radius {r}'.format(
+                    g=ca_config.grid_dims, r=wrapsize))
+        self.wrapsize = wrapsize
+        # store the grid in the smallest type that holds every state
+        # as well as the dead state surrounding the grid if not wrapping
+        self.dtype = states_dtype(ca_config.states, *self._dead_states())
         # wrap size doubled for the row/colum on each side of the grid
         # ie. a wrap size of 1 requires 2 extra rows and 2 extra columns
         self.wrapping_grid = np.empty((numrows + wrapsize*2,
-                                       numcols + wrapsize*2))
+                                       numcols + wrapsize*2),
+                                      dtype=self.dtype)
         # initial state fill
         self.wrapping_grid.fill(ca_config.states[0])
         self.grid = self.wrapping_grid[wrapsize:-wrapsize,
@@ -37,17 +78,208 @@ class Grid2D(Grid):
         if ca_config.initial_grid is not None:
             self.set_grid(ca_config.initial_grid)
 
-        # set neighbourhood
-        self.set_neighbourhood(ca_config)
-
         # Handle any additional variables the user wishes to keep track of
         # for use in the transition function
-        self.additional_args = None
-        if type(transition_func) == tuple and len(transition_func) > 1:
-            self.transition_func = transition_func[0]
-            self.additional_args = transition_func[1:]
+        self.set_transition_func(transition_func)
+
+        # neighbourhoods larger than 3x3 are counted by summing over the
+        # neighbourhood rather than neighbour by neighbour
+        self.count_dtype = np.dtype(np.uint8)
+        if wrapsize > 1:
+            self._prepare_kernel()
+
+        # second wrapping grid the next state is written into before the
+        # two are swapped, along with a buffer reused for the counts
+        self._back_wrapping_grid = np.copy(self.wrapping_grid)
+        self._back_grid = self._back_wrapping_grid[wrapsize:-wrapsize,
+                                                   wrapsize:-wrapsize]
+        self._counts = np.zeros((self.num_states,) + self.grid.shape,
+                                dtype=self.count_dtype)
+        self._scratch = np.empty(self.grid.shape, dtype=bool)
+
+        # rules given as a rule string are stepped with a lookup table
+        self.lookup_values = None
+        if ca_config.rule_string is not None:
+            self.transition_func = LifeLikeRule(ca_config.rule_string)
+        if isinstance(self.transition_func, LifeLikeRule):
+            rule = self.transition_func
+            if rule.num_states != self.num_states:
+                raise ValueError(
+                    'Rule {r} has {n} states, {s} given'.format(
+                        r=rule, n=rule.num_states, s=ca_config.states))
+            self.set_lookup_table(rule.table(self.max_neighbour_count()),
+                                  [rule.ALIVE])
+        elif ca_config.compile_transition:
+            self.compile_transition()
+
+        # two state Life-like rules can be stepped on packed words
+        backend = ca_config.backend
+        if backend != 'array' and self._bitboard_supported():
+            self.set_bitboard()
+        elif backend == 'bitboard':
+            print("[WARNING] The bitboard backend only supports Life-like " +
+                  "rules with states (0, 1) and a 3x3 neighbourhood, " +
+                  "using the array backend")
+
+    @property
+    def grid(self):
+        """The current states of the grid, unpacked from the bitboard if
+        it has been stepped since"""
+        self._sync_bitboard()
+        return self._grid
+
+    @grid.setter
+    def grid(self, grid):
+        self._grid = grid
+
+    @property
+    def wrapping_grid(self):
+        """The grid surrounded by the wrapped cells, unpacked from the
+        bitboard if it has been stepped since"""
+        self._sync_bitboard()
+        return self._wrapping_grid
+
+    @wrapping_grid.setter
+    def wrapping_grid(self, wrapping_grid):
+        self._wrapping_grid = wrapping_grid
+
+    def _sync_bitboard(self):
+        """Unpack the bitboard into the grid if it is ahead"""
+        if self.bitboard is None:
+            return
+        if self._bitboard_ahead:
+            self._bitboard_ahead = False
+            self.bitboard.unpack(self._grid)
+            self.refresh_wrap()
+        # the grid may be changed by the caller, so repack before the
+        # next step
+        self._bitboard_current = False
+
+    def _bitboard_supported(self):
+        """Whether the grid can be stepped as a bitboard"""
+        rule = self.transition_func
+        wrap = self.ca_config.wrap
+        return (isinstance(rule, LifeLikeRule) and rule.num_states == 2 and
+                list(self.ca_config.states) == [0, 1] and
+                self.wrapsize == 1 and
+                np.all(np.isin(self.neighbourhood.neighbourhood, (0, 1))) and
+                (type(wrap) is bool or wrap in (0, 1)))
+
+    def set_bitboard(self):
+        """Step the grid as a bitboard, 64 cells to each machine word
+
+        Note:
+            The array of states is only unpacked from the bitboard when
+            the grid is accessed, so a run only recording some generations
+            never unpacks the others
+        """
+        rule = self.transition_func
+        wrap = self.ca_config.wrap
+        if wrap is False:
+            wrap = rule.DEAD
+        self.bitboard = BitBoard(self._grid.shape,
+                                 self.neighbourhood.neighbourhood,
+                                 rule.birth, rule.survival, wrap)
+        self._bitboard_current = False
+        self._bitboard_ahead = False
+
+    def _bitboard_step(self):
+        """Step the bitboard, first packing the grid if it may have been
+        changed"""
+        if not self._bitboard_current:
+            self.bitboard.pack(self._grid)
+            self._bitboard_current = True
+        self.bitboard.step()
+        self._bitboard_ahead = True
+
+    def empty_timeline(self, num_frames, generations):
+        """Allocate the timeline of a run recorded to memory, packed from
+        the start if the grid is stepped as a bitboard
+
+        Note:
+            A bitboard run records the packed grid straight into a
+            PackedTimeline, so recorded generations are neither unpacked
+            into the grid nor packed again when saved. Timelines streamed
+            to a file are still recorded as arrays of states.
+        """
+        if self.bitboard is None:
+            return Grid.empty_timeline(self, num_frames, generations)
+        return PackedTimeline.empty(num_frames, self._grid.shape,
+                                    self._grid.dtype, self.ca_config.states,
+                                    generations)
+
+    def record_frame(self, timeline, i):
+        """Record the grid as frame i of the timeline, straight from the
+        bitboard into a packed timeline"""
+        if self.bitboard is None or not isinstance(timeline, PackedTimeline):
+            Grid.record_frame(self, timeline, i)
+            return
+        if not (self._bitboard_ahead or self._bitboard_current):
+            # the grid may have been changed since the bitboard was packed
+            self.bitboard.pack(self._grid)
+            self._bitboard_current = True
+        timeline.set_packed(i, self.bitboard.packed_cells())
+
+    def _prepare_kernel(self):
+        """Prepare the neighbourhood for counting larger neighbourhoods
+
+        Note:
+            A neighbourhood of 0s and 1s is split into rectangles of
+            neighbours, each of which is summed in constant time per cell
+            from a summed area table, so the cost does not grow with the
+            number of neighbours. Weighted neighbourhoods are correlated
+            with the grid using the FFT.
+        """
+        kernel = np.array(self.neighbourhood.neighbourhood, dtype=float)
+        r = self.wrapsize
+        # the center is the cell itself, not a neighbour
+        kernel[r, r] = 0
+        self._kernel = kernel
+        self._kernel_rects = None
+        self._kernel_fft = None
+        if np.all((kernel == 0) | (kernel == 1)):
+            self.count_dtype = np.min_scalar_type(int(kernel.sum()))
+            self._kernel_rects = self._kernel_rectangles(kernel)
         else:
-            self.transition_func = transition_func
+            if np.array_equal(kernel, np.round(kernel)):
+                # integer weights, the smallest type that fits any sum
+                self.count_dtype = states_dtype((kernel[kernel < 0].sum(),
+                                                 kernel[kernel > 0].sum()))
+                if self.count_dtype.kind == 'f':
+                    self.count_dtype = np.dtype(np.int64)
+            else:
+                self.count_dtype = np.dtype(float)
+            padded = np.zeros(self.wrapping_grid.shape)
+            padded[:kernel.shape[0], :kernel.shape[1]] = kernel
+            self._kernel_fft = np.conj(np.fft.rfft2(padded))
+
+    def _kernel_rectangles(self, kernel):
+        """Split a kernel of 0s and 1s into rectangles covering the 1s
+
+        Note:
+            Each row is split into runs of 1s and consecutive rows with
+            the same runs are merged, so a square neighbourhood needs only
+            4 rectangles (above, left of, right of and below the center)
+
+        Returns:
+            list: (firstrow, lastrow, firstcol, lastcol) of each rectangle
+        """
+        rects = []
+        previous_runs, start = None, 0
+        for i, row in enumerate(kernel):
+            # pad with 0s so every run has a start and an end
+            edges = np.diff(np.concatenate(([0], row, [0])))
+            runs = list(zip(np.flatnonzero(edges == 1),
+                            np.flatnonzero(edges == -1) - 1))
+            if runs != previous_runs:
+                if previous_runs:
+                    rects.extend((start, i - 1, c0, c1)
+                                 for c0, c1 in previous_runs)
+                previous_runs, start = runs, i
+        if previous_runs:
+            rects.extend((start, len(kernel) - 1, c0, c1)
+                         for c0, c1 in previous_runs)
+        return rects
 
     def _gen_wrap_indicies(self, wrapsize):
         """Create the indecies used when refreshing the wrap"""
@@ -95,12 +327,20 @@ class Grid2D(Grid):
 
         return wrapindicies, gridindicies
 
+    def _dead_states(self):
+        """Return the state the wrapping border is set to if not wrapping
+        (as a tuple, empty if the grid wraps)"""
+        wrap = self.ca_config.wrap
+        if type(wrap) is bool:
+            return () if wrap else (self.DEAD_WRAP_STATE,)
+        return (wrap,)
+
     def refresh_wrap(self):
         """ Update the wrapping border of the grid to reflect any changes """
         # if wrap false set to default non wrap state (-100)
         wrap = self.ca_config.wrap
         if type(wrap) is bool and wrap is False:
-            wrap = -100
+            wrap = self.DEAD_WRAP_STATE
         # Normal wrapping behaviour
         if type(wrap) is bool and wrap is True:
             # set the wrap to the oppostite cell bank of the grid
@@ -114,13 +354,39 @@ class Grid2D(Grid):
         else:
             sys.exit("Invalid wrap {} of type {}".format(wrap, type(wrap)))
 
-    def get_neighbour_states(self, applyneighbourhood=True):
-        """Return the 8 arrays of each neighbours current state"""
+    def get_neighbour_states(self, applyneighbourhood=True, views=None):
+        """Return the 8 arrays of each neighbours current state
+
+        Note:
+            With views the states are returned as a read-only
+            (3, 3, rows, cols) sliding window view into the wrapping grid,
+            so ns[r, c] is the neighbour at row r, col c of the 3x3
+            neighbourhood (ns[1, 1] is the cell itself). Nothing is copied
+            and the neighbourhood is not applied to the values, so only
+            the entries in active_neighbours() should be used. The view
+            reflects any changes made to the grid in the meantime.
+
+            Neighbourhoods larger than 3x3 always return the view, which
+            is then (2r+1, 2r+1, rows, cols) for a radius r.
+
+        Args:
+            applyneighbourhood (bool): multiply each neighbour array by
+                its weight in the neighbourhood, ignored for views
+            views (bool): return the sliding window view, defaults to
+                ca_config.neighbour_views
+        """
+        if views is None:
+            views = self.neighbour_views
+        if views or self.wrapsize > 1:
+            return self._neighbour_view(self.wrapping_grid)
         grid = self.wrapping_grid
         if applyneighbourhood:
             nhood_arr = self.neighbourhood.neighbourhood
         else:
             nhood_arr = np.ones((3, 3))
+        # a mask of 0s and 1s keeps the neighbour arrays in the grid's type
+        if np.all((nhood_arr == 0) | (nhood_arr == 1)):
+            nhood_arr = nhood_arr.astype(grid.dtype)
         # Return the NW N NE, W self E, SW S SE neighbourgrids
         nw = nhood_arr[0, 0] * grid[0:-2, 0:-2]
         n = nhood_arr[0, 1] * grid[0:-2, 1:-1]
@@ -132,42 +398,559 @@ class Grid2D(Grid):
         se = nhood_arr[2, 2] * grid[2:, 2:]
         return np.array([nw, n, ne, w, e, sw, s, se])
 
-    def count_neighbours(self, neighbour_states):
-        """
-        Taking the 8 neighbour arrays, return n arrays of how many
-        neighbours of each state each cell are in each state,
-        where n is the number of states
-        """
-        states = self.ca_config.states
-        # create variable to store the counts for each state
-        state_counts = np.zeros(len(states), dtype=np.ndarray)
-        for i, state in enumerate(states):
-            # for each state in the CA
-            countg = np.zeros(self.grid.shape)
-            for g in neighbour_states:
-                # for each neighbour array add the cells in the queried state
-                countg += (g == state) + 0
-            # save the total counts for this state
-            state_counts[i] = countg
-        return state_counts
+    def count_neighbours(self, neighbour_states=None, out=None,
+                         states=None):
+        """
+        Return a (k, rows, cols) array of how many neighbours of each
+        state each cell has, where k is the number of states
+
+        Note:
+            The counts for all states are accumulated together into one
+            contiguous small integer array from a state-index encoding of
+            the grid. If neighbour_states is not supplied the grid is
+            encoded once and the neighbours are taken as slices of it,
+            otherwise each of the supplied neighbour arrays is encoded.
+
+            Each neighbour is compared with each state in turn, as numpy
+            has no faster single pass: scattering each neighbour into the
+            counts by index, or adding it to a word of 4 bit counters for
+            every state, are both slower for any number of states.
+
+            When using neighbour views, neighbours outside of the
+            neighbourhood are skipped entirely rather than being counted
+            as state 0, so sparser neighbourhoods are cheaper to count.
+
+            Neighbourhoods larger than 3x3 are always counted from the
+            grid by summing over the neighbourhood, weighting each
+            neighbour by its value in the neighbourhood, and the counts
+            are of count_dtype.
+
+        Args:
+            neighbour_states (numpy.ndarray): optional neighbour arrays as
+                returned by get_neighbour_states
+            out (numpy.ndarray): optional (k, rows, cols) array to write the
+                counts into instead of allocating a new one
+            states (list): optional indices of the states to count, the
+                counts are then indexed by position in this list
+
+        Returns:
+            numpy.ndarray: the counts, indexed [state index, row, col]
+        """
+        if states is None:
+            states = range(self.num_states)
+        if self.wrapsize > 1:
+            return self._sum_neighbours(out, states)
+        if neighbour_states is None:
+            neighbours = self._neighbour_indices()
+        elif np.ndim(neighbour_states) == 4:
+            # sliding window view, only encode the active neighbours
+            neighbours = (self.encode_states(neighbour_states[r, c])
+                          for r, c in self.active_neighbours())
+        else:
+            neighbours = (self.encode_states(g) for g in neighbour_states)
+        if out is None:
+            counts = np.zeros((len(states),) + self.grid.shape,
+                              dtype=np.uint8)
+            scratch = None
+        else:
+            counts = out
+            counts.fill(0)
+            scratch = self._scratch
+        for g in neighbours:
+            for j, i in enumerate(states):
+                if np.isscalar(g):
+                    # neighbour outside of the neighbourhood, constant state
+                    if g == i:
+                        counts[j] += 1
+                    continue
+                # add the bool array directly, no temporaries per state
+                np.add(counts[j], np.equal(g, i, out=scratch),
+                       out=counts[j], casting='unsafe')
+        return counts
+
+    def _sum_neighbours(self, out=None, states=None):
+        """Count the neighbours of each state in a neighbourhood larger
+        than 3x3 by summing over the rectangles of the neighbourhood, or
+        correlating with the weighted neighbourhood
+
+        Args:
+            out (numpy.ndarray): optional array to write the counts into
+            states (list): optional indices of the states to count
+
+        Returns:
+            numpy.ndarray: the counts, indexed [state index, row, col]
+        """
+        if states is None:
+            states = range(self.num_states)
+        if out is None:
+            out = np.empty((len(states),) + self.grid.shape,
+                           dtype=self.count_dtype)
+        encoded = self.encode_states(self.wrapping_grid)
+        rows, cols = self.grid.shape
+        for j, i in enumerate(states):
+            indicator = encoded == i
+            if self._kernel_rects is not None:
+                # summed area table with a leading row and col of 0s
+                table = np.zeros((indicator.shape[0] + 1,
+                                  indicator.shape[1] + 1), dtype=np.int32)
+                np.cumsum(indicator, axis=0, out=table[1:, 1:])
+                np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+                sums = np.zeros(self.grid.shape, dtype=np.int32)
+                for r0, r1, c0, c1 in self._kernel_rects:
+                    # sum of the rectangle for every cell at once
+                    sums += table[r1 + 1:r1 + 1 + rows, c1 + 1:c1 + 1 + cols]
+                    sums -= table[r0:r0 + rows, c1 + 1:c1 + 1 + cols]
+                    sums -= table[r1 + 1:r1 + 1 + rows, c0:c0 + cols]
+                    sums += table[r0:r0 + rows, c0:c0 + cols]
+                out[j] = sums
+            else:
+                sums = np.fft.irfft2(np.fft.rfft2(indicator) *
+                                     self._kernel_fft,
+                                     s=indicator.shape)[:rows, :cols]
+                if out.dtype.kind != 'f':
+                    sums = np.rint(sums)
+                out[j] = sums
+        return out
+
+    def active_neighbours(self):
+        """Return the (row, col) positions of the neighbours that are in
+        the neighbourhood (non zero), in row order, eg. NW N NE, W E,
+        SW S SE for a 3x3 neighbourhood"""
+        nhood_arr = self.neighbourhood.neighbourhood
+        r = self.neighbourhood.radius
+        return [(int(i), int(j)) for i, j in zip(*np.nonzero(nhood_arr))
+                if not (i == r and j == r)]
+
+    def _neighbour_view(self, grid):
+        """Return a read-only (2r+1, 2r+1, rows, cols) view of the
+        neighbourhood of each cell of the given wrapping grid"""
+        size = self.neighbourhood.neighbourhood.shape
+        return sliding_window_view(grid, size).transpose(2, 3, 0, 1)
+
+    def _neighbour_indices(self):
+        """Yield the state indices of the 8 neighbours of each cell as
+        views of the encoded wrapping grid, in the same order as
+        get_neighbour_states"""
+        encoded = self._neighbour_view(self.encode_states(self.wrapping_grid))
+        nhood_arr = self.neighbourhood.neighbourhood
+        # index of the value 0, the state a neighbour outside of the
+        # neighbourhood has always been counted as
+        zero_index = self.encode_states(np.zeros(1))[0]
+        for r, c in self.NEIGHBOUR_OFFSETS:
+            weight = nhood_arr[r, c]
+            if weight == 0:
+                if not self.neighbour_views:
+                    yield zero_index
+            elif weight == 1 or self.neighbour_views:
+                yield encoded[r, c]
+            else:
+                # weighted neighbour, count the scaled state values
+                yield self.encode_states(
+                    weight * self._neighbour_view(self.wrapping_grid)[r, c])
+
+    def max_neighbour_count(self):
+        """Return the largest number of neighbours in any one state a cell
+        can have, the size of the counts used to index a lookup table"""
+        if self.wrapsize == 1:
+            return len(self.NEIGHBOUR_OFFSETS)
+        if self.count_dtype.kind != 'u':
+            raise ValueError(
+                'Lookup tables need a neighbourhood of positive integers')
+        return int(self._kernel.sum())
+
+    def set_lookup_table(self, table, counted):
+        """Step the grid by looking up the next state of each cell in a
+        table instead of calling the transition function
+
+        Args:
+            table (numpy.ndarray): the index of the next state, indexed by
+                the index of the state of the cell followed by the number of
+                neighbours in each of the counted states, so of shape
+                (k, max_neighbour_count() + 1, ...)
+            counted (list): the indices of the states whose neighbour
+                counts index the table
+        """
+        table = np.asarray(table)
+        if table.shape[0] != self.num_states or table.ndim != len(counted) + 1:
+            raise ValueError(
+                'Lookup table of shape {t} does not match {k} states'.format(
+                    t=table.shape, k=self.num_states))
+        # translate the next state indices into state values up front
+        states = np.array(self.ca_config.states).astype(self.dtype)
+        self.lookup_values = states[table].ravel()
+        self.lookup_counted = list(counted)
+        # step through the flattened table for each index of the table
+        self.lookup_strides = [int(np.prod(table.shape[i + 1:]))
+                               for i in range(table.ndim)]
+        self._lookup_counts = np.zeros((len(counted),) + self.grid.shape,
+                                       dtype=self.count_dtype)
+        # the smallest type that indexes the whole table, with a buffer
+        # for each term of the index so nothing is allocated per step
+        index_dtype = np.min_scalar_type(max(self.lookup_values.size - 1, 0))
+        self._lookup_index = np.empty(self.grid.shape, dtype=index_dtype)
+        self._lookup_term = np.empty(self.grid.shape, dtype=index_dtype)
+
+    def _lookup_step(self):
+        """Calculate the next timestep with a single lookup into the
+        lookup table for every cell"""
+        self._lookup_next(self._back_grid)
+        self.swap_buffers()
+        self.refresh_wrap()
+
+    def _lookup_next(self, out):
+        """Look up the next state of every cell in the lookup table
+
+        Args:
+            out (numpy.ndarray): the array to write the next states into
+        """
+        counts = self.count_neighbours(out=self._lookup_counts,
+                                       states=self.lookup_counted)
+        index, term = self._lookup_index, self._lookup_term
+        # the state indices may be signed, if the grid is
+        np.multiply(self.encode_states(self.grid), self.lookup_strides[0],
+                    out=index, dtype=index.dtype, casting='unsafe')
+        for c, stride in zip(counts, self.lookup_strides[1:]):
+            if stride == 1:
+                np.add(index, c, out=index, dtype=index.dtype)
+                continue
+            np.multiply(c, stride, out=term, dtype=term.dtype)
+            np.add(index, term, out=index)
+        np.take(self.lookup_values, index, out=out)
+
+    def compile_transition(self):
+        """Compile the transition function into a lookup table by calling
+        it once on every combination of cell state and neighbour counts,
+        then step with the table instead of calling the function
+
+        Note:
+            Only transition functions that depend on nothing but the state
+            of the cell and its neighbour counts can be compiled. The
+            function is called again on a sample of the combinations, with
+            the neighbours in a random arrangement, to check it depends on
+            nothing else, and the table is checked against a step of the
+            function on the current grid and on a random grid. If any check
+            fails the function is run as normal.
+
+            Compiled tables are cached in temp/cache/lookup, keyed by a hash
+            of the description source and the parameters of the grid, and
+            are checked against the grids again when loaded.
+
+            A step with the table is timed against a step of the function,
+            which is kept if the table is no faster.
+
+        Returns:
+            bool: True if the transition function was compiled
+        """
+        k, n = self.num_states, self.max_neighbour_count()
+        if k * (n + 1)**k > self.MAX_LOOKUP_SIZE:
+            print("[WARNING] Too many states or neighbours to compile the " +
+                  "transition function, running it directly.")
+            return False
+        cache_path = self._lookup_cache_path()
+        table = None
+        if cache_path is not None and os.path.isfile(cache_path):
+            table = np.load(cache_path)
+            if not self._use_lookup_table(table):
+                table = None
+
+        if table is None:
+            table = self._probe_transition(n)
+            if table is None or not self._use_lookup_table(table):
+                print("[WARNING] The transition function does not depend " +
+                      "only on the cell state and neighbour counts, running " +
+                      "it directly.")
+                return False
+            if cache_path is not None:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                np.save(cache_path, table)
+        if not self._lookup_faster():
+            self.lookup_values = None
+            print("[WARNING] The compiled transition function is no faster " +
+                  "than the function itself, running it directly.")
+            return False
+        return True
+
+    def _use_lookup_table(self, table):
+        """Step with a lookup table of the next state for each cell state
+        and count of neighbours in every state, if it matches the
+        transition function
+
+        Note:
+            If every cell has the same number of neighbours the count of
+            the last state is implied by the others, so it is dropped
+            from the table and never counted
+
+        Args:
+            table (numpy.ndarray): the table, as made by _probe_transition
+
+        Returns:
+            bool: whether the table is used, False if it does not give the
+                same next states as the transition function
+        """
+        k = self.num_states
+        total = self._neighbour_total()
+        if total is None or k == 1:
+            self.set_lookup_table(table, list(range(k)))
+        else:
+            self.set_lookup_table(self._implied_table(table, total),
+                                  list(range(k - 1)))
+        if not self._verify_lookup_table():
+            self.lookup_values = None
+            return False
+        return True
+
+    def _neighbour_total(self):
+        """The number of neighbours every cell has counted in one of the
+        states, or None if it differs between cells (eg. at the edges of a
+        grid surrounded by cells in no state)"""
+        states = list(self.ca_config.states)
+        if any(s not in states for s in self._dead_states()):
+            return None
+        if self.wrapsize > 1:
+            return self.max_neighbour_count()
+        nhood_arr = self.neighbourhood.neighbourhood
+        total = 0
+        # as the neighbours are counted by _neighbour_indices
+        for r, c in self.NEIGHBOUR_OFFSETS:
+            weight = nhood_arr[r, c]
+            if weight == 0:
+                if not self.neighbour_views and 0 in states:
+                    total += 1
+            elif weight == 1 or self.neighbour_views:
+                total += 1
+            else:
+                return None
+        return total
+
+    @staticmethod
+    def _implied_table(table, total):
+        """Drop the count of the last state from a lookup table, for cells
+        whose neighbour counts always add up to total
+
+        Returns:
+            numpy.ndarray: the table indexed by the state of the cell and
+                the count of neighbours in all but the last state
+        """
+        k, n = table.shape[0], table.shape[1] - 1
+        counts = np.indices((n + 1,) * (k - 1)).reshape(k - 1, -1)
+        last = total - counts.sum(axis=0)
+        # combinations of the other counts that add up to more than the
+        # total never occur
+        valid = (last >= 0) & (last <= n)
+        implied = np.zeros((k,) + (n + 1,) * (k - 1), dtype=table.dtype)
+        index = (slice(None),) + tuple(counts[:, valid]) + (last[valid],)
+        implied.reshape(k, -1)[:, valid] = table[index]
+        return implied
+
+    def _lookup_faster(self):
+        """Whether a step with the lookup table is faster than a step of
+        the transition function, timing the fastest of LOOKUP_TIMINGS
+        steps of each on the current grid without changing it"""
+        out = np.empty_like(self.grid)
+        function_times, lookup_times = [], []
+        for i in range(self.LOOKUP_TIMINGS):
+            # the transition function may change the grid it is given
+            grid = np.copy(self.grid)
+            start = time.perf_counter()
+            ns = self.get_neighbour_states()
+            nc = self.count_neighbours(out=self._counts)
+            if self.transition_takes_out:
+                self.apply_transition(grid, ns, nc, out=out)
+            else:
+                self.apply_transition(grid, ns, nc)
+            function_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            self._lookup_next(out)
+            lookup_times.append(time.perf_counter() - start)
+        return min(lookup_times) < min(function_times)
+
+    def _probe_transition(self, max_count):
+        """Call the transition function on every state with every
+        combination of neighbour counts
+
+        Args:
+            max_count (int): the largest count of neighbours in a state
+
+        Returns:
+            numpy.ndarray: the lookup table of next state indices, or None
+                if the function is not deterministic or returns values
+                that are not states
+        """
+        k = self.num_states
+        # every combination of counts for the k states within the number
+        # of neighbours, combined with every cell state
+        counts = np.indices((max_count + 1,) * k).reshape(k, -1)
+        counts = counts[:, counts.sum(axis=0) <= max_count]
+        cell_states = np.repeat(np.arange(k), counts.shape[1])
+        cell_counts = np.tile(counts, k)
+        next_states = self._probe(cell_states, cell_counts)
+
+        # call again on a random sample, with the neighbours shuffled, to
+        # check the results depend on nothing but the state and counts
+        sample = np.random.choice(cell_states.size,
+                                  min(cell_states.size, self.PROBE_SAMPLE),
+                                  replace=False)
+        again = self._probe(cell_states[sample], cell_counts[:, sample],
+                            shuffle=True)
+        if (np.any(next_states == k) or
+                not np.array_equal(next_states[sample], again)):
+            return None
+        table = np.zeros((k,) + (max_count + 1,) * k, dtype=int)
+        table[(cell_states,) + tuple(cell_counts)] = next_states
+        return table
+
+    def _probe(self, cell_states, cell_counts, shuffle=False):
+        """Call the transition function on a single row of cells in the
+        given states with the given neighbour counts
+
+        Note:
+            The neighbour states given to the function are made up to
+            match the counts, filling the neighbourhood in order
+
+        Args:
+            cell_states (numpy.ndarray): the index of the state of each cell
+            cell_counts (numpy.ndarray): (k, cells) array of the count of
+                neighbours in each state for each cell
+            shuffle (bool): fill the neighbourhood of each cell in a random
+                order instead
+
+        Returns:
+            numpy.ndarray: the index of the next state of each cell, or k
+                where the next state is not one of the states
+        """
+        states = np.array(self.ca_config.states)
+        numcells = cell_states.size
+        grid = states[cell_states].astype(self.dtype).reshape(1, numcells)
+        nc = cell_counts.astype(self.count_dtype).reshape(-1, 1, numcells)
+
+        # fill the neighbours with states in order of the counts, any
+        # beyond the total count are outside of the grid
+        values = np.append(states, self.DEAD_WRAP_STATE).astype(float)
+        cumulative = np.cumsum(cell_counts, axis=0)
+        views = self.neighbour_views or self.wrapsize > 1
+        if views:
+            positions = self.active_neighbours()
+            size = self.neighbourhood.neighbourhood.shape
+            ns = np.full(size + (1, numcells), self.DEAD_WRAP_STATE,
+                         dtype=float)
+            r = self.wrapsize
+            ns[r, r, 0] = grid[0]
+        else:
+            positions = self.NEIGHBOUR_OFFSETS
+            ns = np.empty((len(positions), 1, numcells))
+        filled = np.arange(len(positions)).reshape(-1, 1)
+        neighbours = values[(cumulative[np.newaxis] <= filled[..., np.newaxis])
+                            .sum(axis=1)]
+        if shuffle:
+            order = np.argsort(np.random.rand(*neighbours.shape), axis=0)
+            neighbours = np.take_along_axis(neighbours, order, axis=0)
+        for p, position in enumerate(positions):
+            neighbour = neighbours[p]
+            if views:
+                ns[position][0] = neighbour
+            else:
+                ns[p, 0] = neighbour
+
+        out = np.empty_like(grid) if self.transition_takes_out else None
+        result = self.apply_transition(grid, ns, nc, out=out)
+        if result is None:
+            result = out
+        return self.encode_states(np.asarray(result, dtype=float))[0]
+
+    def _verify_lookup_table(self):
+        """Check the lookup table gives the same next state as the
+        transition function for the current grid and for a grid of random
+        states, which is then replaced by the current grid again"""
+        if not self._lookup_matches_transition():
+            return False
+        current = np.copy(self.grid)
+        states = np.array(self.ca_config.states).astype(self.dtype)
+        self.grid[:, :] = np.random.choice(states, self.grid.shape)
+        self.refresh_wrap()
+        try:
+            return self._lookup_matches_transition()
+        finally:
+            self.grid[:, :] = current
+            self.refresh_wrap()
+
+    def _lookup_matches_transition(self):
+        """Whether the lookup table gives the same next state as the
+        transition function for the current grid"""
+        ns = self.get_neighbour_states()
+        nc = self.count_neighbours()
+        out = np.empty_like(self.grid) if self.transition_takes_out else None
+        expected = self.apply_transition(np.copy(self.grid), ns, nc, out=out)
+        if expected is None:
+            expected = out
+        looked_up = np.empty_like(self.grid)
+        self._lookup_next(looked_up)
+        return np.array_equal(looked_up, expected)
+
+    def _lookup_cache_path(self):
+        """Return the path of the cached lookup table for this description
+        and grid parameters, or None if it cannot be cached"""
+        try:
+            with open(self.ca_config.filepath, 'rb') as f:
+                source = f.read()
+            args = pickle.dumps(self.additional_args, -1)
+        except (OSError, TypeError, AttributeError, pickle.PicklingError):
+            return None
+        name = getattr(self.transition_func, '__qualname__', None)
+        if name is None:
+            return None
+        key = hashlib.sha1(source)
+        nhood = np.asarray(self.neighbourhood.neighbourhood, dtype=float)
+        for part in (repr(tuple(self.ca_config.states)), repr(nhood.shape),
+                     nhood.tobytes(), repr(self.neighbour_views), name, args):
+            key.update(part if type(part) is bytes else part.encode())
+        cache_dir = os.path.join(os.path.dirname(self.ca_config.path),
+                                 'cache', 'lookup')
+        return os.path.join(cache_dir, '{}.npy'.format(key.hexdigest()))
+
+    def swap_buffers(self):
+        """Swap the front and back wrapping grids, making the state
+        written into the back grid the current grid"""
+        self.wrapping_grid, self._back_wrapping_grid = (
+            self._back_wrapping_grid, self.wrapping_grid)
+        self.grid, self._back_grid = self._back_grid, self.grid
 
     def step(self):
         """ Calculate the next timestep by applying the transistion function
-        and save the new state to grid """
-        # collect the 8 arrays of neighbour states
+        and save the new state to grid
+
+        Note:
+            If the transition function takes an 'out' argument the next
+            state is written into the back grid which is then swapped with
+            the current one, so with neighbour views nothing is allocated
+            per step. Otherwise the returned grid is copied into the
+            current grid, keeping it a view into the wrapping grid.
+        """
+        if self.bitboard is not None:
+            self._bitboard_step()
+            return
+        if self.lookup_values is not None:
+            self._lookup_step()
+            return
+        # collect the 8 arrays of neighbour states (or views of them)
         ns = self.get_neighbour_states()
         # calculate the number of neighbours each cell has of each state
-        # return n arrays where n is the number of states
-        nc = self.count_neighbours(ns)
+        # return a (n, rows, cols) array where n is the number of states
+        nc = self.count_neighbours(out=self._counts)
 
         # apply the user's transition function
         # passing in the states and counts to allow complex rules
         # if the user supplied any addition arguments, pass them here
-        if self.additional_args is None:
-            self.grid = self.transition_func(self.grid, ns, nc)
+        if self.transition_takes_out:
+            newgrid = self.apply_transition(self.grid, ns, nc,
+                                            out=self._back_grid)
+            if newgrid is not None and newgrid is not self._back_grid:
+                self.store_next_states(self._back_grid, newgrid)
+            self.swap_buffers()
         else:
-            self.grid = self.transition_func(self.grid, ns, nc,
-                                             *self.additional_args)
+            newgrid = self.apply_transition(self.grid, ns, nc)
+            if newgrid is not self.grid:
+                self.store_next_states(self.grid, newgrid)
         # refresh wrapping border
         self.refresh_wrap()
 
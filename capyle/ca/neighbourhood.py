@@ -4,16 +4,24 @@ import numpy as np
 class Neighbourhood(object):
 
     def __init__(self, nhood, dims=2):
-        """Create a Neighbourhood object for use with the Grid objects"""
+        """Create a Neighbourhood object for use with the Grid objects
+
+        Note:
+            2D neighbourhoods are square with sides of 2r + 1 for a radius
+            r of at least 1, any other entries than 0 and 1 are weights
+            applied to the neighbours when counting
+        """
         if not (dims == 2 or dims == 1):
             raise ValueError(
                 "Unsuported number of dimensions, only 1D or 2D CA supported")
         if dims == 2:
-            # 3,3 neighbourhood
+            # (2r+1),(2r+1) neighbourhood
             self.neighbourhood = self._prepare2D(nhood)
         else:
             # 3, Neighbourhood
             self.neighbourhood = self._prepare1D(nhood)
+        # distance from the center cell to the edge of the neighbourhood
+        self.radius = self.neighbourhood.shape[0] // 2
 
     def __str__(self):
         """Return the string version of the neighbourhood array
@@ -47,15 +55,10 @@ class Neighbourhood(object):
             raise ValueError(
                 "Neighbourhood must have a center to represent the cell")
 
-        # scale the neighbourhood to the correct size of 3x3
-        # [1,1,1] -> [[0,0,0],[1,1,1],[0,0,0]]      #increase
-        # nhood.shape = 5,5 -> nhood.shape = 3,3    #decrease
-        if nhood.shape > (3, 3):
-            print("[WARNING] Neighbourhood too large, scaling to 3x3...")
-            nhood = self._reduce_to_3x3(nhood)
-        elif nhood.shape < (3, 3):
-            nhood = self._increase_to_3x3(nhood)
-        return nhood
+        # pad the neighbourhood to a square of at least 3x3
+        # [1,1,1] -> [[0,0,0],[1,1,1],[0,0,0]]
+        # nhood.shape = 3,5 -> nhood.shape = 5,5
+        return self._pad_to_square(nhood)
 
     def _prepare1D(self, nhood):
         """Validate and prepare a neighbourhood for a 1D CA"""
@@ -95,47 +98,23 @@ class Neighbourhood(object):
             return True
         return False
 
-    def _reduce_to_3x3(self, nhood, fullmatrix=True):
-        """
-        With the fullmatrix == True, the array will be reduced to 3x3,
-        otherwise the appropriate dimensions will be reduced
-        eg. [[1,1,1,1,1]] -> [[1,1,1]]
+    def _pad_to_square(self, nhood):
+        """Pad a neighbourhood with zeros around the edges to make it
+        square, with sides of at least 3
+
+        Example:
+            [1,1,1] -> [[0,0,0],[1,1,1],[0,0,0]]
+            [[1,1,1,1,1]] -> 5x5 with [1,1,1,1,1] as the center row
         """
+        if nhood.ndim == 1:
+            # a single row is the center row of the neighbourhood
+            nhood = nhood.reshape(1, -1)
         rows, cols = nhood.shape
-        if fullmatrix and (rows == cols == 3):
-            return nhood
-        elif not fullmatrix and cols <= 3 and rows <= 3:
-            return nhood
-        if rows > 3:
-            nhood = nhood[1:-1]
-        if cols > 3:
-            nhood = nhood[:, 1:-1]
-        return self._reduce_to_3x3(nhood, fullmatrix)
-
-    def _increase_to_3x3(self, nhood):
-        # Only valid shapes at this point either have a 3 or 1
-        # If one dimension greater than 3 then reduce to 3
-        if any(s > 3 for s in nhood.shape):
-            nhood = self._reduce_to_3x3(nhood, fullmatrix=False)
-
-        new_col = np.zeros((3, 1))
-        new_row = np.zeros((3))
-
-        if nhood.shape == (1, 3):
-            nhood = nhood[0]
-            shape = nhood.shape
-        if nhood.shape == (3,):
-            nhood = np.vstack((nhood, new_row))
-            nhood = np.vstack((new_row, nhood))
-            return nhood
-
-        if nhood.shape == (3, 1):
-            nhood = np.hstack((nhood, new_col))
-            nhood = np.hstack((new_col, nhood))
-            return nhood
-
-        if nhood.shape == (1,) or nhood.shape == (1, 1):
-            return np.zeros((3, 3))
+        size = max(3, rows, cols)
+        square = np.zeros((size, size), dtype=nhood.dtype)
+        top, left = (size - rows) // 2, (size - cols) // 2
+        square[top:top + rows, left:left + cols] = nhood
+        return square
 
     def _type_neighbourhood(self, nhood):
         """Checks the type of the neighbourhood provided
@@ -149,3 +128,34 @@ class Neighbourhood(object):
             return np.array(nhood)
         # else return numpy array
         return nhood
+
+
+def radius_nhood(radius, shape="MOORE"):
+    """Create a 2D neighbourhood array of the given radius
+
+    Args:
+        radius (int): the distance from the center cell to the edge
+        shape (str): "MOORE" for the full square, "VON NEUMANN" for cells
+            within a manhattan distance of the radius, or "CIRCULAR" for
+            cells within a euclidean distance of the radius
+
+    Returns:
+        numpy.ndarray: (2r+1, 2r+1) array of 0s and 1s
+
+    Example:
+        radius_nhood(1, "VON NEUMANN") -> [[0,1,0],[1,1,1],[0,1,0]]
+    """
+    radius = int(radius)
+    if radius < 1:
+        raise ValueError("Neighbourhood radius must be 1 or more")
+    offsets = np.arange(-radius, radius + 1)
+    rows, cols = np.meshgrid(offsets, offsets, indexing='ij')
+    if shape == "MOORE":
+        nhood = np.ones(rows.shape, dtype=bool)
+    elif shape == "VON NEUMANN":
+        nhood = (np.abs(rows) + np.abs(cols)) <= radius
+    elif shape == "CIRCULAR":
+        nhood = (rows**2 + cols**2) <= radius**2
+    else:
+        raise ValueError("Unknown neighbourhood shape {}".format(shape))
+    return nhood.astype(int)
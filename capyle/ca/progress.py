@@ -0,0 +1,84 @@
+import os
+import numpy as np
+
+
+class RunProgress(object):
+    """The progress of a run, shared through a small file mapped into
+    memory by the run and the process following it (eg. the GUI), so the
+    run needs no window of its own to show its progress or be cancelled
+
+    Note:
+        Grid.run reports the generations run and the current generations
+        per second at most every Grid.PROGRESS_INTERVAL seconds, and checks
+        whether the run has been cancelled as often. A cancelled run stops
+        at the generation it is on and returns the frames recorded so far.
+
+        The file is only followed by runs whose config names it in
+        progress_path, as set by utils.run_ca.
+
+    Example:
+        progress = RunProgress.create(path)
+        # ... start the run, then later
+        print(progress.generation(), progress.rate())
+        progress.cancel()
+    """
+    # the fields of the file, each a float64
+    GENERATION, TOTAL, RATE, CANCELLED = range(4)
+
+    def __init__(self, path, mode='r+'):
+        """Map the progress file
+
+        Args:
+            path (str): the file to map
+            mode (str): 'r+' to map an existing file, 'w+' to create it
+        """
+        self.path = path
+        self.fields = np.memmap(path, dtype=np.float64, mode=mode,
+                                shape=(4,))
+
+    @classmethod
+    def create(cls, path):
+        """Create the progress file of a run about to be started"""
+        return cls(path, 'w+')
+
+    @classmethod
+    def open(cls, path):
+        """Map the progress file of a run, or None if there is none"""
+        if path is None or not os.path.isfile(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError):
+            return None
+
+    def report(self, generation, total, rate):
+        """Record the progress of the run, called by Grid.run
+
+        Args:
+            generation (int): the generations run so far
+            total (int): the generations the run is to run
+            rate (float): the generations run per second lately
+        """
+        self.fields[self.TOTAL] = total
+        self.fields[self.RATE] = rate
+        self.fields[self.GENERATION] = generation
+
+    def generation(self):
+        """The generations run so far"""
+        return int(self.fields[self.GENERATION])
+
+    def total(self):
+        """The generations the run is to run, 0 if not yet known"""
+        return int(self.fields[self.TOTAL])
+
+    def rate(self):
+        """The generations run per second lately"""
+        return float(self.fields[self.RATE])
+
+    def cancel(self):
+        """Ask the run to stop after the generation it is on"""
+        self.fields[self.CANCELLED] = 1
+
+    def cancelled(self):
+        """Whether the run has been asked to stop"""
+        return bool(self.fields[self.CANCELLED])
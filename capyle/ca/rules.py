@@ -0,0 +1,197 @@
+import numpy as np
+from capyle.utils import int_to_digits
+
+
+class LifeLikeRule(object):
+    """An outer totalistic rule given as a rule string, in Life-like B/S
+    notation (eg. "B3/S23") or Generations notation (eg. "B2/S/3")
+
+    Note:
+        State 0 is dead and state 1 is alive. With Generations rules
+        states 2 to C-1 are dying, an alive cell that does not survive
+        moves to state 2 and each dying state moves to the next, the last
+        returning to dead. Only alive neighbours are counted.
+
+        The rule can be used as a transition function for Grid2D, or set
+        as CAConfig.rule_string, in which case each generation is a single
+        lookup into the table built by table().
+    """
+    DEAD, ALIVE = 0, 1
+
+    def __init__(self, rulestring):
+        """Parse the rule string
+
+        Args:
+            rulestring (str): the rule in B/S notation, optionally followed
+                by the number of states for Generations rules. Rules
+                without the B and S letters are read as S/B, eg. "23/3"
+        """
+        self.rulestring = rulestring
+        self.birth, self.survival, self.num_states = parse_rule(rulestring)
+
+    def __str__(self):
+        return self.rulestring
+
+    def table(self, max_count=8):
+        """Build the lookup table of next states
+
+        Args:
+            max_count (int): the largest number of alive neighbours a cell
+                can have
+
+        Returns:
+            numpy.ndarray: (num_states, max_count + 1) array of the next
+                state indexed by [state, number of alive neighbours]
+        """
+        table = np.zeros((self.num_states, max_count + 1), dtype=int)
+        births = [b for b in self.birth if b <= max_count]
+        survivals = [s for s in self.survival if s <= max_count]
+        # dead cells with the right number of alive neighbours are born
+        table[self.DEAD, births] = self.ALIVE
+        # alive cells that do not survive die, or start dying
+        table[self.ALIVE] = 2 if self.num_states > 2 else self.DEAD
+        table[self.ALIVE, survivals] = self.ALIVE
+        # dying cells move on to the next state, the last to dead
+        for d in range(2, self.num_states):
+            table[d] = (d + 1) % self.num_states
+        return table
+
+    def __call__(self, grid, neighbourstates, neighbourcounts):
+        """Apply the rule as an ordinary transition function, the states
+        must be 0 to num_states - 1"""
+        live_neighbours = neighbourcounts[self.ALIVE]
+        table = self.table(int(np.max(live_neighbours)))
+        grid[:, :] = table[grid.astype(int), live_neighbours.astype(int)]
+        return grid
+
+
+class WolframRule(object):
+    """A one dimensional rule given by its Wolfram code, for any number of
+    states and neighbourhood radius
+
+    Note:
+        The rule number written in base k (the number of states) gives
+        the next state of a cell for each window of 2r + 1 cell states,
+        read as a base k number with the leftmost cell as the most
+        significant digit. Elementary rules (eg. rule 30) are k = 2, r = 1.
+
+        Totalistic rules instead give the next state for each sum of the
+        states in the window, so have (2r + 1)(k - 1) + 1 digits.
+
+        States are taken by index, so the first state in CAConfig.states
+        is digit 0. Setting the rule as the transition function of a
+        Grid1D steps each generation with a single lookup into table().
+    """
+
+    def __init__(self, rule_num, num_states=2, radius=1, totalistic=False):
+        """Check the rule number fits the rule space
+
+        Args:
+            rule_num (int): the Wolfram code, of any size
+            num_states (int): the number of states k
+            radius (int): the number of cells either side of a cell in
+                its neighbourhood
+            totalistic (bool): whether the rule depends only on the sum
+                of the states
+        """
+        if num_states < 2 or radius < 1:
+            raise ValueError(
+                "Rules need at least 2 states and a radius of at least 1")
+        self.rule_num = int(rule_num)
+        self.num_states = num_states
+        self.radius = radius
+        self.totalistic = totalistic
+        n = num_rules(num_states, radius, totalistic)
+        if not 0 <= self.rule_num < n:
+            raise ValueError("Only 0-{m} valid, {val} supplied".format(
+                m=n - 1, val=self.rule_num))
+
+    def __str__(self):
+        return "Rule {n}".format(n=self.rule_num)
+
+    def table_size(self):
+        """The number of digits of the rule, one per window of states (or
+        per sum of states when totalistic)"""
+        return table_size(self.num_states, self.radius, self.totalistic)
+
+    def table(self):
+        """Build the lookup table of next state indices
+
+        Returns:
+            numpy.ndarray: the next state index for each window of states,
+                indexed by the window read as a base k number (or the sum
+                of the window when totalistic)
+        """
+        return int_to_digits(self.rule_num, self.num_states,
+                             self.table_size())
+
+    def __call__(self, grid, neighbourstates, neighbourcounts):
+        """Apply the rule as an ordinary transition function to the 2r + 1
+        neighbour state arrays, the states must be 0 to num_states - 1"""
+        index = np.zeros(len(neighbourstates[0]), dtype=int)
+        for n in neighbourstates:
+            if not self.totalistic:
+                index *= self.num_states
+            index += n.astype(int)
+        return self.table()[index]
+
+
+def table_size(num_states, radius=1, totalistic=False):
+    """The number of entries in the lookup table of a 1D rule"""
+    width = 2 * radius + 1
+    if totalistic:
+        return width * (num_states - 1) + 1
+    return num_states ** width
+
+
+def num_rules(num_states, radius=1, totalistic=False):
+    """The number of distinct 1D rules, one more than the largest rule
+    number
+
+    Example:
+        (2, 1) -> 256
+        (3, 1, True) -> 2187
+    """
+    return num_states ** table_size(num_states, radius, totalistic)
+
+
+def parse_rule(rulestring):
+    """Parse a Life-like or Generations rule string
+
+    Args:
+        rulestring (str): the rule
+
+    Returns:
+        (set, set, int): the neighbour counts a dead cell is born with, the
+            counts an alive cell survives with and the number of states
+
+    Example:
+        "B3/S23" -> ({3}, {2, 3}, 2)
+        "23/3" -> ({3}, {2, 3}, 2)
+        "B2/S/3" -> ({2}, set(), 3)
+        "B2/S/C3" -> ({2}, set(), 3)
+    """
+    parts = rulestring.strip().upper().replace(' ', '').split('/')
+    if len(parts) not in (2, 3):
+        raise ValueError("Invalid rule string {}".format(rulestring))
+    num_states = 2
+    if len(parts) == 3:
+        count = parts.pop().lstrip('CG')
+        if not count.isdigit() or int(count) < 2:
+            raise ValueError(
+                "Invalid number of states in rule {}".format(rulestring))
+        num_states = int(count)
+
+    letters = [p[:1] for p in parts]
+    if sorted(letters) == ['B', 'S']:
+        counts = {p[:1]: p[1:] for p in parts}
+        birth, survival = counts['B'], counts['S']
+    elif not any(l.isalpha() for l in letters):
+        # no letters, survival first
+        survival, birth = parts
+    else:
+        raise ValueError("Invalid rule string {}".format(rulestring))
+
+    if not (birth + survival).isdigit() and (birth + survival) != '':
+        raise ValueError("Invalid rule string {}".format(rulestring))
+    return ({int(c) for c in birth}, {int(c) for c in survival}, num_states)
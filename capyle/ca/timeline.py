@@ -0,0 +1,1232 @@
+import os
+import json
+import pickle
+import struct
+import numpy as np
+
+# start of every timeline file, followed by the format version
+MAGIC = b'\x93CAPYLE'
+FORMAT_VERSION = (1, 1)
+# the header is padded so the data starts on a multiple of this
+HEADER_ALIGN = 64
+
+
+class _Generations(object):
+    """Numbers the frames of a timeline by the generation each records,
+    either evenly spaced or listed frame by frame"""
+    stride = 1
+    start = 0
+    # the generation of each frame, if not evenly spaced
+    generations = None
+
+    def set_generations(self, stride=1, start=0, generations=None):
+        """Set the generation of each frame
+
+        Args:
+            stride (int): the number of generations between frames
+            start (int): the generation of the first frame
+            generations (list): the generation of each frame, overriding
+                the stride and start
+        """
+        self.stride = stride
+        self.start = start
+        if generations is not None:
+            generations = np.array(generations, dtype=np.int64)
+        self.generations = generations
+
+    def generation(self, i):
+        """The generation number of frame i"""
+        if self.generations is not None:
+            return int(self.generations[i])
+        if i < 0:
+            i += len(self)
+        return self.start + i * self.stride
+
+    def _sliced_generations(self, i):
+        """The stride, start and generations of the frames in a slice"""
+        first, _, step = i.indices(len(self))
+        if step < 1:
+            raise IndexError("Timelines can only be sliced forwards")
+        if self.generations is not None:
+            return 1, 0, self.generations[i]
+        return self.stride * step, self.generation(first), None
+
+    def _truncate_generations(self, num_frames):
+        """Number only the first num_frames frames"""
+        if self.generations is not None:
+            self.generations = self.generations[:num_frames]
+
+    def _generations_header(self):
+        """The generations of the frames as fields of the file header"""
+        generations = self.generations
+        if generations is not None:
+            generations = generations.tolist()
+        return {'stride': self.stride, 'start': self.start,
+                'generations': generations}
+
+
+class Timeline(_Generations):
+    """The grid state at each recorded generation, stored as one
+    contiguous (frames, rows, cols) array
+
+    Note:
+        Indexing a frame or slicing the timeline returns views of the
+        array rather than copies. Saved timelines are loaded by mapping
+        the file into memory, so loading does not read the frames until
+        they are accessed.
+    """
+    # the file a timeline created with Timeline.create is recorded into
+    stream_path = None
+    # the number of frames recorded into that file so far, mapped from a
+    # file alongside it for a LiveTimeline to follow
+    published = None
+
+    def __init__(self, frames, states=None, stride=1, start=0,
+                 generations=None):
+        """Wrap an array of frames
+
+        Args:
+            frames (numpy.ndarray): the (frames, rows, cols) array
+            states (list): the states of the CA, if known
+            stride (int): the number of generations between frames
+            start (int): the generation of the first frame
+            generations (list): the generation of each frame, if they are
+                not evenly spaced
+        """
+        self.frames = frames
+        self.states = None if states is None else list(states)
+        self.set_generations(stride, start, generations)
+
+    @classmethod
+    def empty(cls, num_frames, shape, dtype, states=None, generations=None):
+        """Allocate a timeline to be filled in as the CA is run"""
+        frames = np.empty((num_frames,) + tuple(shape), dtype=dtype)
+        return cls(frames, states, generations=generations)
+
+    @classmethod
+    def create(cls, path, num_frames, shape, dtype, states=None,
+               generations=None):
+        """Preallocate a timeline file and map it into memory, so the CA
+        can be run straight into the file rather than kept in memory
+
+        Note:
+            The file is created alongside the given path and only packed
+            or renamed into place when the timeline is saved, so a
+            timeline already mapped from the path (eg. by the GUI) is left
+            intact. The number of frames recorded so far is kept in
+            another file until then, so a LiveTimeline can show the frames
+            as they are run.
+
+        Args:
+            path (str): the path the timeline is saved to
+            num_frames (int): the number of frames to allocate
+            shape ((int, int)): the rows and columns of each frame
+            dtype (numpy.dtype): the type of the grid
+            states (list): the states of the CA, if known
+            generations (list): the generation of each frame, if not
+                every generation is recorded
+
+        Returns:
+            Timeline: the timeline backed by the mapped file
+        """
+        dtype = np.dtype(dtype)
+        shape = (num_frames,) + tuple(shape)
+        timeline = cls(None, states, generations=generations)
+        header = timeline._generations_header()
+        header.update({'kind': 'frames', 'shape': shape, 'dtype': dtype})
+        text, _ = timeline_header([('frames', dtype, shape)], states,
+                                  header)
+        temp_path = path + '.part'
+        with open(temp_path, 'wb') as f:
+            f.write(text)
+            # sized up front, without writing the frames
+            f.truncate(len(text) + int(np.prod(shape)) * dtype.itemsize)
+        timeline.frames = np.memmap(temp_path, dtype=dtype, mode='r+',
+                                    offset=len(text), shape=shape)
+        timeline.stream_path = temp_path
+        # created last, as a LiveTimeline waits for it
+        timeline.published = np.memmap(temp_path + '.count', dtype=np.int64,
+                                       mode='w+', shape=(1,))
+        return timeline
+
+    @classmethod
+    def reopen(cls, stream_path):
+        """Map a timeline file being recorded back into memory, to carry on
+        recording into it (eg. when resuming a run)
+
+        Args:
+            stream_path (str): the stream_path of the timeline created
+
+        Returns:
+            Timeline: the timeline backed by the mapped file
+        """
+        with open(stream_path, 'rb') as f:
+            header, start = read_timeline_header(f)
+        _, dtype, shape, offset = header['arrays'][0]
+        frames = np.memmap(stream_path, dtype=np.dtype(dtype), mode='r+',
+                           offset=start + offset, shape=tuple(shape))
+        timeline = cls(frames, header['states'], header['stride'],
+                       header['start'], header.get('generations'))
+        timeline.stream_path = stream_path
+        if os.path.isfile(stream_path + '.count'):
+            timeline.published = np.memmap(stream_path + '.count',
+                                           dtype=np.int64, mode='r+',
+                                           shape=(1,))
+        return timeline
+
+    def __len__(self):
+        return self.frames.shape[0]
+
+    def __getitem__(self, i):
+        """Frame i, or a timeline of the frames in a slice"""
+        if isinstance(i, slice):
+            return Timeline(self.frames[i], self.states,
+                            *self._sliced_generations(i))
+        return self.frames[i]
+
+    def __setitem__(self, i, frame):
+        self.frames[i] = frame
+        if self.published is not None:
+            # frames are recorded in order, so those up to i are written
+            if isinstance(i, slice):
+                end = i.indices(len(self))[1]
+            else:
+                end = i % len(self) + 1
+            if end > self.published[0]:
+                self.published[0] = end
+
+    def __iter__(self):
+        return iter(self.frames)
+
+    def frame(self, i):
+        """Frame i, for displaying"""
+        return self.frames[i]
+
+    def truncate(self, num_frames):
+        """Keep only the first num_frames frames (eg. those recorded before
+        a run was cancelled)
+
+        Note:
+            A timeline being streamed to a file has the header of the file
+            rewritten in place and the rest of the file cut off, so the
+            frames are not copied.
+        """
+        self._truncate_generations(num_frames)
+        if self.stream_path is None:
+            self.frames = self.frames[:num_frames]
+            return
+        shape = (num_frames,) + self.frames.shape[1:]
+        dtype = self.frames.dtype
+        self.frames.flush()
+        with open(self.stream_path, 'rb') as f:
+            _, start = read_timeline_header(f)
+        header = self._generations_header()
+        header.update({'kind': 'frames', 'shape': shape, 'dtype': dtype})
+        text, _ = timeline_header([('frames', dtype, shape)], self.states,
+                                  header, length=start)
+        # unmapped before the file is cut short
+        self.frames = None
+        with open(self.stream_path, 'r+b') as f:
+            f.write(text)
+            f.truncate(start + num_frames * int(np.prod(shape[1:])) *
+                       dtype.itemsize)
+        if num_frames == 0:
+            self.frames = np.empty(shape, dtype=dtype)
+        else:
+            self.frames = np.memmap(self.stream_path, dtype=dtype,
+                                    mode='r+', offset=start, shape=shape)
+
+    def save(self, path, pack=True):
+        """Save the timeline to a file loaded by load_timeline
+
+        Note:
+            If the states are known and every cell is in one of them, the
+            frames are saved as state indices packed into the fewest bits
+            that hold every state, which load_timeline returns as a
+            PackedTimeline. A timeline created with Timeline.create is
+            packed from its file a frame at a time, and the file removed,
+            or if it can not be packed the file is renamed into place as
+            it is.
+
+        Args:
+            path (str): the file to save to
+            pack (bool): pack the frames if possible
+        """
+        if self.stream_path is not None:
+            # a timeline truncated to no frames is no longer mapped
+            if isinstance(self.frames, np.memmap):
+                self.frames.flush()
+            if (pack and self.states is not None and
+                    PackedTimeline.pack_file(self, path)):
+                # the frames stay mapped (eg. by a LiveTimeline) until the
+                # last mapping is gone
+                _remove(self.stream_path)
+            else:
+                os.replace(self.stream_path, path)
+            if self.published is not None:
+                _remove(self.stream_path + '.count')
+                self.published = None
+            self.stream_path = None
+            return
+        if pack and self.states is not None:
+            packed = PackedTimeline.pack(self)
+            if packed is not None:
+                packed.save(path)
+                return
+        header = self._generations_header()
+        header['kind'] = 'frames'
+        write_timeline(path, [('frames', self.frames)], self.states, header)
+
+
+class LiveTimeline(Timeline):
+    """The frames recorded so far by a run streaming its timeline (with
+    Timeline.create), which may be in another process
+
+    Note:
+        The frames are mapped read only from the file the run records
+        into, and the timeline grows as the run publishes each frame, so
+        the frames can be played back while later ones are run. The mapped
+        file stays valid once the run has saved it, whether the file was
+        renamed or packed into a new file and removed.
+
+    Example:
+        live = LiveTimeline.open(ca_config.timeline_path)
+        if live is not None:
+            latest = live[-1]
+    """
+
+    def __init__(self, stream_path):
+        """Map a timeline file being recorded
+
+        Args:
+            stream_path (str): the file the run is recording into
+        """
+        with open(stream_path, 'rb') as f:
+            header, start = read_timeline_header(f)
+        _, dtype, shape, offset = header['arrays'][0]
+        self.mapped = np.memmap(stream_path, dtype=np.dtype(dtype), mode='r',
+                                offset=start + offset, shape=tuple(shape))
+        self.count = np.memmap(stream_path + '.count', dtype=np.int64,
+                               mode='r', shape=(1,))
+        self.states = header['states']
+        self.set_generations(header['stride'], header['start'],
+                             header.get('generations'))
+
+    @classmethod
+    def open(cls, path):
+        """Follow the run recording the timeline to be saved to path
+
+        Returns:
+            LiveTimeline: the frames recorded so far, or None if the run
+                has not started recording
+        """
+        stream_path = path + '.part'
+        if not os.path.isfile(stream_path + '.count'):
+            return None
+        try:
+            return cls(stream_path)
+        except (OSError, ValueError):
+            # caught between creating the files and sizing them
+            return None
+
+    @staticmethod
+    def clear(path):
+        """Forget a run that stopped while recording the timeline to be saved
+        to path, so open waits for the next run to start recording"""
+        _remove(path + '.part.count')
+
+    @property
+    def frames(self):
+        """The frames recorded so far"""
+        return self.mapped[:self.recorded()]
+
+    def recorded(self):
+        """The number of frames recorded so far"""
+        return min(int(self.count[0]), self.num_frames())
+
+    def num_frames(self):
+        """The number of frames the run records in all"""
+        return self.mapped.shape[0]
+
+    def complete(self):
+        """Whether every frame has been recorded"""
+        return self.recorded() == self.num_frames()
+
+
+def _remove(path):
+    """Remove a file if it exists, leaving it if it is in use"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class PackedTimeline(_Generations):
+    """A timeline with each frame stored as the index of the state of
+    each cell, packed into ceil(log2(number of states)) bits per cell
+
+    Note:
+        Frames are unpacked when they are accessed, so a mapped file of
+        packed frames only reads and unpacks the frames displayed. A two
+        state CA takes one bit per cell.
+    """
+    # packs an array of states into a frame, made when first needed
+    _pack_frame = None
+
+    def __init__(self, packed, shape, dtype, states, stride=1, start=0,
+                 generations=None):
+        """Wrap the packed frames
+
+        Args:
+            packed (numpy.ndarray): (frames, bytes per frame) array of the
+                packed state indices
+            shape ((int, int)): the rows and columns of each frame
+            dtype (numpy.dtype): the type of the unpacked frames
+            states (list): the states of the CA, state i packed as i
+            stride (int): the number of generations between frames
+            start (int): the generation of the first frame
+            generations (list): the generation of each frame, if they are
+                not evenly spaced
+        """
+        self.packed = packed
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.states = list(states)
+        self.bits = state_bits(len(self.states))
+        self.set_generations(stride, start, generations)
+        self._values = np.array(self.states).astype(self.dtype)
+        self._frame = None
+
+    @classmethod
+    def empty(cls, num_frames, shape, dtype, states, generations=None):
+        """Allocate a packed timeline to be filled in as the CA is run,
+        for a grid whose states are already packed (eg. a bitboard)"""
+        cells = int(np.prod(shape))
+        bits = state_bits(len(states))
+        packed = np.zeros((num_frames, -(-cells * bits // 8)),
+                          dtype=np.uint8)
+        return cls(packed, shape, dtype, states, generations=generations)
+
+    @staticmethod
+    def _frame_packer(states, dtype):
+        """The number of bits per cell and a function packing a frame of
+        the given type into bytes, which returns None for a frame with
+        cells not in the states
+
+        Returns:
+            (int, function): the bits and the function, or None if packing
+                would not save space
+        """
+        dtype = np.dtype(dtype)
+        states = np.array(states)
+        bits = state_bits(len(states))
+        if bits >= dtype.itemsize * 8:
+            return None
+        order = np.argsort(states, kind='stable')
+        sorted_states = states[order]
+        # states 0 to k-1 are their own indices
+        are_indices = (dtype.kind in 'iu' and
+                       np.array_equal(states, np.arange(len(states))))
+
+        def pack_frame(frame):
+            flat = frame.ravel()
+            if are_indices:
+                if flat.size and (flat.min() < 0 or
+                                  flat.max() >= len(states)):
+                    return None
+                indices = flat
+            else:
+                pos = np.minimum(np.searchsorted(sorted_states, flat),
+                                 len(states) - 1)
+                if not np.array_equal(sorted_states[pos], flat):
+                    return None
+                indices = order[pos]
+            return pack_states(indices, bits)
+        return bits, pack_frame
+
+    @classmethod
+    def pack(cls, timeline):
+        """Pack the frames of a timeline
+
+        Returns:
+            PackedTimeline: the packed timeline, or None if some cells are
+                not in the states or packing would not save space
+        """
+        frames = timeline.frames
+        packer = cls._frame_packer(timeline.states, frames.dtype)
+        if packer is None:
+            return None
+        bits, pack_frame = packer
+        cells = int(np.prod(frames.shape[1:]))
+        packed = np.empty((len(frames), -(-cells * bits // 8)),
+                          dtype=np.uint8)
+        for i, frame in enumerate(frames):
+            packed_frame = pack_frame(frame)
+            if packed_frame is None:
+                return None
+            packed[i] = packed_frame
+        return cls(packed, frames.shape[1:], frames.dtype, timeline.states,
+                   timeline.stride, timeline.start, timeline.generations)
+
+    @classmethod
+    def pack_file(cls, timeline, path):
+        """Pack the frames of a timeline straight into a timeline file a
+        frame at a time, so a timeline recorded to disk is packed without
+        being read into memory
+
+        Returns:
+            bool: whether the timeline was saved, not being if some cells
+                are not in the states or packing would not save space
+        """
+        frames = timeline.frames
+        packer = cls._frame_packer(timeline.states, frames.dtype)
+        if packer is None:
+            return False
+        bits, pack_frame = packer
+        cells = int(np.prod(frames.shape[1:]))
+        packed_shape = (len(frames), -(-cells * bits // 8))
+        header = timeline._generations_header()
+        header.update({'kind': 'packed', 'bits': bits,
+                       'dtype': frames.dtype, 'shape': frames.shape})
+        text, offsets = timeline_header(
+            [('packed', np.dtype(np.uint8), packed_shape)], timeline.states,
+            header)
+        # not path + '.part', which may be the file being packed
+        temp_path = path + '.packing'
+        with open(temp_path, 'wb') as f:
+            f.write(text)
+            f.seek(len(text) + offsets[0])
+            for frame in frames:
+                packed_frame = pack_frame(frame)
+                if packed_frame is None:
+                    break
+                f.write(packed_frame.tobytes())
+            else:
+                packed_frame = True
+        if packed_frame is None:
+            _remove(temp_path)
+            return False
+        os.replace(temp_path, path)
+        return True
+
+    def __len__(self):
+        return self.packed.shape[0]
+
+    def _unpack(self, i, out):
+        """Unpack frame i into an array"""
+        cells = out.size
+        indices = unpack_states(self.packed[i], self.bits, cells)
+        np.take(self._values, indices, out=out.reshape(-1))
+        return out
+
+    def __getitem__(self, i):
+        """Frame i, or a timeline of the frames in a slice"""
+        if isinstance(i, slice):
+            return PackedTimeline(self.packed[i], self.shape, self.dtype,
+                                  self.states, *self._sliced_generations(i))
+        frame = np.empty(self.shape, dtype=self.dtype)
+        return self._unpack(i, frame)
+
+    def __setitem__(self, i, frame):
+        """Pack an array of states into frame i"""
+        if self._pack_frame is None:
+            # the frames are packed already, so whether packing saves space
+            # for the type of the frames does not matter
+            dtype = np.int64 if self.dtype.kind in 'iu' else self.dtype
+            self._pack_frame = self._frame_packer(self.states, dtype)[1]
+        packed = self._pack_frame(np.asarray(frame).astype(self.dtype,
+                                                            copy=False))
+        if packed is None:
+            raise ValueError('Frame has cells not in the states {}'.format(
+                self.states))
+        self.packed[i] = packed
+
+    def set_packed(self, i, packed):
+        """Set frame i to state indices already packed as pack_states
+        packs them"""
+        self.packed[i] = packed
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def truncate(self, num_frames):
+        """Keep only the first num_frames frames (eg. those recorded before
+        a run was cancelled)"""
+        self._truncate_generations(num_frames)
+        self.packed = self.packed[:num_frames]
+
+    def frame(self, i):
+        """Frame i unpacked into a buffer reused between calls, for
+        displaying"""
+        if self._frame is None:
+            self._frame = np.empty(self.shape, dtype=self.dtype)
+        return self._unpack(i, self._frame)
+
+    def save(self, path, pack=True):
+        """Save the timeline to a file loaded by load_timeline
+
+        Args:
+            path (str): the file to save to
+            pack (bool): save the frames packed, otherwise they are
+                unpacked and saved as a Timeline
+        """
+        if not pack:
+            frames = np.empty((len(self),) + self.shape, dtype=self.dtype)
+            for i in range(len(self)):
+                self._unpack(i, frames[i])
+            Timeline(frames, self.states, self.stride, self.start,
+                     self.generations).save(path, pack=False)
+            return
+        header = self._generations_header()
+        header.update({'kind': 'packed', 'bits': self.bits,
+                       'dtype': self.dtype,
+                       'shape': (len(self),) + self.shape})
+        write_timeline(path, [('packed', self.packed)], self.states, header)
+
+    def __getstate__(self):
+        # the display buffer is not saved
+        state = self.__dict__.copy()
+        state['_frame'] = None
+        state['_pack_frame'] = None
+        return state
+
+
+def state_bits(num_states):
+    """The number of bits needed to store the index of a state"""
+    return max(1, (num_states - 1).bit_length())
+
+
+def pack_states(indices, bits):
+    """Pack an array of state indices into bytes, each taking the given
+    number of bits (least significant first)
+
+    Example:
+        ([1, 2, 3], 2) -> np.array([57], dtype=np.uint8)
+    """
+    indices = np.asarray(indices).ravel()
+    if bits == 8:
+        return indices.astype(np.uint8)
+    if bits == 1:
+        return np.packbits(indices, bitorder='little')
+    if 8 % bits == 0:
+        # whole cells to each byte, shifted into place and added up
+        per_byte = 8 // bits
+        cells = np.zeros(-(-len(indices) // per_byte) * per_byte,
+                         dtype=np.uint8)
+        cells[:len(indices)] = indices
+        cells = cells.reshape(-1, per_byte)
+        packed = cells[:, 0].copy()
+        for j in range(1, per_byte):
+            packed |= cells[:, j] << np.uint8(j * bits)
+        return packed
+    shifts = np.arange(bits, dtype=np.uint8)
+    planes = (indices[:, None] >> shifts) & 1
+    return np.packbits(planes.astype(np.uint8), bitorder='little')
+
+
+def unpack_states(packed, bits, count):
+    """Unpack the first count state indices packed by pack_states"""
+    if bits == 8:
+        return np.asarray(packed[:count])
+    if 8 % bits == 0:
+        packed = np.asarray(packed)
+        per_byte = 8 // bits
+        mask = np.uint8((1 << bits) - 1)
+        cells = np.empty((len(packed), per_byte), dtype=np.uint8)
+        for j in range(per_byte):
+            np.bitwise_and(packed >> np.uint8(j * bits), mask,
+                           out=cells[:, j])
+        return cells.reshape(-1)[:count]
+    planes = np.unpackbits(np.asarray(packed), count=count * bits,
+                           bitorder='little').reshape(count, bits)
+    if bits == 1:
+        return planes[:, 0]
+    weights = (1 << np.arange(bits)).astype(np.min_scalar_type(1 << bits))
+    return planes.dot(weights)
+
+
+class DiagramTimeline(_Generations):
+    """The timeline of a 1D CA, stored as its single space-time diagram
+
+    Note:
+        Frame i of the timeline is the diagram with only the rows up to
+        its generation revealed, the rows of later generations showing the
+        blank row they held before the CA was run. Frames are built when
+        they are accessed rather than copied every generation, so a run of
+        G generations stores (G+1) x (2G+1) cells instead of G times that.
+    """
+
+    def __init__(self, diagram, blank_row, generations=None):
+        """Wrap the space-time diagram
+
+        Args:
+            diagram (numpy.ndarray): the (generations + 1, cols) grid, row t
+                being the states at generation t
+            blank_row (numpy.ndarray): the states of a row not yet reached
+            generations (list): the generation of each frame, if not every
+                generation is a frame
+        """
+        self.diagram = diagram
+        self.blank_row = np.array(blank_row, dtype=diagram.dtype)
+        self.set_generations(generations=generations)
+        # buffer kept up to date with the last frame displayed
+        self._frame = None
+        self._frame_gen = None
+
+    def __len__(self):
+        if self.generations is not None:
+            return len(self.generations)
+        return self.diagram.shape[0]
+
+    def __getitem__(self, i):
+        """Build frame i as a new array"""
+        t = self._index(i)
+        frame = np.empty(self.diagram.shape, dtype=self.diagram.dtype)
+        frame[:t + 1] = self.diagram[:t + 1]
+        frame[t + 1:] = self.blank_row
+        return frame
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def _index(self, i):
+        """The generation (and so last row) of frame i, counting back from
+        the end if negative"""
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Frame {i} out of range".format(i=i))
+        return self.generation(i)
+
+    def revealed(self, i):
+        """The rows of the diagram up to the generation of frame i, a view
+        with no copying"""
+        return self.diagram[:self._index(i) + 1]
+
+    def frame(self, i):
+        """Frame i in a buffer reused between calls, for displaying
+
+        Note:
+            Only the rows between the previous frame and this one are
+            copied, so stepping through the frames in order copies the
+            diagram once in total. The array returned is overwritten by
+            the next call.
+        """
+        t = self._index(i)
+        if self._frame is None:
+            self._frame = self[i]
+        elif t > self._frame_gen:
+            rows = slice(self._frame_gen + 1, t + 1)
+            self._frame[rows] = self.diagram[rows]
+        elif t < self._frame_gen:
+            self._frame[t + 1:self._frame_gen + 1] = self.blank_row
+        self._frame_gen = t
+        return self._frame
+
+    def truncate(self, num_frames):
+        """Keep only the first num_frames frames (eg. those recorded before
+        a run was cancelled), the diagram keeping its rows"""
+        if self.generations is None:
+            # each row is a frame
+            self.set_generations(generations=range(num_frames))
+        else:
+            self._truncate_generations(num_frames)
+        self._frame, self._frame_gen = None, None
+
+    def save(self, path):
+        """Save the timeline to a file loaded by load_timeline"""
+        header = self._generations_header()
+        header.update({'kind': 'diagram',
+                       'blank_row': self.blank_row.tolist()})
+        write_timeline(path, [('frames', self.diagram)], None, header)
+
+    def __getstate__(self):
+        # the display buffer is not saved
+        state = self.__dict__.copy()
+        state['_frame'], state['_frame_gen'] = None, None
+        return state
+
+
+class DeltaTimeline(_Generations):
+    """A timeline stored as periodic full keyframes, with the cells that
+    changed each generation in between
+
+    Note:
+        Each frame between two keyframes is stored as the flat indices of
+        the cells that changed since the previous frame and their new
+        states, so a CA that changes few cells each generation takes a
+        fraction of the space of storing every frame. Any frame is found
+        by replaying the changes from the keyframe before it, so the
+        keyframe interval trades size against the time to seek.
+
+        Frames are recorded in order, by assigning the next frame.
+    """
+
+    def __init__(self, shape, dtype, states=None, keyframe_interval=50,
+                 stride=1, start=0, generations=None):
+        """Create an empty timeline
+
+        Args:
+            shape ((int, int)): the rows and columns of each frame
+            dtype (numpy.dtype): the type of the grid
+            states (list): the states of the CA, if known
+            keyframe_interval (int): the number of frames from one full
+                keyframe to the next
+            stride (int): the number of generations between frames
+            start (int): the generation of the first frame
+            generations (list): the generation of each frame, if they are
+                not evenly spaced
+        """
+        if keyframe_interval < 1:
+            raise ValueError("Invalid keyframe interval {}".format(
+                keyframe_interval))
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.states = None if states is None else list(states)
+        self.keyframe_interval = keyframe_interval
+        self.set_generations(stride, start, generations)
+        self.index_dtype = np.min_scalar_type(int(np.prod(self.shape)))
+        self.keyframes = []
+        # changed indices and states of each frame while recording, once
+        # loaded these are concatenated and split by offsets instead
+        self._indices, self._values = [], []
+        self._offsets = None
+        self._num_frames = 0
+        self._last = None
+        # buffer kept up to date with the last frame displayed
+        self._frame = None
+        self._frame_gen = None
+
+    @classmethod
+    def from_arrays(cls, arrays, header):
+        """Build a timeline from the arrays of a saved timeline"""
+        timeline = cls(header['shape'][1:], header['dtype'],
+                       header['states'], header['keyframe_interval'],
+                       header['stride'], header['start'],
+                       header.get('generations'))
+        timeline.keyframes = arrays['keyframes']
+        timeline._indices = arrays['indices']
+        timeline._values = arrays['values']
+        timeline._offsets = arrays['offsets']
+        timeline._num_frames = header['shape'][0]
+        return timeline
+
+    def __len__(self):
+        return self._num_frames
+
+    def __setitem__(self, i, frame):
+        """Record the next frame"""
+        if i != self._num_frames or self._offsets is not None:
+            raise IndexError("Frames must be recorded in order")
+        frame = np.asarray(frame)
+        if i % self.keyframe_interval == 0:
+            self.keyframes.append(np.array(frame, dtype=self.dtype))
+            changed = np.empty(0, dtype=self.index_dtype)
+        else:
+            changed = np.flatnonzero(frame != self._last).astype(
+                self.index_dtype)
+        self._indices.append(changed)
+        self._values.append(np.array(frame.ravel()[changed],
+                                     dtype=self.dtype))
+        if self._last is None:
+            self._last = np.empty(self.shape, dtype=self.dtype)
+        self._last[:, :] = frame
+        self._num_frames += 1
+
+    def _changes(self, t):
+        """The indices and new states of the cells changed in frame t"""
+        if self._offsets is None:
+            return self._indices[t], self._values[t]
+        cells = slice(self._offsets[t], self._offsets[t + 1])
+        return self._indices[cells], self._values[cells]
+
+    def _index(self, t):
+        """Check a frame number, counting back from the end if negative"""
+        t = int(t)
+        if t < 0:
+            t += len(self)
+        if not 0 <= t < len(self):
+            raise IndexError("Frame {t} out of range".format(t=t))
+        return t
+
+    def _replay(self, out, first, last):
+        """Apply the changes of frames first to last to a frame"""
+        flat = out.reshape(-1)
+        for t in range(first, last + 1):
+            indices, values = self._changes(t)
+            flat[indices] = values
+        return out
+
+    def __getitem__(self, t):
+        """Frame t as a new array, replayed from the keyframe before it"""
+        t = self._index(t)
+        k = t // self.keyframe_interval
+        frame = np.array(self.keyframes[k], dtype=self.dtype)
+        return self._replay(frame, k * self.keyframe_interval + 1, t)
+
+    def __iter__(self):
+        frame = None
+        for t in range(len(self)):
+            if t % self.keyframe_interval == 0:
+                frame = np.array(self.keyframes[t // self.keyframe_interval])
+            else:
+                frame = self._replay(frame.copy(), t, t)
+            yield frame
+
+    def frame(self, t):
+        """Frame t in a buffer reused between calls, for displaying
+
+        Note:
+            Moving forwards within the same keyframe interval only replays
+            the changes since the last frame displayed. The array returned
+            is overwritten by the next call.
+        """
+        t = self._index(t)
+        k = t // self.keyframe_interval
+        if (self._frame is not None and self._frame_gen <= t and
+                self._frame_gen // self.keyframe_interval == k):
+            self._replay(self._frame, self._frame_gen + 1, t)
+        else:
+            if self._frame is None:
+                self._frame = np.empty(self.shape, dtype=self.dtype)
+            self._frame[:, :] = self.keyframes[k]
+            self._replay(self._frame, k * self.keyframe_interval + 1, t)
+        self._frame_gen = t
+        return self._frame
+
+    def truncate(self, num_frames):
+        """Keep only the first num_frames frames (eg. those recorded before
+        a run was cancelled)"""
+        self._truncate_generations(num_frames)
+        if num_frames >= self._num_frames:
+            return
+        if self._offsets is not None:
+            self._offsets = self._offsets[:num_frames + 1]
+        else:
+            del self._indices[num_frames:]
+            del self._values[num_frames:]
+        num_keyframes = -(-num_frames // self.keyframe_interval)
+        self.keyframes = self.keyframes[:num_keyframes]
+        self._num_frames = num_frames
+        self._last = self[-1] if num_frames else None
+        self._frame, self._frame_gen = None, None
+
+    def nbytes(self):
+        """The number of bytes the frames are stored in"""
+        return (sum(k.nbytes for k in self.keyframes) +
+                sum(i.nbytes + v.nbytes for i, v in
+                    zip(self._indices, self._values)))
+
+    def save(self, path):
+        """Save the timeline to a file loaded by load_timeline"""
+        if self._offsets is None:
+            counts = [len(i) for i in self._indices]
+            offsets = np.concatenate(([0], np.cumsum(counts))).astype(
+                np.int64)
+            indices = np.concatenate(self._indices).astype(self.index_dtype)
+            values = np.concatenate(self._values).astype(self.dtype)
+        else:
+            offsets, indices, values = (self._offsets, self._indices,
+                                        self._values)
+        keyframes = np.asarray(self.keyframes, dtype=self.dtype).reshape(
+            (-1,) + self.shape)
+        header = self._generations_header()
+        header.update({'kind': 'delta', 'dtype': self.dtype,
+                       'shape': (len(self),) + self.shape,
+                       'keyframe_interval': self.keyframe_interval})
+        arrays = [('keyframes', keyframes), ('offsets', offsets),
+                  ('indices', indices), ('values', values)]
+        write_timeline(path, arrays, self.states, header)
+
+    def __getstate__(self):
+        # the display buffer is not saved
+        state = self.__dict__.copy()
+        state['_frame'], state['_frame_gen'] = None, None
+        return state
+
+
+class RegionTimeline(_Generations):
+    """The timeline of a few windows of a large grid, optionally alongside
+    a coarse downsampled frame of the whole grid
+
+    Note:
+        Each region and the coarse frame is a view, recorded as its own
+        Timeline. Recording a frame takes the whole grid and keeps only the
+        cells of the views, while indexing gives the frames of the selected
+        view, so the timeline is displayed like any other.
+    """
+
+    def __init__(self, regions, views, downsample=None, states=None,
+                 generations=None):
+        """Wrap the timelines of each view
+
+        Args:
+            regions (list): (row, col, rows, cols) of each region
+            views (list): a Timeline for each region, followed by one for
+                the coarse frame if downsampled
+            downsample (int): the grid is sampled every this many rows and
+                columns for the coarse frame, None if not recorded
+            states (list): the states of the CA, if known
+            generations (list): the generation of each frame, if they are
+                not every generation
+        """
+        self.regions = [tuple(int(n) for n in r) for r in regions]
+        self.views = views
+        self.downsample = downsample
+        self.states = None if states is None else list(states)
+        self.set_generations(generations=generations)
+        for view in self.views:
+            view.set_generations(generations=generations)
+        self.selected = 0
+
+    @classmethod
+    def empty(cls, num_frames, shape, dtype, regions, downsample=None,
+              states=None, generations=None):
+        """Allocate a timeline to be filled in as the CA is run
+
+        Args:
+            num_frames (int): the number of frames to record
+            shape ((int, int)): the rows and columns of the whole grid
+            dtype (numpy.dtype): the type of the grid
+            regions (list): (row, col, rows, cols) of each region, which
+                must lie inside the grid
+            downsample (int): record the grid sampled every this many rows
+                and columns as well, or None
+            states (list): the states of the CA, if known
+            generations (list): the generation of each frame, if they are
+                not every generation
+        """
+        rows, cols = shape
+        views = []
+        for row, col, height, width in regions:
+            if (row < 0 or col < 0 or height < 1 or width < 1 or
+                    row + height > rows or col + width > cols):
+                raise ValueError(
+                    "Region {r} is not inside the {s} grid".format(
+                        r=(row, col, height, width), s=tuple(shape)))
+            views.append(Timeline.empty(num_frames, (height, width), dtype,
+                                        states))
+        if downsample is not None:
+            if downsample < 1:
+                raise ValueError("Invalid downsample factor {}".format(
+                    downsample))
+            coarse = (-(-rows // downsample), -(-cols // downsample))
+            views.append(Timeline.empty(num_frames, coarse, dtype, states))
+        return cls(regions, views, downsample, states, generations)
+
+    def labels(self):
+        """A name for each view, in order, for choosing between them"""
+        labels = ["Region {n} at ({r}, {c})".format(n=n + 1, r=r, c=c)
+                  for n, (r, c, _, _) in enumerate(self.regions)]
+        if self.downsample is not None:
+            labels.append("Whole grid (1/{f})".format(f=self.downsample))
+        return labels
+
+    def select(self, view):
+        """Choose the view whose frames are given when indexed"""
+        if not 0 <= view < len(self.views):
+            raise IndexError("View {v} out of range".format(v=view))
+        self.selected = view
+
+    def __len__(self):
+        return len(self.views[0])
+
+    def __setitem__(self, i, grid):
+        """Record frame i of each view from the whole grid"""
+        for (row, col, height, width), view in zip(self.regions, self.views):
+            view[i] = grid[row:row + height, col:col + width]
+        if self.downsample is not None:
+            f = self.downsample
+            self.views[-1][i] = grid[::f, ::f]
+
+    def __getitem__(self, i):
+        return self.views[self.selected][i]
+
+    def __iter__(self):
+        return iter(self.views[self.selected])
+
+    def frame(self, i):
+        """Frame i of the selected view, for displaying"""
+        return self.views[self.selected].frame(i)
+
+    def truncate(self, num_frames):
+        """Keep only the first num_frames frames of each view (eg. those
+        recorded before a run was cancelled)"""
+        self._truncate_generations(num_frames)
+        for view in self.views:
+            view.truncate(num_frames)
+
+    def save(self, path):
+        """Save the timeline to a file loaded by load_timeline"""
+        arrays = [('region{n}'.format(n=n), view.frames)
+                  for n, view in enumerate(self.views[:len(self.regions)])]
+        if self.downsample is not None:
+            arrays.append(('coarse', self.views[-1].frames))
+        header = self._generations_header()
+        header.update({'kind': 'regions', 'downsample': self.downsample,
+                       'regions': [list(r) for r in self.regions]})
+        write_timeline(path, arrays, self.states, header)
+
+
+def write_timeline(path, arrays, states, header):
+    """Write arrays and their header to a timeline file
+
+    Note:
+        Like a .npy file, the file is a magic string and version, the
+        length of a JSON header, then the raw C ordered arrays one after
+        the other. The file is written alongside and renamed into place,
+        so a timeline already mapped into memory from the same path is
+        left intact.
+
+    Args:
+        path (str): the file to write
+        arrays (list): (name, numpy.ndarray) pairs of the arrays to write,
+            the first being the frames (or the diagram) unless the header
+            gives the shape and dtype of the frames
+        states (list): the states of the CA, or None
+        header (dict): the other fields of the header
+    """
+    header = dict(header)
+    header.setdefault('shape', arrays[0][1].shape)
+    header.setdefault('dtype', arrays[0][1].dtype)
+    specs = [(name, data.dtype, data.shape) for name, data in arrays]
+    text, offsets = timeline_header(specs, states, header)
+    temp_path = path + '.part'
+    with open(temp_path, 'wb') as f:
+        f.write(text)
+        for (name, data), offset in zip(arrays, offsets):
+            f.seek(len(text) + offset)
+            f.write(np.ascontiguousarray(data).data)
+    os.replace(temp_path, path)
+
+
+def timeline_header(arrays, states, header, length=None):
+    """Build the start of a timeline file up to where the data starts
+
+    Args:
+        arrays (list): (name, dtype, shape) of each array in the file
+        states (list): the states of the CA, or None
+        header (dict): the other fields of the header, with the shape and
+            dtype of the frames
+        length (int): pad the header to this length, to rewrite the
+            header of an existing file in place, rather than to a multiple
+            of HEADER_ALIGN
+
+    Returns:
+        (bytes, list): the magic string, version and header, and the
+            offsets of the arrays from the end of the header
+    """
+    header = dict(header)
+    header['dtype'] = np.dtype(header['dtype']).str
+    header['shape'] = [int(n) for n in header['shape']]
+    header['states'] = None if states is None else np.asarray(
+        states).tolist()
+    # each array starts aligned after the last
+    offsets, offset = [], 0
+    header['arrays'] = []
+    for name, dtype, shape in arrays:
+        dtype = np.dtype(dtype)
+        offset += -offset % HEADER_ALIGN
+        offsets.append(offset)
+        header['arrays'].append([name, dtype.str, [int(n) for n in shape],
+                                 offset])
+        offset += int(np.prod(shape)) * dtype.itemsize
+    text = json.dumps(header, sort_keys=True).encode('utf-8')
+    prefix = len(MAGIC) + 2 + 4
+    if length is None:
+        padding = -(prefix + len(text) + 1) % HEADER_ALIGN
+    else:
+        padding = length - (prefix + len(text) + 1)
+        if padding < 0:
+            raise ValueError("The header does not fit in {n} bytes".format(
+                n=length))
+    text += b' ' * padding + b'\n'
+    text = (MAGIC + bytes(FORMAT_VERSION) + struct.pack('<I', len(text)) +
+            text)
+    return text, offsets
+
+
+def read_timeline_header(f):
+    """Read the header of a timeline file
+
+    Returns:
+        (dict, int): the header and the offset the data starts at, or
+            (None, 0) if the file is not a timeline file
+    """
+    magic = f.read(len(MAGIC))
+    if magic != MAGIC:
+        return None, 0
+    major, minor = f.read(2)
+    if major > FORMAT_VERSION[0]:
+        raise ValueError(
+            "Timeline format version {}.{} is newer than {}.{}".format(
+                major, minor, *FORMAT_VERSION))
+    length, = struct.unpack('<I', f.read(4))
+    header = json.loads(f.read(length).decode('utf-8'))
+    if 'arrays' not in header:
+        # version 1.0 files hold only the frames
+        header['arrays'] = [['frames', header['dtype'], header['shape'], 0]]
+    return header, len(MAGIC) + 2 + 4 + length
+
+
+def load_timeline(path, mmap=True):
+    """Load a timeline saved by Timeline.save
+
+    Note:
+        Timelines pickled by utils.save (as older descriptions do) are
+        unpickled instead
+
+    Args:
+        path (str): the timeline file
+        mmap (bool): map the file into memory read only, rather than
+            reading it in
+
+    Returns:
+        Timeline: the loaded timeline, a DiagramTimeline for 1D CAs, a
+            DeltaTimeline for keyframe and delta encoded timelines, a
+            RegionTimeline for regions of the grid or a PackedTimeline for
+            packed frames
+    """
+    arrays = {}
+    with open(path, 'rb') as f:
+        header, start = read_timeline_header(f)
+        if header is None:
+            f.seek(0)
+            return pickle.load(f)
+        for name, dtype, shape, offset in header['arrays']:
+            dtype, shape = np.dtype(dtype), tuple(shape)
+            count = int(np.prod(shape))
+            if count == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            elif mmap:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r',
+                                         offset=start + offset, shape=shape)
+            else:
+                f.seek(start + offset)
+                arrays[name] = np.fromfile(f, dtype=dtype,
+                                           count=count).reshape(shape)
+
+    if header['kind'] == 'diagram':
+        return DiagramTimeline(arrays['frames'], header['blank_row'],
+                               header.get('generations'))
+    if header['kind'] == 'delta':
+        return DeltaTimeline.from_arrays(arrays, header)
+    if header['kind'] == 'regions':
+        names = ['region{n}'.format(n=n)
+                 for n in range(len(header['regions']))]
+        if header['downsample'] is not None:
+            names.append('coarse')
+        views = [Timeline(arrays[name], header['states']) for name in names]
+        return RegionTimeline(header['regions'], views,
+                              header['downsample'], header['states'],
+                              header.get('generations'))
+    if header['kind'] == 'packed':
+        return PackedTimeline(arrays['packed'], header['shape'][1:],
+                              header['dtype'], header['states'],
+                              header['stride'], header['start'],
+                              header.get('generations'))
+    return Timeline(arrays['frames'], header['states'], header['stride'],
+                    header['start'], header.get('generations'))
@@ -1,20 +1,27 @@
+import os
 import sys
 import tkinter as tk
 import tkinter.font as tkFont
 import numpy as np
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from capyle.utils import (set_icon, get_filename_dialog, get_logo,
-                          prerun_ca, run_ca, extract_states)
-from capyle.ca import CAConfig
+                          prerun_ca, extract_states)
+from capyle.ca import CAConfig, LiveTimeline
 from capyle.guicomponents import (_ConfigFrame, _CAGraph, _ScreenshotUI,
                                   _CreateCA, _AboutWindow)
-from capyle import _PlaybackControls
+from capyle import (_PlaybackControls, RunCache, PrerunCache, InProcessRun,
+                    BackgroundRun, DescriptionWorker)
 
 
 class Display(object):
     WINDOW_TITLE = "CAPyLE"
     ROOT_PATH = sys.path[0]
     CA_PATH = ROOT_PATH + "/ca_descriptions/"
+    CACHE_PATH = ROOT_PATH + "/temp/cache/"
+    TEMP_PATH = ROOT_PATH + "/temp/"
+    # milliseconds between checks on a run in progress
+    POLL_DELAY = 50
+    RUN_TEXT = "Apply configuration & run CA"
 
     def __init__(self):
         """Initialise the main GUI
@@ -35,6 +42,29 @@ class Display(object):
         self.add_frames()
 
         self.ca_graph = None
+        # timelines of previous runs, loaded instead of rerunning them
+        self.run_cache = RunCache(self.CACHE_PATH)
+        # configs made by prerunning descriptions that have not changed
+        self.prerun_cache = PrerunCache(self.CACHE_PATH + "prerun/")
+        # runner=inprocess in config.txt runs descriptions on a thread of
+        # this process instead of a new interpreter
+        runner = self.read_setting("runner")
+        self.in_process = runner == "inprocess"
+        # runner=worker runs descriptions in one process started now and
+        # kept for every prerun and run
+        self.worker = None
+        if runner == "worker":
+            self.worker = DescriptionWorker()
+            self.worker.start()
+        # live=1 in config.txt shows the frames of a run as they are run
+        self.live = self.read_setting("live", "1") == "1"
+        # the frames recorded so far by the run in progress
+        self.live_timeline = None
+        # each run saves its timeline to a file of its own, as the timeline
+        # shown is mapped into memory and on Windows a mapped file can not
+        # be replaced by the next run
+        self.run_number = 0
+        self.timeline_paths = []
 
         # play back control variables and UI
         self.playback_controls = _PlaybackControls(self)
@@ -50,6 +80,10 @@ class Display(object):
 
         self.root.mainloop()
 
+        if self.worker is not None:
+            self.worker.stop()
+        self.remove_timelines()
+
     def add_menubar(self):
         """Function to add a menubar to the root window"""
         self.menubar = tk.Menu(self.root)
@@ -99,6 +133,15 @@ class Display(object):
         self.config_ui = None
         self.lbotframe = None
 
+    def read_setting(self, name, default=None):
+        """Read a setting from config.txt, or the default if not set"""
+        with open(sys.path[0] + "/config.txt", "r") as f:
+            for line in f:
+                l = line.split("=")
+                if l[0] == name:
+                    return l[1].strip()
+        return default
+
     def init_config_ui(self):
         """Initialise the config UI elements but do not add them to GUI yet"""
         logo_on = False
@@ -140,8 +183,7 @@ class Display(object):
         if self.lbotframe is not None:
             self.lbotframe.destroy()
         self.lbotframe = tk.Frame(self.lframe)
-        self.btn_run = tk.Button(self.lbotframe,
-                                 text="Apply configuration & run CA",
+        self.btn_run = tk.Button(self.lbotframe, text=self.RUN_TEXT,
                                  command=self.run_ca)
         self.btn_run.pack(side=tk.BOTTOM, pady=10)
         self.lbotframe.pack(fill=tk.BOTH, expand=True)
@@ -168,7 +210,9 @@ class Display(object):
                 self.ca_graph.clear()
             # create default config
             self.ca_config = CAConfig(filepath)
-            self.ca_config = prerun_ca(self.ca_config)
+            self.ca_config = prerun_ca(self.ca_config,
+                                       cache=self.prerun_cache,
+                                       worker=self.worker)
             if self.ca_config is None:
                 return
             self.root.wm_title(
@@ -182,8 +226,9 @@ class Display(object):
     def run_ca(self):
         """Run the loaded CA passing in the config from GUI
 
-        Running the CA with run_ca returns the new CAConfig object
-        and the Timeline. Timeline loaded by calling self.load_timeline
+        The CA is run on another thread (see start_run), which hands over
+        the new CAConfig object and the Timeline. Timeline loaded by
+        calling self.load_timeline
         Note:
             The config may overwritten in the CA description
         """
@@ -191,18 +236,124 @@ class Display(object):
         self.ca_config, valid = self.config_ui.get_config(self.ca_config,
                                                           validate=True)
         if valid:
-            # runs ca with config, returns config and timeline
-            self.ca_config, timeline = run_ca(self.ca_config)
-            if self.ca_config is None or timeline is None:
+            self.ca_config.live_timeline = self.live
+            self.ca_config.timeline_path = self.new_timeline_path()
+            if self.in_process:
+                self.start_run(InProcessRun(self.ca_config,
+                                            cache=self.run_cache))
+            else:
+                self.start_run(BackgroundRun(self.ca_config,
+                                             cache=self.run_cache,
+                                             worker=self.worker))
+
+    def new_timeline_path(self):
+        """A timeline file for the next run, removing those of earlier runs
+        other than the one shown
+
+        Note:
+            The file of the timeline shown is kept, as it is still mapped
+            and a longer run of the same CA carries on from it
+        """
+        self.remove_timelines(keep=self.ca_config.timeline_path)
+        self.run_number += 1
+        path = self.TEMP_PATH + "timeline_{pid}_{n}.tl".format(
+            pid=os.getpid(), n=self.run_number)
+        self.timeline_paths.append(path)
+        return path
+
+    def remove_timelines(self, keep=None):
+        """Remove the timeline files saved by runs, other than keep, leaving
+        any still in use to be removed later"""
+        for path in list(self.timeline_paths):
+            if path == keep:
+                continue
+            try:
+                if os.path.isfile(path):
+                    os.remove(path)
+            except OSError:
+                continue
+            self.timeline_paths.remove(path)
+
+    def start_run(self, run):
+        """Start a run on another thread, showing its progress in the title
+        and its timeline once it is handed over (and its frames as they are
+        recorded if live), the run button cancelling it meanwhile
+
+        Args:
+            run (InProcessRun or BackgroundRun): the run to start
+        """
+        # looked up here only, the run adding itself to the cache
+        key = self.run_cache.key(self.ca_config)
+        cached = None if key is None else self.run_cache.get(key)
+        if cached is not None:
+            self.show_run(*cached)
+            return
+        # not to be mistaken for the frames of this run
+        LiveTimeline.clear(self.ca_config.timeline_path)
+        self.live_timeline = None
+        self.btn_run.config(text="Cancel run", command=run.cancel)
+        run.start()
+        self.root.after(self.POLL_DELAY, self.poll_run, run)
+
+    def poll_run(self, run):
+        """Check on a run on another thread until it is done"""
+        title = self.WINDOW_TITLE + " - " + self.ca_config.title
+        if not run.done():
+            generation, total, rate = run.progress()
+            if total > 0:
+                self.root.wm_title(
+                    (title + " - generation {g} of {n} " +
+                     "({r:.0f} generations/s)").format(
+                         g=generation, n=total, r=rate))
+            if self.ca_config.live_timeline:
+                self.follow_run()
+            self.root.after(self.POLL_DELAY, self.poll_run, run)
+            return
+        self.root.wm_title(title)
+        self.btn_run.config(text=self.RUN_TEXT, command=self.run_ca)
+        if run.error is not None:
+            self.live_timeline = None
+            print('[ERROR] Error in CA description while attempting to run CA')
+            print(run.error)
+            return
+        self.show_run(*run.result())
+
+    def follow_run(self):
+        """Show the frames recorded so far by the run in progress, growing
+        the range of the playback controls as it records more"""
+        if self.live_timeline is None:
+            live = LiveTimeline.open(self.ca_config.timeline_path)
+            if live is None or len(live) == 0:
                 return
-            # if no states saved, takes best guess
-            if self.ca_config.states is None:
-                self.ca_config.states = extract_states(timeline)
+            self.live_timeline = live
+            self.load_timeline(live)
+        self.playback_controls.extend(len(self.live_timeline) - 1)
+
+    def show_run(self, ca_config, timeline):
+        """Display the result of running the CA
+
+        Args:
+            ca_config (CAConfig): the config after the run, or None if the
+                run failed
+            timeline (Timeline): the timeline of the run
+        """
+        if ca_config is None or timeline is None:
+            return
+        self.ca_config = ca_config
+        # if no states saved, takes best guess
+        if self.ca_config.states is None:
+            self.ca_config.states = extract_states(timeline)
+        live, self.live_timeline = self.live_timeline, None
+        if live is not None and len(timeline) == live.num_frames():
+            # carry on playing from the frame shown during the run
+            self.ca_graph.timeline = timeline
+            self.playback_controls.extend(len(timeline) - 1, live=False)
+        else:
             # loads in timeline
             self.load_timeline(timeline)
-            # Updates config with updated user defined config from running CA &
-            # Adds the state colours UI and sets the colour map accordingly
-            self.config_ui.update(self.ca_config, self.ca_graph)
+        # Updates config with updated user defined config from running CA &
+        # Adds the state colours UI and sets the colour map accordingly
+        self.config_ui.update(self.ca_config, self.ca_graph)
 
     def load_timeline(self, timeline):
         """Load a timeline into the GUI and display on the graph
@@ -210,7 +361,7 @@ class Display(object):
         Also enables playback and screenshot UI controls.
 
         Args:
-            timeline (np.ndarray): The grid state for each timestep
+            timeline (Timeline): The grid state for each timestep
         """
         # Create graph from timeline
         self.ca_graph = _CAGraph(timeline, self.ca_config.states,
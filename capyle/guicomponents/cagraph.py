@@ -35,6 +35,7 @@ class _CAGraph(object):
             self.fig.set_size_inches(custom_size)
             ax = self.fig.add_axes([0, 0, 1, 1])
             ax.axis('off')
+            self.ax = ax
             self.mat = ax.matshow(data, cmap='gray', interpolation='none',
                                   vmin=states[0], vmax=states[-1])
 
@@ -44,7 +45,21 @@ class _CAGraph(object):
 
     def update(self, i):
         """Set the graph data to be the timepoint specified"""
-        self.mat.set_data(self.timeline[i])
+        if hasattr(self.timeline, 'frame'):
+            # timelines built frame by frame reuse one buffer for display
+            self.mat.set_data(self.timeline.frame(i))
+        else:
+            self.mat.set_data(self.timeline[i])
+
+    def select_view(self, view):
+        """Display another view of a timeline recording several (eg. the
+        regions of a RegionTimeline), fitting the graph to its size"""
+        self.timeline.select(view)
+        rows, cols = self.timeline[0].shape
+        extent = (-0.5, cols - 0.5, rows - 0.5, -0.5)
+        self.mat.set_extent(extent)
+        self.ax.set_xlim(extent[:2])
+        self.ax.set_ylim(extent[2:])
 
     def setdata(self, data):
         """Set the data displayed on the graph"""
@@ -1,6 +1,7 @@
 import tkinter as tk
 import numpy as np
 from capyle.utils import gens_to_dims, alerterror, alertcontinue
+from capyle.ca import num_rules
 from capyle.guicomponents import (_GenerationsUI, _GridDimensionsUI,
                                   _Separator, _NeighbourhoodUI, _RuleNumberUI,
                                   _StateColorsUI, _InitialGridUI)
@@ -111,9 +112,13 @@ class _ConfigFrame(tk.Frame):
 
     def __error_cases(self, ca_config):
         if ca_config.dimensions == 1:
-            if ca_config.rule_num < 0 or ca_config.rule_num > 255:
-                s = "Only 0-255 valid, {val} supplied"
-                return "Rule number", s.format(val=ca_config.rule_num)
+            radius = len(np.ravel(ca_config.nhood_arr)) // 2
+            max_rule = num_rules(len(ca_config.states), radius,
+                                 ca_config.totalistic) - 1
+            if ca_config.rule_num < 0 or ca_config.rule_num > max_rule:
+                s = "Only 0-{m} valid, {val} supplied"
+                return "Rule number", s.format(m=max_rule,
+                                               val=ca_config.rule_num)
 
         if ca_config.dimensions == 2:
             if ca_config.grid_dims[0] < 3 or ca_config.grid_dims[1] < 3:
@@ -32,14 +32,26 @@ class _NeighbourhoodUI(tk.Frame, _ConfigUIComponent):
             selframe, (self.optvar, self.options), dimensions)
         self.nhood_selector.pack()
         selframe.pack()
+        # neighbourhood set in the description too large for the selector
+        self.large_nhood = None
 
     def get_value(self):
+        if self.large_nhood is not None:
+            return self.large_nhood
         return self.nhood_selector.states
 
     def set_default(self):
         self.set(self.options[0].upper())
 
     def set(self, value):
+        self.large_nhood = None
+        if type(value) is not str:
+            arr = self.nhood_selector.dimensions_check(value)
+            if arr.shape != self.nhood_selector.states.shape:
+                # keep neighbourhoods of a larger radius as they are
+                self.large_nhood = arr
+                self.optvar.set(self.options[-1])
+                return
         if type(value) is str:
             self.nhood_selector.set_preset(value)
         elif self.nhood_selector.is_preset(value) >= 0:
@@ -43,6 +43,13 @@ class _PlaybackUI(tk.Frame):
             self.sliderframe, from_=0, to=self.controls.maxframe,
             state=tk.DISABLED, orient=tk.HORIZONTAL, length=280)
         self.scrubbing_slider.pack()
+        # the generation of the displayed frame, which differs from the
+        # frame number when not every generation was recorded
+        self.generation_label = tk.Label(self.sliderframe, text="")
+        self.generation_label.pack()
+        # choice of the recorded regions, shown only when there are any
+        self.viewvar = tk.StringVar()
+        self.view_menu = None
 
         self.btns = [btn_step_backward, btn_play_pause, btn_step_forward,
                      chk_loop, btn_reset]
@@ -57,6 +64,24 @@ class _PlaybackUI(tk.Frame):
         else:
             self.btns[1].config(text="Play")
 
+    def set_generation(self, generation):
+        self.generation_label.config(
+            text="Generation {g}".format(g=generation))
+
+    def set_views(self, labels):
+        """Offer a choice between the views of the timeline, or remove the
+        choice if labels is None"""
+        if self.view_menu is not None:
+            self.view_menu.destroy()
+            self.view_menu = None
+        if labels is None:
+            return
+        self.viewvar.set(labels[0])
+        self.view_menu = tk.OptionMenu(
+            self.sliderframe, self.viewvar, *labels,
+            command=lambda x: self.controls.select_view(labels.index(x)))
+        self.view_menu.pack()
+
     def setloop(self):
         x = self.loopvar.get()
         self.controls.loop = x == 1
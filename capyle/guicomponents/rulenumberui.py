@@ -13,7 +13,7 @@ class _RuleNumberUI(tk.Frame, _ConfigUIComponent):
         label.pack(side=tk.LEFT)
         is_valid_int = (self.register(is_valid_integer), '%P')
         self.num_entry = tk.Entry(self, validate='key',
-                                  validatecommand=is_valid_int, width=4)
+                                  validatecommand=is_valid_int, width=12)
         self.num_entry.pack(side=tk.LEFT)
         self.set_default()
 
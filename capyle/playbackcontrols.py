@@ -20,6 +20,8 @@ class _PlaybackControls():
         self.current_frame = 0
         self.maxframe = 0
         self.loop = False
+        # whether the timeline is still being recorded by a run
+        self.live = False
         # Create playback UI
         self.ui = _PlaybackUI(self.display.rtopframe, self)
 
@@ -71,6 +73,9 @@ class _PlaybackControls():
             if self.current_frame < self.maxframe:
                 # if frame has next
                 self.current_frame += 1
+            elif self.live:
+                # wait at the last frame recorded for the run to record more
+                return
             elif self.current_frame == self.maxframe and self.loop:
                 self.current_frame = 0
             else:
@@ -100,6 +105,22 @@ class _PlaybackControls():
         # set the frame in the graph
         self.display.ca_graph.update(int(x))
         self.display.ca_graph.refresh()
+        # label the frame with the generation it recorded
+        timeline = self.display.ca_graph.timeline
+        if hasattr(timeline, 'generation'):
+            self.ui.set_generation(timeline.generation(int(x)))
+        else:
+            self.ui.set_generation(int(x))
+
+    def select_view(self, view):
+        """Display another recorded view of the timeline, keeping the
+        current frame
+
+        Args:
+            view (int): the index of the view in the timeline's labels
+        """
+        self.display.ca_graph.select_view(view)
+        self.scrub(self.current_frame)
 
     def set_fps(self, fps):
         """Set the fps of the playback
@@ -134,6 +155,27 @@ class _PlaybackControls():
         """
         self.reset()
         self.maxframe = maxframe
+        self.live = False
+        # timelines recording several regions offer a choice between them
+        timeline = self.display.ca_graph.timeline
+        if hasattr(timeline, 'labels'):
+            self.ui.set_views(timeline.labels())
+        else:
+            self.ui.set_views(None)
         self.ui.scrubbing_slider.config(to=maxframe,
                                         command=lambda x: self.scrub(x))
         self.scrub(self.current_frame)
+
+    def extend(self, maxframe, live=True):
+        """Set a new maxframe as the run recording the timeline goes on,
+        keeping the play state and the frame displayed
+
+        Args:
+            maxframe (int): The new maximum frame in the timeline
+            live (bool): whether the run is still recording the timeline
+        """
+        self.live = live
+        self.maxframe = maxframe
+        self.ui.scrubbing_slider.config(to=maxframe)
+        if self.current_frame < maxframe:
+            self.ui.enable_widget(self.ui.btns[2])
@@ -0,0 +1,234 @@
+import os
+import glob
+import pickle
+import shutil
+import hashlib
+from capyle.utils import save, load
+
+
+class RunCache(object):
+    """A cache on disk of the timelines of runs, keyed by everything a run
+    depends on, so rerunning an identical configuration loads the timeline
+    instead of running the CA again
+
+    Note:
+        Each entry is the timeline file and the config it was run with,
+        named by the key. The least recently used entries are removed once
+        the cache grows past its size limit.
+
+        A run is identical if the description source and the config are,
+        and the config either sets a seed or is marked as deterministic
+        (as the descriptions that use no random numbers are). Other runs
+        are never cached, as a description using random numbers gives a
+        new random run each time it is run.
+    """
+    MAX_BYTES = 512 * 2**20
+    # config fields that only change how the run is displayed or where
+    # its files are kept
+    IGNORED_FIELDS = {'title', 'state_colors', 'path', 'timeline_path',
+                      'checkpoint_path', 'last_run_path', 'resume',
+                      'live_timeline', 'progress_path', 'deterministic'}
+
+    def __init__(self, directory, max_bytes=None):
+        """Use (creating if need be) the cache in the given directory
+
+        Args:
+            directory (str): the directory the entries are kept in
+            max_bytes (int): the size the cache is kept below, by default
+                MAX_BYTES
+        """
+        self.directory = directory
+        self.max_bytes = self.MAX_BYTES if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, ca_config):
+        """The key of a run of the given config
+
+        Returns:
+            str: a hash of the description source and every config field
+                affecting the run, or None if the config sets no seed and
+                is not deterministic, or can not be hashed
+        """
+        if (getattr(ca_config, 'seed', None) is None and
+                not getattr(ca_config, 'deterministic', False)):
+            return None
+        key = hashlib.sha256()
+        try:
+            with open(ca_config.filepath, 'rb') as f:
+                key.update(f.read())
+            for name in sorted(vars(ca_config)):
+                if name not in self.IGNORED_FIELDS:
+                    key.update(name.encode())
+                    key.update(pickle.dumps(getattr(ca_config, name), 4))
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            return None
+        return key.hexdigest()
+
+    def _paths(self, key):
+        """The config and timeline files of an entry"""
+        base = os.path.join(self.directory, key)
+        return base + '.pkl', base + '.tl'
+
+    def get(self, key):
+        """Look up a run, marking it as the most recently used
+
+        Returns:
+            (CAConfig, Timeline): the config after the run and the timeline
+                mapped from the cache, or None if the run is not cached
+        """
+        # imported here as capyle.ca itself imports capyle.utils
+        from capyle.ca import load_timeline
+        config_path, timeline_path = self._paths(key)
+        if not (os.path.isfile(config_path) and
+                os.path.isfile(timeline_path)):
+            self.misses += 1
+            return None
+        os.utime(config_path)
+        self.hits += 1
+        return load(config_path), load_timeline(timeline_path)
+
+    def put(self, key, ca_config, timeline_path):
+        """Add a run to the cache, then remove the least recently used
+        runs until the cache is under its size limit
+
+        Args:
+            key (str): the key of the run
+            ca_config (CAConfig): the config after the run
+            timeline_path (str): the saved timeline of the run
+        """
+        config_path, cached_path = self._paths(key)
+        # copied rather than linked, as descriptions saving their timeline
+        # with utils.save write over the file in place
+        shutil.copyfile(timeline_path, cached_path + '.part')
+        os.replace(cached_path + '.part', cached_path)
+        save(ca_config, config_path + '.part')
+        os.replace(config_path + '.part', config_path)
+        self.evict(keep=key)
+
+    def entries(self):
+        """The keys, last use and size in bytes of each run cached, least
+        recently used first"""
+        entries = []
+        for config_path in glob.glob(os.path.join(self.directory, '*.pkl')):
+            key = os.path.basename(config_path)[:-len('.pkl')]
+            _, timeline_path = self._paths(key)
+            try:
+                size = (os.path.getsize(config_path) +
+                        os.path.getsize(timeline_path))
+                used = os.path.getmtime(config_path)
+            except OSError:
+                continue
+            entries.append((used, key, size))
+        entries.sort()
+        return [(key, used, size) for used, key, size in entries]
+
+    def evict(self, keep=None):
+        """Remove the least recently used runs until the cache is under its
+        size limit, never removing the run keep"""
+        entries = self.entries()
+        total = sum(size for _, _, size in entries)
+        for key, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.remove(key)
+            total -= size
+
+    def remove(self, key):
+        """Remove a run from the cache"""
+        for path in self._paths(key):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def clear(self):
+        """Remove every run from the cache"""
+        for key, _, _ in self.entries():
+            self.remove(key)
+
+    def stats(self):
+        """The hits and misses of this cache object, and the number of runs
+        and bytes in the cache
+
+        Returns:
+            dict: with keys hits, misses, entries and bytes
+        """
+        entries = self.entries()
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(entries),
+                'bytes': sum(size for _, _, size in entries)}
+
+
+class PrerunCache(object):
+    """A cache on disk of the configs made by prerunning descriptions, so
+    loading a description that has not changed needs no new interpreter
+
+    Note:
+        There is one entry per description file, keyed by its path,
+        modification time and a hash of its source along with the config
+        it was prerun with. An entry whose key no longer matches is
+        replaced when the description is next prerun.
+    """
+
+    def __init__(self, directory):
+        """Use (creating if need be) the cache in the given directory"""
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, ca_config):
+        """The key of a prerun of the given config
+
+        Returns:
+            str: a hash of the description's path, modification time and
+                source, and the config fields, or None if the description
+                can not be read or the config can not be hashed
+        """
+        key = hashlib.sha256()
+        try:
+            path = os.path.abspath(ca_config.filepath)
+            key.update(path.encode())
+            key.update(repr(os.stat(path).st_mtime_ns).encode())
+            with open(path, 'rb') as f:
+                key.update(hashlib.sha256(f.read()).digest())
+            for name in sorted(vars(ca_config)):
+                if name not in RunCache.IGNORED_FIELDS:
+                    key.update(name.encode())
+                    key.update(pickle.dumps(getattr(ca_config, name), 4))
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            return None
+        return key.hexdigest()
+
+    def _path(self, ca_config):
+        """The entry of the description, named by its path"""
+        path = os.path.abspath(ca_config.filepath)
+        name = hashlib.sha256(path.encode()).hexdigest()
+        return os.path.join(self.directory, name + '.pkl')
+
+    def get(self, ca_config, key):
+        """Look up the prerun config of a description
+
+        Returns:
+            CAConfig: a new copy of the config made by the prerun, or None
+                if the description has not been prerun with this key
+        """
+        path = self._path(ca_config)
+        if os.path.isfile(path):
+            entry_key, config = load(path)
+            if entry_key == key:
+                self.hits += 1
+                return config
+        self.misses += 1
+        return None
+
+    def put(self, ca_config, key, prerun_config):
+        """Save the config made by prerunning a description, replacing any
+        older prerun of the same description"""
+        path = self._path(ca_config)
+        save((key, prerun_config), path + '.part')
+        os.replace(path + '.part', path)
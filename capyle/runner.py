@@ -0,0 +1,248 @@
+import sys
+import threading
+import traceback
+import importlib.util
+from capyle.utils import run_ca
+
+# held while a description runs in this process, as its main reads its
+# arguments from the process wide sys.argv
+_argv_lock = threading.Lock()
+
+
+def load_description(filepath, name='ca_description'):
+    """Import a CA description file as a module, without running its main
+
+    Args:
+        filepath (str): the path of the description file
+        name (str): the name given to the module
+
+    Returns:
+        module: the imported description
+    """
+    spec = importlib.util.spec_from_file_location(name, filepath)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class _ThreadedRun(object):
+    """A run of a CA description on a worker thread, polled from the GUI's
+    own thread with done and result"""
+
+    def __init__(self, ca_config, cache=None):
+        """Prepare to run the description of the config
+
+        Args:
+            ca_config (CAConfig): the config to run
+            cache (RunCache): if given, the run is added to the cache once
+                its timeline is saved
+        """
+        self.ca_config = ca_config
+        self.cache = cache
+        self.error = None
+        self._result = None
+        self._handed_over = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Start running on the worker thread"""
+        self._thread.start()
+
+    def _run(self):
+        raise NotImplementedError
+
+    def _cache_key(self):
+        """The key the run is added to the cache under, found before it is
+        run (the caller having already looked it up), or None"""
+        if self.cache is None:
+            return None
+        return self.cache.key(self.ca_config)
+
+    def _add_to_cache(self, key, cancelled):
+        """Add the run to the cache, unless it failed or was cancelled,
+        as the timeline is then not the run the key is of"""
+        if key is None or cancelled or self._result is None:
+            return
+        config, _ = self._result
+        if config is not None:
+            self.cache.put(key, config, config.timeline_path)
+
+    def done(self):
+        """Whether the timeline has been handed over or the run failed"""
+        return self._handed_over.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the run is done, returning whether it is"""
+        return self._handed_over.wait(timeout)
+
+    def join(self, timeout=None):
+        """Block until the run's thread has finished"""
+        self._thread.join(timeout)
+
+    def progress(self):
+        """The progress of the run
+
+        Returns:
+            (int, int, float): the generations run so far, the generations
+                to be run (0 until the run starts) and the generations run
+                per second lately
+        """
+        raise NotImplementedError
+
+    def cancel(self):
+        """Stop the run after the generation it is on, the timeline holding
+        the frames recorded until then"""
+        raise NotImplementedError
+
+    def result(self):
+        """The config after the run and its timeline
+
+        Returns:
+            (CAConfig, Timeline): the result, or (None, None) if the run
+                failed (or, run in process, did not reach Grid.run)
+        """
+        if self._result is None:
+            return None, None
+        return self._result
+
+
+class InProcessRun(_ThreadedRun):
+    """Runs a CA description in this process on a worker thread, handing
+    the timeline over in memory rather than through files
+
+    Note:
+        The description's main function is called as if the description
+        was run with the config path as its argument, so it sets up the
+        config and grid as usual. Grid.run reports its progress to this
+        object instead of its config's progress file, and hands over the
+        timeline as soon as the last generation is run, while the
+        description carries on saving it on the worker thread. A
+        cancelled run hands over the frames recorded until then.
+
+        Nothing here touches tkinter, so the GUI polls the run from its
+        own thread with done and result.
+
+        Descriptions read their arguments from sys.argv, so it is set for
+        the run and restored afterwards. Runs in this process are
+        therefore run one at a time, a second waiting for the first to
+        return.
+
+    Example:
+        run = InProcessRun(ca_config)
+        run.start()
+        # ... later, from the GUI's event loop
+        if run.done():
+            ca_config, timeline = run.result()
+    """
+
+    def __init__(self, ca_config, cache=None):
+        super(InProcessRun, self).__init__(ca_config, cache)
+        self.generation = 0
+        self.total = 0
+        self.rate = 0.0
+        self._cancelled = False
+
+    def _run(self):
+        # imported here as capyle.ca itself imports capyle.utils
+        from capyle.ca import set_in_process_run
+        try:
+            module = load_description(self.ca_config.filepath)
+            key = self._cache_key()
+            with _argv_lock:
+                self.ca_config.save()
+                set_in_process_run(self)
+                argv = sys.argv
+                sys.argv = [self.ca_config.filepath, self.ca_config.path]
+                try:
+                    module.main()
+                finally:
+                    sys.argv = argv
+            self._add_to_cache(key, self._cancelled)
+        except BaseException:
+            self.error = traceback.format_exc()
+        finally:
+            set_in_process_run(None)
+            self._handed_over.set()
+
+    def report(self, generation, total, rate):
+        """Record the progress of the run, called by Grid.run"""
+        self.generation, self.total, self.rate = generation, total, rate
+
+    def cancelled(self):
+        """Whether the run has been cancelled, asked by Grid.run"""
+        return self._cancelled
+
+    def progress(self):
+        return self.generation, self.total, self.rate
+
+    def cancel(self):
+        self._cancelled = True
+
+    def finished(self, ca_config, timeline):
+        """Take the result of the run, called by Grid.run"""
+        self._result = (ca_config, timeline)
+        self._handed_over.set()
+
+    def join(self, timeout=None):
+        """Block until the description has returned, including saving the
+        timeline after handing it over"""
+        self._thread.join(timeout)
+
+
+class BackgroundRun(_ThreadedRun):
+    """Runs a CA description with utils.run_ca on a worker thread, so the
+    GUI carries on (eg. showing the frames recorded so far with a
+    LiveTimeline) while the description runs in a new interpreter or the
+    description worker
+
+    Example:
+        run = BackgroundRun(ca_config, worker=worker)
+        run.start()
+        # ... later, from the GUI's event loop
+        if run.done():
+            ca_config, timeline = run.result()
+    """
+
+    def __init__(self, ca_config, cache=None, worker=None):
+        """Prepare to run the description of the config
+
+        Args:
+            ca_config (CAConfig): the config to run
+            cache (RunCache): if given, the run is added to the cache once
+                its timeline is saved
+            worker (DescriptionWorker): passed on to utils.run_ca
+        """
+        super(BackgroundRun, self).__init__(ca_config, cache)
+        self.worker = worker
+        self._progress = None
+
+    def start(self):
+        """Start running on the worker thread, the run reporting its
+        progress to a file alongside its timeline"""
+        # imported here as capyle.ca itself imports capyle.utils
+        from capyle.ca import RunProgress
+        self._progress = RunProgress.create(
+            self.ca_config.timeline_path + '.progress')
+        super(BackgroundRun, self).start()
+
+    def _run(self):
+        try:
+            # looked up in the cache by the caller, so only added here
+            key = self._cache_key()
+            self._result = run_ca(self.ca_config, worker=self.worker,
+                                  progress=self._progress)
+            self._add_to_cache(key, self._progress.cancelled())
+        except BaseException:
+            self.error = traceback.format_exc()
+        finally:
+            self._handed_over.set()
+
+    def progress(self):
+        if self._progress is None:
+            return 0, 0, 0.0
+        return (self._progress.generation(), self._progress.total(),
+                self._progress.rate())
+
+    def cancel(self):
+        if self._progress is not None:
+            self._progress.cancel()
@@ -7,24 +7,30 @@ import os.path
 import numpy as np
 
 
-def prerun_ca(ca_config):
+def prerun_ca(ca_config, cache=None, worker=None):
     """Run the setup function of a ca description and load the CAConfig
 
     Args:
         ca_config (CAConfig): The config object to be saved
             and passed to the CA file.
+        cache (PrerunCache): if given, the config is taken from the cache
+            when the description has not changed since it was last prerun
+        worker (DescriptionWorker): if given, the description is run in
+            the worker rather than a new interpreter
     Returns:
         CAConfig: The updated config after values have been updated
             while pre-running the ca description
 
     """
+    key = None
+    if cache is not None:
+        key = cache.key(ca_config)
+        cached = None if key is None else cache.get(ca_config, key)
+        if cached is not None:
+            return cached
     ca_config.save()
-    args = [sys.executable, ca_config.filepath, ca_config.path, '0']
-    ca = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    #  Collect both stdout and errors & decode to strings
-    out_bytes, errors_bytes = ca.communicate()
-    errors_str = errors_bytes.decode("utf-8")
-    out_str = out_bytes.decode("utf-8")
+    args = [ca_config.filepath, ca_config.path, '0']
+    out_str, errors_str = _run_description(args, worker)
     if errors_str != "":
         #  show print out and errors
         print('[ERROR] Error in CA description while prerunning')
@@ -34,34 +40,49 @@ def prerun_ca(ca_config):
         #  show print out and reload ca_config
         if not out_str == '':
             print(out_str)
-        ca_config = load(ca_config.path)
-        ca_config.fill_in_defaults()
-        return ca_config
+        prerun_config = load(ca_config.path)
+        prerun_config.fill_in_defaults()
+        if key is not None:
+            cache.put(ca_config, key, prerun_config)
+        return prerun_config
 
 
-def run_ca(ca_config):
+def run_ca(ca_config, resume=False, cache=None, worker=None, progress=None):
     """Run the ca in a subprocess, saving the timestep to a timeline.
     This timeline is then saved to disk and loaded back in this process
 
     Args:
         ca_config (CAConfig): The config object to be saved
             and passed to the CA file.
+        resume (bool): continue from the last checkpoint of the run, if
+            the config sets checkpoints and the run was stopped early
+        cache (RunCache): if given, an identical run already in the cache
+            is loaded from it instead of run, and new runs are added to it
+        worker (DescriptionWorker): if given, the description is run in
+            the worker rather than a new interpreter
+        progress (RunProgress): if given, the run reports its progress to
+            it, and if cancelled through it stops early, returning the
+            frames recorded until then
 
     Returns:
         CAConfig: The updated config after values have been updated
             while pre-running the ca description
-        numpy.ndarray: Array containing the grid state for each time step
+        Timeline: the grid state for each time step, mapped from the
+            saved timeline file
     """
+    key = None
+    if cache is not None and not resume:
+        key = cache.key(ca_config)
+        cached = None if key is None else cache.get(key)
+        if cached is not None:
+            return cached
+    ca_config.resume = resume
+    ca_config.progress_path = None if progress is None else progress.path
     ca_config.save()
-    args = [sys.executable, ca_config.filepath, ca_config.path]
-    ca = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-    out_bytes, errors_bytes = ca.communicate()
-    errors_str = errors_bytes.decode("utf-8")
-    out_str = out_bytes.decode("utf-8")
+    args = [ca_config.filepath, ca_config.path]
+    out_str, errors_str = _run_description(args, worker)
 
     if errors_str != "":
-        #  close progress bar window early
         #  if error at runtime, show print out and errors
         print('[ERROR] Error in CA description while attempting to run CA')
         if not out_str == '':
@@ -73,10 +94,34 @@ def run_ca(ca_config):
         if not out_str == '':
             print(out_str)
         ca_config = load(ca_config.path)
-        timeline = load(ca_config.timeline_path)
+        ca_config.resume = False
+        ca_config.progress_path = None
+        # a cancelled run is not the run the key is of
+        cancelled = progress is not None and progress.cancelled()
+        if key is not None and not cancelled:
+            cache.put(key, ca_config, ca_config.timeline_path)
+        # imported here as capyle.ca itself imports this module
+        from capyle.ca import load_timeline
+        timeline = load_timeline(ca_config.timeline_path)
         return ca_config, timeline
 
 
+def _run_description(args, worker=None):
+    """Run a ca description with the given arguments in a new interpreter,
+    or in the worker if given
+
+    Returns:
+        (str, str): what the description printed to stdout and stderr
+    """
+    if worker is not None:
+        return worker.execute(args)
+    ca = subprocess.Popen([sys.executable] + args, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE)
+    #  Collect both stdout and errors & decode to strings
+    out_bytes, errors_bytes = ca.communicate()
+    return out_bytes.decode("utf-8"), errors_bytes.decode("utf-8")
+
+
 def verify_gens(num_gens):
     """Asssert that the number of generations is above 0"""
     if num_gens < 1:
@@ -236,6 +281,43 @@ def scale_array(old, newrows, newcols):
     return new
 
 
+def states_dtype(states, *extra_values):
+    """Find the smallest numpy dtype that can exactly represent each of the
+    states and any extra values (eg. the dead state used for the wrap)
+
+    Note:
+        Integer valued states get the smallest integer type that fits them,
+        otherwise float32 if it holds every value exactly, or float64.
+        float16 is not used, as numpy emulates its arithmetic and steps
+        take around three times as long as with float32.
+
+    Args:
+        states (tuple): the states of the CA
+        *extra_values: any other values the grid must be able to hold
+
+    Returns:
+        numpy.dtype: the dtype to use for storing the grid
+
+    Example:
+        (0, 1) -> uint8
+        (0, 1, 2), -100 -> int8
+        (0, 300) -> uint16
+        (0, 0.5, 1) -> float32
+        (0, 0.1) -> float64
+    """
+    values = np.array(list(states) + list(extra_values), dtype=float)
+    if np.all(values == np.round(values)):
+        low, high = int(values.min()), int(values.max())
+        if low >= 0:
+            return np.min_scalar_type(high)
+        for t in (np.int8, np.int16, np.int32, np.int64):
+            if np.iinfo(t).min <= low and high <= np.iinfo(t).max:
+                return np.dtype(t)
+    if np.array_equal(values.astype(np.float32).astype(float), values):
+        return np.dtype(np.float32)
+    return np.dtype(float)
+
+
 def int_to_binary(n):
     """Convert an integer to an 8 bit binary array
 
@@ -262,6 +344,36 @@ def int_to_binary(n):
     return b_arr
 
 
+def int_to_digits(n, base, length):
+    """Convert a non-negative integer to an array of its digits in the
+    given base, least significant first
+
+    Note:
+        Integers of any size are supported, unlike int_to_binary the
+        number is not clipped and must fit in the given number of digits
+
+    Args:
+        n (int): The integer number to be converted
+        base (int): The base of the digits
+        length (int): The number of digits
+
+    Returns:
+        numpy.ndarray: Array of the digits
+
+    Example:
+        (6, 2, 4) -> np.array([0,1,1,0])
+        (21, 3, 3) -> np.array([0,1,2])
+    """
+    n = int(n)
+    if n < 0 or n >= base ** length:
+        raise ValueError("{n} does not fit in {l} base {b} digits".format(
+            n=n, l=length, b=base))
+    digits = np.zeros(length, dtype=int)
+    for i in range(length):
+        n, digits[i] = divmod(n, base)
+    return digits
+
+
 def title_to_filename(s):
     """Remove spaces and invalid characters from a string"""
     disallowedchars = ['"', '.', '>', '<', ':', '|', '/', '\\',
@@ -318,9 +430,22 @@ def get_logo():
         fn = "capylelinux.gif"
 
     fp = sys.path[0] + "/icons/" + fn
+    import tkinter as tk
     logo = tk.PhotoImage(file=fp)
     return logo
 
 
-# The above functions are required before importing the remainder
-from capyle.guicomponents.gui_utils import *
+# the helpers from gui_utils, which need tkinter, are only imported when
+# first used so descriptions can import this module without the GUI
+GUI_UTILS = ('set_icon', 'get_filename_dialog', 'get_dir_dialog',
+             'clear_entry', 'set_entry', 'separator', 'alerterror',
+             'alertwarning', 'alertcontinue')
+
+
+def __getattr__(name):
+    """Import the gui_utils helpers on first use"""
+    if name in GUI_UTILS:
+        from capyle.guicomponents import gui_utils
+        return getattr(gui_utils, name)
+    raise AttributeError(("module {!r} has no "
+                          + "attribute {!r}").format(__name__, name))
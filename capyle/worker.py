@@ -0,0 +1,120 @@
+import io
+import os
+import sys
+import traceback
+import threading
+import multiprocessing
+
+
+class DescriptionWorker(object):
+    """A long lived process that runs CA descriptions, so each prerun and
+    run does not pay for starting an interpreter and importing numpy and
+    capyle again
+
+    Note:
+        A request runs the description's main function as if it was run
+        in a new interpreter with the given arguments, returning what it
+        printed and any error, just as utils.prerun_ca and utils.run_ca
+        read from a subprocess. Each description is imported once and only
+        imported again when its file changes, so module level state is
+        kept between runs of an unchanged description. Runs report their
+        progress through the RunProgress file named by their config, as
+        they do in a new interpreter.
+
+        The process is started when first needed and again if it dies.
+    """
+
+    def __init__(self):
+        self.process = None
+        self.conn = None
+        # one request at a time, as runs may be made from another thread
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start the worker process, if it is not already running"""
+        if self.process is not None and self.process.is_alive():
+            return
+        # spawned rather than forked, as this process may be running tkinter
+        context = multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_conn,),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def execute(self, args):
+        """Run a description in the worker
+
+        Args:
+            args (list): the description's path followed by its arguments,
+                as the command line of a subprocess running it
+
+        Returns:
+            (str, str): what the description printed to stdout and stderr,
+                stderr holding the traceback if it raised an error
+        """
+        with self.lock:
+            self.start()
+            try:
+                self.conn.send(list(args))
+                return self.conn.recv()
+            except (EOFError, OSError, BrokenPipeError):
+                self.stop()
+                return '', 'The description worker stopped unexpectedly\n'
+
+    def stop(self):
+        """Stop the worker process"""
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+
+
+def _serve(conn):
+    """Run the requests sent by a DescriptionWorker until sent None"""
+    # imported up front, which is what keeps the worker warm
+    import numpy
+    import capyle.ca
+    from capyle.runner import load_description
+    # description path -> (modification time, size, module)
+    descriptions = {}
+    while True:
+        try:
+            args = conn.recv()
+        except EOFError:
+            return
+        if args is None:
+            return
+        argv, stdout, stderr = sys.argv, sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = io.StringIO(), io.StringIO()
+        try:
+            path = args[0]
+            stat = os.stat(path)
+            loaded = descriptions.get(path)
+            if loaded is None or loaded[:2] != (stat.st_mtime_ns,
+                                                stat.st_size):
+                module = load_description(path)
+                descriptions[path] = (stat.st_mtime_ns, stat.st_size, module)
+            module = descriptions[path][2]
+            sys.argv = list(args)
+            try:
+                module.main()
+            except SystemExit as e:
+                # setup exits after saving the config when prerunning
+                if e.code not in (None, 0):
+                    raise
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            out_str = sys.stdout.getvalue()
+            errors_str = sys.stderr.getvalue()
+            sys.argv, sys.stdout, sys.stderr = argv, stdout, stderr
+        conn.send((out_str, errors_str))
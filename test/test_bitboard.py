@@ -0,0 +1,109 @@
+import sys, inspect, unittest
+import numpy as np
+this_file_loc = (inspect.stack()[0][1])
+main_dir_loc = this_file_loc[:this_file_loc.index('test')]
+sys.path.append(main_dir_loc)
+sys.path.append(main_dir_loc + 'capyle')
+sys.path.append(main_dir_loc + 'capyle/ca')
+sys.path.append(main_dir_loc + 'capyle/guicomponents')
+
+from capyle.ca import Grid2D, CAConfig, BitBoard
+
+#----------------------------------------------------------------------
+
+class TestPack(unittest.TestCase):
+    def test_roundtrip(self):
+        # widths either side of a word boundary
+        for cols in [3, 62, 63, 64, 65, 130]:
+            grid = np.random.randint(0, 2, (5, cols)).astype(np.uint8)
+            b = BitBoard(grid.shape, np.ones((3, 3)), {3}, {2, 3})
+            b.pack(grid)
+            out = np.zeros_like(grid)
+            b.unpack(out)
+            self.assertTrue(np.array_equal(grid, out))
+
+#----------------------------------------------------------------------
+
+class TestBitBoardStepMeta(type):
+    def __new__(mcs, name, bases, dict):
+
+        def gen_test(rule, wrap, nhood, cols):
+            def test(self):
+                a = self.grid(rule, wrap, nhood, cols, 'array')
+                b = self.grid(rule, wrap, nhood, cols, None)
+                self.assertIsNone(a.bitboard)
+                self.assertIsNotNone(b.bitboard)
+                for i in range(10):
+                    a.step()
+                    b.step()
+                self.assertTrue(np.array_equal(a.wrapping_grid,
+                                               b.wrapping_grid))
+            return test
+
+        rules = ["B3/S23", "B36/S23", "B0/S8", "B1357/S1357"]
+        nhoods = {"moore": None,
+                  "vonneumann": [[0, 1, 0], [1, 1, 1], [0, 1, 0]]}
+        for rule in rules:
+            for wrap in [True, False, 1]:
+                for nname, nhood in nhoods.items():
+                    for cols in [20, 64, 127]:
+                        testname = "test_{r}_{w}_{n}_{c}".format(
+                            r=rule.replace('/', '_'), w=wrap, n=nname,
+                            c=cols)
+                        dict[testname] = gen_test(rule, wrap, nhood, cols)
+        return type.__new__(mcs, name, bases, dict)
+
+
+class TestBitBoardStep(unittest.TestCase, metaclass=TestBitBoardStepMeta):
+    def grid(self, rule, wrap, nhood, cols, backend):
+        config = CAConfig("test/testdescriptions/2dbasic.py")
+        config.states = 0, 1
+        config.grid_dims = 30, cols
+        config.rule_string = rule
+        config.wrap = wrap
+        config.backend = backend
+        config.nhood_arr = np.ones((3, 3)) if nhood is None else nhood
+        np.random.seed(cols)
+        config.initial_grid = np.random.randint(0, 2, config.grid_dims)
+        return Grid2D(config, None)
+
+#----------------------------------------------------------------------
+
+class TestBackend(unittest.TestCase):
+    def setUp(self):
+        self.config = CAConfig("test/testdescriptions/2dbasic.py")
+        self.config.states = 0, 1
+        self.config.grid_dims = 20, 20
+        self.config.rule_string = "B3/S23"
+        self.config.nhood_arr = np.ones((3, 3))
+
+    def test_unsupported(self):
+        self.config.states = 0, 1, 2
+        self.config.rule_string = "B2/S/3"
+        self.config.backend = 'bitboard'
+        g = Grid2D(self.config, None)
+        self.assertIsNone(g.bitboard)
+
+    def test_changed_grid(self):
+        # changes to the grid between steps are packed
+        g = Grid2D(self.config, None)
+        g.step()
+        g.grid[5:8, 5] = 1
+        g.step()
+        self.assertTrue(np.array_equal(g.grid[5:8, 4:7],
+                                       [[0, 0, 0], [1, 1, 1], [0, 0, 0]]))
+
+    def test_lazy_unpack(self):
+        g = Grid2D(self.config, None)
+        g.step()
+        g.grid[:, :] = 0
+        g.step()
+        # stepped without reading the grid back
+        g._grid[:, :] = 1
+        g.step()
+        self.assertEqual(np.count_nonzero(g.grid), 0)
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+    unittest.main()
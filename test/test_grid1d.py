@@ -1,4 +1,4 @@
-import unittest, inspect, sys
+import unittest, inspect, sys, os, tempfile, shutil
 import numpy as np
 this_file_loc = (inspect.stack()[0][1])
 main_dir_loc = this_file_loc[:this_file_loc.index('test')]
@@ -7,7 +7,7 @@ sys.path.append(main_dir_loc + 'capyle')
 sys.path.append(main_dir_loc + 'capyle/ca')
 sys.path.append(main_dir_loc + 'capyle/guicomponents')
 
-from capyle.ca import Grid1D, Neighbourhood, CAConfig
+from capyle.ca import Grid1D, Neighbourhood, CAConfig, DiagramTimeline
 
 #----------------------------------------------------------------------
 
@@ -141,5 +141,135 @@ class TestInitialGridSet(unittest.TestCase, metaclass=TestInitialGridSetMeta):
 
 #----------------------------------------------------------------------
 
+class TestStep(unittest.TestCase):
+    def setUp(self):
+        self.config = CAConfig("test/testdescriptions/1dbasic.py")
+        self.config.num_generations = 20
+        self.config.states = 0, 1
+        self.config.dimensions = 1
+        self.config.nhood_arr = [1, 1, 1]
+        self.config.initial_grid = np.array([np.random.randint(0, 2, 41)])
+
+    def rule90(self, neighbourstates):
+        l, c, r = neighbourstates
+        return l != r
+
+    def return_func(self, grid, neighbourstates, neighbourcounts):
+        return self.rule90(neighbourstates)
+
+    def out_func(self, grid, neighbourstates, neighbourcounts, out):
+        out[:] = self.rule90(neighbourstates)
+
+    def test_out_row(self):
+        a = Grid1D(self.config, self.return_func)
+        b = Grid1D(self.config, self.out_func)
+        self.assertTrue(b.transition_takes_out)
+        for i in range(self.config.num_generations):
+            a.step()
+            b.step()
+        self.assertTrue(np.array_equal(a.wrapping_grid, b.wrapping_grid))
+
+    def test_returned_states(self):
+        g = Grid1D(self.config, lambda grid, ns, nc: ns[0] - 0.5)
+        with self.assertRaises(ValueError):
+            g.step()
+
+#----------------------------------------------------------------------
+
+class TestTimeline(unittest.TestCase):
+    class Progress(object):
+        def report(self, generation, total, rate):
+            pass
+
+        def cancelled(self):
+            return False
+
+    def setUp(self):
+        self.config = CAConfig("test/testdescriptions/1dbasic.py")
+        self.config.num_generations = 15
+        self.config.states = 0, 1, 2
+        self.config.dimensions = 1
+        self.config.nhood_arr = [1, 1, 1]
+        self.config.initial_grid = np.array([np.random.randint(0, 3, 31)])
+
+    def transfunc(self, grid, neighbourstates, neighbourcounts):
+        l, c, r = neighbourstates
+        return (l + 2 * c + r) % 3
+
+    def run_grid(self):
+        g = Grid1D(self.config, self.transfunc)
+        timeline = g.new_timeline(
+            g.recorded_generations(self.config.num_generations))
+        g._runca(self.config.num_generations, self.Progress(), timeline)
+        return timeline
+
+    def test_frames(self):
+        # each frame matches a copy of the grid taken every generation
+        timeline = self.run_grid()
+        self.assertIsInstance(timeline, DiagramTimeline)
+        g = Grid1D(self.config, self.transfunc)
+        frames = [np.copy(g.grid)]
+        for i in range(self.config.num_generations):
+            g.step()
+            frames.append(np.copy(g.grid))
+        self.assertEqual(len(timeline), len(frames))
+        for t, frame in enumerate(frames):
+            self.assertTrue(np.array_equal(timeline[t], frame))
+        self.assertTrue(np.array_equal(timeline[-1], frames[-1]))
+        self.assertTrue(np.array_equal(timeline.revealed(3), frames[3][:4]))
+        # the display buffer moving backwards and forwards
+        for t in [5, 2, 15, 0, 9]:
+            self.assertTrue(np.array_equal(timeline.frame(t), frames[t]))
+
+    def test_indexing(self):
+        timeline = self.run_grid()
+        self.assertRaises(IndexError, lambda: timeline[16])
+        self.assertEqual(len(list(timeline)), 16)
+
+    def test_resume(self):
+        full = self.run_grid()
+        temp_dir = tempfile.mkdtemp()
+        self.config.checkpoint_path = os.path.join(temp_dir, 'checkpoint.pkl')
+        self.config.checkpoint_generations = 4
+
+        class Crash(Exception):
+            pass
+
+        class Progress(object):
+            def report(self, generation, total, rate):
+                # after the checkpoints at 4 and 8
+                if generation >= 9:
+                    raise Crash()
+
+            def cancelled(self):
+                return False
+
+        try:
+            g = Grid1D(self.config, self.transfunc)
+            g.PROGRESS_INTERVAL = 0
+            timeline = g.new_timeline(g.recorded_generations(15))
+            self.assertRaises(Crash, g._runca, 15, Progress(), timeline)
+            g = Grid1D(self.config, self.transfunc)
+            timeline, first = g.load_checkpoint(15, g.recorded_generations(15))
+            self.assertEqual(first, 8)
+            g._runca(15, self.Progress(), timeline, first)
+            for t in range(16):
+                self.assertTrue(np.array_equal(timeline[t], full[t]))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_recorded_generations(self):
+        full = self.run_grid()
+        self.config.record_stride = 4
+        timeline = self.run_grid()
+        self.assertEqual(len(timeline), 5)
+        for i, t in enumerate([0, 4, 8, 12, 15]):
+            self.assertEqual(timeline.generation(i), t)
+            self.assertTrue(np.array_equal(timeline[i], full[t]))
+            self.assertTrue(np.array_equal(timeline.frame(i), full[t]))
+        self.assertEqual(len(timeline.revealed(1)), 5)
+
+#----------------------------------------------------------------------
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,4 @@
-import sys, inspect, unittest
+import sys, os, glob, pickle, inspect, unittest, tempfile, shutil
 import numpy as np
 this_file_loc = (inspect.stack()[0][1])
 main_dir_loc = this_file_loc[:this_file_loc.index('test')]
@@ -7,7 +7,9 @@ sys.path.append(main_dir_loc + 'capyle')
 sys.path.append(main_dir_loc + 'capyle/ca')
 sys.path.append(main_dir_loc + 'capyle/guicomponents')
 
-from capyle.ca import Grid2D, Neighbourhood, CAConfig
+from capyle.ca import (Grid2D, Neighbourhood, CAConfig, RunProgress,
+                       radius_nhood, load_timeline, set_in_process_run)
+from capyle.utils import load
 
 #----------------------------------------------------------------------
 
@@ -155,5 +157,649 @@ class TestInitialGridSetMeta(type):
 class TestInitialGridSet(unittest.TestCase, metaclass=TestInitialGridSetMeta):
     pass
 
+#----------------------------------------------------------------------
+
+class TestCountNeighbours(unittest.TestCase):
+    def setUp(self):
+        self.config = CAConfig('test/testdescriptions/2dbasic.py')
+        self.config.grid_dims = 20, 30
+
+    def transfunc(self, grid, neighbourstates, neighbourcounts):
+        return grid
+
+    def reference_counts(self, g):
+        # count each state over the 8 neighbour arrays one at a time
+        ns = g.get_neighbour_states()
+        return [sum((n == s) + 0 for n in ns) for s in self.config.states]
+
+    def case(self, states, nhood, wrap=True):
+        self.config.states = states
+        self.config.nhood_arr = nhood
+        self.config.wrap = wrap
+        self.config.initial_grid = np.random.choice(states,
+                                                    self.config.grid_dims)
+        g = Grid2D(self.config, self.transfunc)
+        counts = g.count_neighbours()
+        self.assertEqual(counts.shape, (len(states),) + g.grid.shape)
+        self.assertEqual(counts.dtype, np.uint8)
+        self.assertTrue(counts.flags['C_CONTIGUOUS'])
+        expected = self.reference_counts(g)
+        for c, c_supplied, e in zip(counts,
+                                    g.count_neighbours(
+                                        g.get_neighbour_states()),
+                                    expected):
+            self.assertTrue(np.array_equal(c, e))
+            self.assertTrue(np.array_equal(c_supplied, e))
+
+    def test_moore(self):
+        self.case((0, 1), [[1, 1, 1], [1, 1, 1], [1, 1, 1]])
+
+    def test_von_neumann_many_states(self):
+        self.case((0, 1, 2, 3, 4), [[0, 1, 0], [1, 1, 1], [0, 1, 0]])
+
+    def test_non_index_states(self):
+        self.case((0.5, 2, -1), [[1, 1, 1], [1, 1, 1], [1, 1, 1]],
+                  wrap=False)
+
+    def test_compact_storage(self):
+        self.config.states = 0, 1
+        g = Grid2D(self.config, self.transfunc)
+        self.assertEqual(g.wrapping_grid.dtype, np.uint8)
+        self.assertEqual(g.get_neighbour_states().dtype, np.uint8)
+        self.config.wrap = False
+        g = Grid2D(self.config, self.transfunc)
+        self.assertEqual(g.wrapping_grid.dtype, np.int8)
+
+    def test_returned_states(self):
+        self.config.states = 0, 1
+        # states returned in a wider type are stored
+        g = Grid2D(self.config, lambda grid, ns, nc: np.ones(grid.shape))
+        g.step()
+        self.assertEqual(g.grid.dtype, np.uint8)
+        self.assertTrue(np.all(g.grid == 1))
+        # values the grid can not hold are not cast into it
+        for value in (0.5, 256, -1):
+            g = Grid2D(self.config,
+                       lambda grid, ns, nc: np.full(grid.shape, value))
+            with self.assertRaises(ValueError):
+                g.step()
+
+    def test_neighbour_views(self):
+        self.config.states = 0, 1, 2
+        self.config.nhood_arr = [[0, 1, 0], [1, 1, 1], [0, 1, 0]]
+        self.config.neighbour_views = True
+        self.config.initial_grid = np.random.randint(0, 3,
+                                                     self.config.grid_dims)
+        g = Grid2D(self.config, self.transfunc)
+        ns = g.get_neighbour_states()
+        self.assertEqual(ns.shape, (3, 3) + g.grid.shape)
+        self.assertFalse(ns.flags['WRITEABLE'])
+        self.assertTrue(np.shares_memory(ns, g.wrapping_grid))
+        self.assertTrue(np.array_equal(ns[1, 1], g.grid))
+        # masked neighbours are skipped rather than counted as state 0
+        active = g.active_neighbours()
+        self.assertEqual(active, [(0, 1), (1, 0), (1, 2), (2, 1)])
+        counts = g.count_neighbours()
+        for i, s in enumerate(self.config.states):
+            expected = sum((ns[r, c] == s) + 0 for r, c in active)
+            self.assertTrue(np.array_equal(counts[i], expected))
+            self.assertTrue(np.array_equal(g.count_neighbours(ns)[i],
+                                           expected))
+
+    def test_unpack(self):
+        self.config.states = 0, 1
+        self.config.nhood_arr = [[1, 1, 1], [1, 1, 1], [1, 1, 1]]
+        self.config.initial_grid = np.ones(self.config.grid_dims)
+        g = Grid2D(self.config, self.transfunc)
+        dead, live = g.count_neighbours()
+        self.assertTrue(np.all(live == 8))
+        self.assertTrue(np.all(dead == 0))
+
+#----------------------------------------------------------------------
+
+class TestLargeNeighbourhoods(unittest.TestCase):
+    def setUp(self):
+        self.config = CAConfig('test/testdescriptions/2dbasic.py')
+        self.config.states = 0, 1, 2
+        self.config.grid_dims = 17, 23
+
+    def transfunc(self, grid, neighbourstates, neighbourcounts):
+        return grid
+
+    def reference_counts(self, g):
+        # weighted sum of each shifted copy of the wrapping grid
+        r = g.wrapsize
+        kernel = np.array(g.neighbourhood.neighbourhood, dtype=float)
+        kernel[r, r] = 0
+        rows, cols = g.grid.shape
+        counts = []
+        for s in self.config.states:
+            is_state = (g.wrapping_grid == s) + 0
+            c = np.zeros(g.grid.shape)
+            for i, j in zip(*np.nonzero(kernel)):
+                c += kernel[i, j] * is_state[i:i + rows, j:j + cols]
+            counts.append(c)
+        return np.array(counts)
+
+    def case(self, nhood, wrap=True):
+        self.config.nhood_arr = nhood
+        self.config.wrap = wrap
+        self.config.initial_grid = np.random.randint(0, 3,
+                                                     self.config.grid_dims)
+        g = Grid2D(self.config, self.transfunc)
+        r = g.wrapsize
+        self.assertEqual(g.wrapping_grid.shape, (17 + 2*r, 23 + 2*r))
+        self.assertEqual(g.get_neighbour_states().shape,
+                         (2*r + 1, 2*r + 1, 17, 23))
+        counts = g.count_neighbours()
+        self.assertTrue(np.allclose(counts, self.reference_counts(g)))
+        return g, counts
+
+    def test_moore(self):
+        g, counts = self.case(radius_nhood(2))
+        self.assertEqual(counts.dtype, np.uint8)
+        # square neighbourhood split above, left, right & below the center
+        self.assertEqual(len(g._kernel_rects), 4)
+
+    def test_circular(self):
+        self.case(radius_nhood(4, "CIRCULAR"), wrap=False)
+
+    def test_von_neumann(self):
+        self.case(radius_nhood(3, "VON NEUMANN"))
+
+    def test_weighted(self):
+        self.case(np.arange(25).reshape(5, 5) - 12)
+        g, counts = self.case(np.full((5, 5), 0.5))
+        self.assertEqual(counts.dtype, float)
+
+    def test_radius_too_large(self):
+        self.config.nhood_arr = radius_nhood(20)
+        self.assertRaises(ValueError, Grid2D, self.config, self.transfunc)
+
+    def test_step(self):
+        self.config.nhood_arr = radius_nhood(5)
+        self.config.initial_grid = np.random.randint(0, 3,
+                                                     self.config.grid_dims)
+        g = Grid2D(self.config, self.transfunc)
+        g.step()
+        self.assertTrue(np.array_equal(g.grid, self.config.initial_grid))
+        self.assertTrue(np.shares_memory(g.grid, g.wrapping_grid))
+
+#----------------------------------------------------------------------
+
+class TestStep(unittest.TestCase):
+    def setUp(self):
+        self.config = CAConfig('test/testdescriptions/2dbasic.py')
+        self.config.states = 0, 1
+        self.config.grid_dims = 20, 20
+        self.config.nhood_arr = [[1, 1, 1], [1, 1, 1], [1, 1, 1]]
+        self.config.initial_grid = np.random.randint(0, 2, (20, 20))
+
+    def life(self, grid, neighbourcounts):
+        dead, live = neighbourcounts
+        return (live == 3) | ((live == 2) & (grid == 1))
+
+    def new_array_func(self, grid, neighbourstates, neighbourcounts):
+        return self.life(grid, neighbourcounts).astype(float)
+
+    def out_func(self, grid, neighbourstates, neighbourcounts, out):
+        out[:, :] = self.life(grid, neighbourcounts)
+
+    def test_new_array_keeps_view(self):
+        g = Grid2D(self.config, self.new_array_func)
+        expected = self.life(g.grid, g.count_neighbours())
+        g.step()
+        self.assertTrue(np.shares_memory(g.grid, g.wrapping_grid))
+        self.assertTrue(np.array_equal(g.grid, expected))
+
+    def test_out_buffer(self):
+        a = Grid2D(self.config, self.new_array_func)
+        b = Grid2D(self.config, self.out_func)
+        self.assertTrue(b.transition_takes_out)
+        buffers = {id(b.wrapping_grid), id(b._back_wrapping_grid)}
+        for i in range(10):
+            a.step()
+            b.step()
+            self.assertTrue(np.array_equal(a.wrapping_grid,
+                                           b.wrapping_grid))
+        # the same two buffers are swapped every generation
+        self.assertEqual(buffers, {id(b.wrapping_grid),
+                                   id(b._back_wrapping_grid)})
+        self.assertTrue(np.shares_memory(b.grid, b.wrapping_grid))
+
+#----------------------------------------------------------------------
+
+class TestCompileTransition(unittest.TestCase):
+    class Grid(Grid2D):
+        # a table that is slower on a small grid is still used
+        lookup_faster = True
+
+        def _lookup_faster(self):
+            return self.lookup_faster
+
+    def setUp(self):
+        self.config = CAConfig('test/testdescriptions/2dbasic.py')
+        self.config.states = 0, 1, 2
+        self.config.grid_dims = 20, 20
+        self.config.nhood_arr = [[1, 1, 1], [1, 1, 1], [1, 1, 1]]
+        self.config.initial_grid = np.random.randint(0, 3, (20, 20))
+        # cache the lookup tables in a folder of their own
+        self.tmpdir = tempfile.mkdtemp()
+        self.config.path = os.path.join(self.tmpdir, 'config.pkl')
+        self.cache = os.path.join(self.tmpdir, 'cache', 'lookup', '*.npy')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def spread(self, grid, neighbourstates, neighbourcounts):
+        empty, growing, grown = neighbourcounts
+        new = np.copy(grid)
+        new[(grid == 0) & (grown >= 2)] = 1
+        new[(grid == 1) & (growing + grown > 4)] = 2
+        return new
+
+    def random_func(self, grid, neighbourstates, neighbourcounts):
+        return np.random.randint(0, 3, grid.shape)
+
+    def test_compiled(self):
+        a = Grid2D(self.config, self.spread)
+        self.config.compile_transition = True
+        b = self.Grid(self.config, self.spread)
+        self.assertIsNotNone(b.lookup_values)
+        self.assertEqual(len(glob.glob(self.cache)), 1)
+        # loaded from the cache the second time
+        c = self.Grid(self.config, self.spread)
+        self.assertTrue(np.array_equal(b.lookup_values, c.lookup_values))
+        for i in range(10):
+            a.step()
+            b.step()
+            self.assertTrue(np.array_equal(a.grid, b.grid))
+
+    def test_implied_count(self):
+        self.config.compile_transition = True
+        for wrap, counted in ((True, [0, 1]), (2, [0, 1]),
+                              (False, [0, 1, 2])):
+            self.config.wrap = wrap
+            self.config.compile_transition = False
+            a = Grid2D(self.config, self.spread)
+            self.config.compile_transition = True
+            b = self.Grid(self.config, self.spread)
+            # the count of the last state is only implied when every cell
+            # has a neighbour in some state all the way round
+            self.assertEqual(b.lookup_counted, counted)
+            for i in range(10):
+                a.step()
+                b.step()
+                self.assertTrue(np.array_equal(a.grid, b.grid))
+
+    def test_slower(self):
+        self.config.compile_transition = True
+        self.Grid.lookup_faster = False
+        try:
+            g = self.Grid(self.config, self.spread)
+        finally:
+            del self.Grid.lookup_faster
+        self.assertIsNone(g.lookup_values)
+        # the table is still cached, for a grid it is faster on
+        self.assertEqual(len(glob.glob(self.cache)), 1)
+
+    def test_not_deterministic(self):
+        self.config.compile_transition = True
+        g = Grid2D(self.config, self.random_func)
+        self.assertIsNone(g.lookup_values)
+        self.assertEqual(len(glob.glob(self.cache)), 0)
+
+    def north_func(self, grid, neighbourstates, neighbourcounts):
+        # depends on where the neighbours are, not only how many
+        new = np.copy(grid)
+        new[neighbourstates[1] == 2] = 2
+        return new
+
+    def test_arrangement(self):
+        self.config.compile_transition = True
+        self.config.initial_grid = np.zeros((20, 20), dtype=int)
+        g = Grid2D(self.config, self.north_func)
+        self.assertIsNone(g.lookup_values)
+        self.assertEqual(len(glob.glob(self.cache)), 0)
+        # the grid checked against is the grid given
+        self.assertTrue(np.array_equal(g.grid, self.config.initial_grid))
+
+    def test_bad_cache(self):
+        self.config.compile_transition = True
+        g = self.Grid(self.config, self.spread)
+        path, = glob.glob(self.cache)
+        np.save(path, np.zeros_like(np.load(path)))
+        g = self.Grid(self.config, self.spread)
+        self.assertIsNotNone(g.lookup_values)
+        self.assertTrue(np.any(np.load(path) != 0))
+
+#----------------------------------------------------------------------
+
+class TestCheckpoint(unittest.TestCase):
+    class Crash(Exception):
+        pass
+
+    class Progress(object):
+        def __init__(self, crash_at=None):
+            self.crash_at = crash_at
+
+        def report(self, generation, total, rate):
+            if self.crash_at is not None and generation >= self.crash_at:
+                raise TestCheckpoint.Crash()
+
+        def cancelled(self):
+            return False
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.config = CAConfig("test/testdescriptions/2dbasic.py")
+        self.config.states = 0, 1, 2
+        self.config.grid_dims = 12, 15
+        self.config.num_generations = 30
+        self.config.nhood_arr = np.ones((3, 3))
+        self.config.initial_grid = np.random.randint(0, 3, (12, 15))
+        self.config.checkpoint_path = os.path.join(self.dir, 'checkpoint.pkl')
+        self.config.timeline_path = os.path.join(self.dir, 'timeline.tl')
+        self.config.checkpoint_generations = 5
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def noisy(self, grid, neighbourstates, neighbourcounts, shift):
+        # depends on the random state and the additional argument
+        noise = np.random.randint(0, 3, grid.shape)
+        return (grid + neighbourcounts[1] + noise + shift[0]) % 3
+
+    def run_grid(self, crash_at=None, resume=False):
+        g = Grid2D(self.config, (self.noisy, [1]))
+        # reported every generation
+        g.PROGRESS_INTERVAL = 0
+        n = self.config.num_generations
+        generations = g.recorded_generations(n)
+        resumed = g.load_checkpoint(n, generations) if resume else None
+        timeline, first = resumed or (g.new_timeline(generations), 0)
+        g._runca(n, self.Progress(crash_at), timeline, first)
+        return timeline, first
+
+    def check_resume(self):
+        np.random.seed(3)
+        expected, _ = self.run_grid()
+        # copied out as a streamed timeline is recorded into the same file
+        expected = [np.copy(frame) for frame in expected]
+        os.remove(self.config.checkpoint_path)
+        np.random.seed(3)
+        self.assertRaises(self.Crash, self.run_grid, crash_at=19)
+        np.random.seed(100)
+        timeline, first = self.run_grid(resume=True)
+        self.assertEqual(first, 15)
+        self.assertEqual(len(timeline), len(expected))
+        for i in range(len(expected)):
+            self.assertTrue(np.array_equal(timeline[i], expected[i]))
+
+    def test_resume(self):
+        self.check_resume()
+
+    def test_resume_stride(self):
+        self.config.record_stride = 4
+        self.check_resume()
+
+    def test_resume_stream(self):
+        self.config.stream_timeline = True
+        self.check_resume()
+
+    def test_resume_delta(self):
+        self.config.timeline_keyframes = 4
+        self.check_resume()
+
+    def test_resume_regions(self):
+        self.config.record_regions = [(1, 2, 5, 6)]
+        self.config.record_downsample = 2
+        self.check_resume()
+
+    def test_streamed(self):
+        # the frames are recorded straight into the file, not checkpointed
+        g = Grid2D(self.config, (self.noisy, [1]))
+        timeline = g.new_timeline(g.recorded_generations(30))
+        self.assertIsNotNone(timeline.stream_path)
+
+    def test_frames_written_once(self):
+        self.config.timeline_keyframes = 4
+        self.assertRaises(self.Crash, self.run_grid, crash_at=19)
+        state = load(self.config.checkpoint_path)
+        self.assertEqual((state['generation'], state['num_frames']), (15, 16))
+        # the checkpoints at 5, 10 and 15 each added only their new frames
+        records = 0
+        with open(self.config.checkpoint_path + '.frames', 'rb') as f:
+            while f.tell() < state['frames_size']:
+                pickle.load(f)
+                records += 1
+        self.assertEqual(records, 16)
+
+    def test_other_run(self):
+        self.assertRaises(self.Crash, self.run_grid, crash_at=19)
+        self.config.num_generations = 40
+        timeline, first = self.run_grid(resume=True)
+        self.assertEqual(first, 0)
+
+    def test_no_checkpoint(self):
+        self.config.checkpoint_generations = None
+        self.run_grid()
+        self.assertFalse(os.path.exists(self.config.checkpoint_path))
+
+#----------------------------------------------------------------------
+
+class TestExtendRun(unittest.TestCase):
+    class Progress(object):
+        def report(self, generation, total, rate):
+            pass
+
+        def cancelled(self):
+            return False
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.config = CAConfig("test/testdescriptions/2dbasic.py")
+        self.config.states = 0, 1
+        self.config.grid_dims = 20, 20
+        self.config.nhood_arr = np.ones((3, 3))
+        self.config.rule_string = "B3/S23"
+        self.config.initial_grid = np.random.randint(0, 2, (20, 20))
+        self.config.timeline_path = os.path.join(self.dir, 'timeline.tl')
+        self.config.last_run_path = os.path.join(self.dir, 'last_run.pkl')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_grid(self, num_generations):
+        """Run as Grid.run does, returning the generation started from"""
+        self.config.num_generations = num_generations
+        g = Grid2D(self.config, None)
+        generations = g.recorded_generations(num_generations)
+        fingerprint = g.run_fingerprint()
+        resumed = g.load_last_run(num_generations, generations, fingerprint)
+        timeline, first = resumed or (g.new_timeline(generations), 0)
+        g._runca(num_generations, self.Progress(), timeline, first)
+        g.save_last_run(num_generations, fingerprint)
+        timeline.save(self.config.timeline_path)
+        return timeline, first
+
+    def full_run(self, num_generations):
+        g = Grid2D(self.config, None)
+        frames = [np.copy(g.grid)]
+        for i in range(num_generations):
+            g.step()
+            frames.append(np.copy(g.grid))
+        return frames
+
+    def check(self, timeline, frames):
+        self.assertEqual(len(timeline), len(frames))
+        for i, frame in enumerate(frames):
+            self.assertTrue(np.array_equal(timeline[i], frame))
+
+    def test_extend(self):
+        self.assertEqual(self.run_grid(10)[1], 0)
+        timeline, first = self.run_grid(25)
+        self.assertEqual(first, 10)
+        self.check(timeline, self.full_run(25))
+        # and again from the extended run
+        timeline, first = self.run_grid(30)
+        self.assertEqual(first, 25)
+        self.check(timeline, self.full_run(30))
+
+    def test_stride(self):
+        self.config.record_stride = 5
+        self.run_grid(10)
+        timeline, first = self.run_grid(22)
+        self.assertEqual(first, 10)
+        frames = self.full_run(22)
+        self.check(timeline, [frames[g] for g in (0, 5, 10, 15, 20, 22)])
+        # the final generation recorded is not one of the new stride
+        self.config.record_stride = 4
+        self.assertEqual(self.run_grid(30)[1], 0)
+
+    def test_changed(self):
+        self.run_grid(10)
+        self.config.initial_grid = np.random.randint(0, 2, (20, 20))
+        self.assertEqual(self.run_grid(20)[1], 0)
+        self.config.wrap = False
+        self.assertEqual(self.run_grid(30)[1], 0)
+        # fewer generations is run from the start
+        self.assertEqual(self.run_grid(15)[1], 0)
+        self.assertEqual(self.run_grid(20)[1], 15)
+        self.config.seed = 2
+        self.assertEqual(self.run_grid(25)[1], 0)
+        # neighbour views change the neighbour counts given to the rule
+        self.config.neighbour_views = True
+        self.assertEqual(self.run_grid(30)[1], 0)
+
+    def test_moved_timeline(self):
+        self.run_grid(10)
+        # carried on from wherever the last run saved its timeline
+        self.config.timeline_path = os.path.join(self.dir, 'timeline2.tl')
+        timeline, first = self.run_grid(25)
+        self.assertEqual(first, 10)
+        self.check(timeline, self.full_run(25))
+
+    def test_other_timeline(self):
+        timeline, _ = self.run_grid(10)
+        # the timeline file was overwritten by something else
+        timeline[-1] = 1 - timeline[-1]
+        timeline.save(self.config.timeline_path)
+        self.assertEqual(self.run_grid(20)[1], 0)
+        os.remove(self.config.timeline_path)
+        self.assertEqual(self.run_grid(30)[1], 0)
+
+#----------------------------------------------------------------------
+
+class TestRunProgress(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.config = CAConfig("test/testdescriptions/2dbasic.py")
+        self.config.states = 0, 1
+        self.config.grid_dims = 20, 20
+        self.config.num_generations = 30
+        self.config.nhood_arr = np.ones((3, 3))
+        self.config.rule_string = "B3/S23"
+        self.config.initial_grid = np.random.randint(0, 2, (20, 20))
+        for name in ('timeline_path', 'checkpoint_path', 'last_run_path'):
+            path = getattr(self.config, name)
+            setattr(self.config, name, os.path.join(self.dir,
+                                                    os.path.basename(path)))
+        self.progress = RunProgress.create(os.path.join(self.dir, 'progress'))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check(self, timeline, num_generations):
+        g = Grid2D(self.config, None)
+        self.assertEqual(len(timeline), num_generations + 1)
+        self.assertTrue(np.array_equal(timeline[0], g.grid))
+        for i in range(num_generations):
+            g.step()
+            self.assertTrue(np.array_equal(timeline[i + 1], g.grid))
+
+    def run_cancelled(self):
+        # Grid.run needs no display, so is run as a description runs it
+        self.config.progress_path = self.progress.path
+        self.progress.cancel()
+        timeline = Grid2D(self.config, None).run()
+        # stopped at the first check, after the first generation
+        self.assertEqual(self.progress.generation(), 1)
+        self.assertEqual(self.progress.total(), 30)
+        self.check(timeline, 1)
+        timeline.save(self.config.timeline_path)
+
+    def test_report(self):
+        self.config.progress_path = self.progress.path
+        Grid2D(self.config, None).run()
+        self.assertEqual(self.progress.generation(), 30)
+        self.assertEqual(self.progress.total(), 30)
+        self.assertGreater(self.progress.rate(), 0)
+        self.assertFalse(self.progress.cancelled())
+
+    def test_checked_every_generation(self):
+        class Run(object):
+            reports, checks = 0, 0
+
+            def report(self, generation, total, rate):
+                self.reports += 1
+
+            def cancelled(self):
+                self.checks += 1
+                return False
+
+            def finished(self, ca_config, timeline):
+                pass
+
+        run = Run()
+        g = Grid2D(self.config, None)
+        g.PROGRESS_INTERVAL = 1000
+        set_in_process_run(run)
+        try:
+            g.run()
+        finally:
+            set_in_process_run(None)
+        # checked after every generation, but only reported once at the end
+        self.assertEqual(run.checks, 31)
+        self.assertEqual(run.reports, 1)
+
+    def test_cancel(self):
+        self.run_cancelled()
+        self.assertEqual(load(self.config.last_run_path)['generation'], 1)
+        # carried on from where it was cancelled
+        self.config.progress_path = None
+        self.check(Grid2D(self.config, None).run(), 30)
+
+    def test_cancel_resume(self):
+        self.config.checkpoint_generations = 5
+        self.config.extend_runs = False
+        self.run_cancelled()
+        # checkpointed where it was cancelled rather than cleared
+        self.assertEqual(load(self.config.checkpoint_path)['generation'], 1)
+        g = Grid2D(self.config, None)
+        _, first = g.load_checkpoint(30, g.recorded_generations(30))
+        self.assertEqual(first, 1)
+        self.config.progress_path = None
+        self.config.resume = True
+        self.check(Grid2D(self.config, None).run(), 30)
+        self.assertFalse(os.path.exists(self.config.checkpoint_path))
+
+    def test_cancel_resume_delta(self):
+        self.config.timeline_keyframes = 4
+        self.test_cancel_resume()
+
+    def test_cancel_stream(self):
+        self.config.stream_timeline = True
+        self.run_cancelled()
+        self.check(load_timeline(self.config.timeline_path), 1)
+        self.assertFalse(os.path.exists(self.config.timeline_path + '.part'))
+
+    def test_no_progress(self):
+        # a progress file is not followed unless the config names it
+        self.progress.cancel()
+        self.check(Grid2D(self.config, None).run(), 30)
+
+#----------------------------------------------------------------------
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,87 @@
+import sys, os, inspect, unittest, tempfile, shutil, subprocess, time
+this_file_loc = (inspect.stack()[0][1])
+main_dir_loc = this_file_loc[:this_file_loc.index('test')]
+sys.path.append(main_dir_loc)
+sys.path.append(main_dir_loc + 'capyle')
+sys.path.append(main_dir_loc + 'capyle/ca')
+sys.path.append(main_dir_loc + 'capyle/guicomponents')
+
+from capyle.ca import CAConfig
+import capyle.utils as utils
+
+# set up the path as a description does, import what it imports and report
+# the time taken and which of the GUI libraries were imported
+IMPORT_ENGINE = """
+import sys, time
+main_dir_loc = {!r}
+sys.path.append(main_dir_loc)
+sys.path.append(main_dir_loc + 'capyle')
+sys.path.append(main_dir_loc + 'capyle/ca')
+sys.path.append(main_dir_loc + 'capyle/guicomponents')
+start = time.perf_counter()
+from capyle.ca import Grid2D, Grid1D, Neighbourhood, CAConfig, randomise2d
+import capyle.utils as utils
+print(time.perf_counter() - start)
+print(' '.join(m for m in ('tkinter', 'matplotlib') if m in sys.modules))
+""".format(main_dir_loc)
+
+# wall clock budgets are only checked when this is set, as slow or loaded
+# machines may take longer whatever is imported
+TIMING_TESTS = bool(os.environ.get('CAPYLE_TIMING_TESTS'))
+
+#----------------------------------------------------------------------
+
+class TestImportTime(unittest.TestCase):
+    # seconds a description may take to start, well above the time taken
+    # without the GUI and below that taken when tkinter and matplotlib
+    # are imported too
+    IMPORT_BUDGET = 0.6
+    PRERUN_BUDGET = 2.0
+    # runs timed, the fastest of which is checked against the budget
+    RUNS = 3
+
+    def python(self, args):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable] + args, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, universal_newlines=True)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(out.returncode, 0, out.stderr)
+        return out.stdout, elapsed
+
+    def test_no_gui(self):
+        out, _ = self.python(['-c', IMPORT_ENGINE])
+        self.assertEqual(out.splitlines()[1:], [''])
+
+    @unittest.skipUnless(TIMING_TESTS, 'set CAPYLE_TIMING_TESTS to check')
+    def test_import_budget(self):
+        times = [float(self.python(['-c', IMPORT_ENGINE])[0].split()[0])
+                 for i in range(self.RUNS)]
+        self.assertLess(min(times), self.IMPORT_BUDGET)
+
+    def test_prerun(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            config = CAConfig("ca_descriptions/gol_2d.py")
+            config.path = os.path.join(tmpdir, 'config.pkl')
+            config.save()
+            times = []
+            for i in range(self.RUNS if TIMING_TESTS else 1):
+                _, elapsed = self.python([config.filepath, config.path, '0'])
+                times.append(elapsed)
+            self.assertEqual(utils.load(config.path).states, (0, 1))
+            if TIMING_TESTS:
+                self.assertLess(min(times), self.PRERUN_BUDGET)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_gui_on_use(self):
+        import capyle
+        self.assertEqual(capyle.Display.__name__, 'Display')
+        self.assertTrue(callable(utils.set_icon))
+        with self.assertRaises(AttributeError):
+            utils.not_a_helper
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,7 @@ sys.path.append(main_dir_loc + 'capyle')
 sys.path.append(main_dir_loc + 'capyle/ca')
 sys.path.append(main_dir_loc + 'capyle/guicomponents')
 
-from capyle.ca import Neighbourhood
+from capyle.ca import Neighbourhood, radius_nhood
 
 #define global methods
 def hascenter(a):
@@ -78,8 +78,9 @@ class TestNeighbourhood2DShapesMeta(type):
                         #if even dims and hence no center cell
                         dict[testname] = gen_test_valerr(arr)
                     else:
-                        #odd dimensions
-                        dict[testname] = gen_test_success(arr, (3,3))
+                        #odd dimensions, padded to a square of at least 3x3
+                        size = max(3, *shape)
+                        dict[testname] = gen_test_success(arr, (size,size))
             else:
                 #if supplied array is 1d
                 if shape == (0,):
@@ -244,6 +245,32 @@ class TestInvalidDimsArg(unittest.TestCase, metaclass=TestDimsArgMeta):
 
 #----------------------------------------------------------------------
 
+class TestRadius(unittest.TestCase):
+    def test_large_kept(self):
+        n = Neighbourhood(np.ones((11, 11)))
+        self.assertEqual(n.neighbourhood.shape, (11, 11))
+        self.assertEqual(n.radius, 5)
+
+    def test_row_centered(self):
+        n = Neighbourhood([1, 1, 1, 1, 1])
+        control = np.zeros((5, 5))
+        control[2] = 1
+        self.assertTrue(np.array_equal(n.neighbourhood, control))
+        self.assertEqual(n.radius, 2)
+
+    def test_radius_nhood(self):
+        vn = radius_nhood(1, "VON NEUMANN")
+        self.assertTrue(np.array_equal(vn, [[0, 1, 0], [1, 1, 1], [0, 1, 0]]))
+        self.assertTrue(np.array_equal(radius_nhood(2), np.ones((5, 5))))
+        circle = radius_nhood(10, "CIRCULAR")
+        self.assertEqual(circle.shape, (21, 21))
+        self.assertEqual(circle[0, 10], 1)
+        self.assertEqual(circle[0, 0], 0)
+        self.assertRaises(ValueError, radius_nhood, 0)
+        self.assertRaises(ValueError, radius_nhood, 2, "HEXAGONAL")
+
+#----------------------------------------------------------------------
+
 class TestNeighbourhoodTypes(unittest.TestCase):
     def setUp(self):
         self.ls = [[1,1,1],[1,0,1],[1,1,1]]
@@ -0,0 +1,213 @@
+import sys, inspect, unittest
+import numpy as np
+this_file_loc = (inspect.stack()[0][1])
+main_dir_loc = this_file_loc[:this_file_loc.index('test')]
+sys.path.append(main_dir_loc)
+sys.path.append(main_dir_loc + 'capyle')
+sys.path.append(main_dir_loc + 'capyle/ca')
+sys.path.append(main_dir_loc + 'capyle/guicomponents')
+
+from capyle.ca import (Grid1D, Grid2D, CAConfig, LifeLikeRule, WolframRule,
+                       parse_rule, num_rules)
+from capyle.utils import int_to_binary
+
+#----------------------------------------------------------------------
+
+class TestParseRule(unittest.TestCase):
+    def test_life(self):
+        self.assertEqual(parse_rule("B3/S23"), ({3}, {2, 3}, 2))
+        self.assertEqual(parse_rule("s23/b3"), ({3}, {2, 3}, 2))
+
+    def test_survival_first(self):
+        self.assertEqual(parse_rule("23/3"), ({3}, {2, 3}, 2))
+
+    def test_generations(self):
+        self.assertEqual(parse_rule("B2/S/3"), ({2}, set(), 3))
+        self.assertEqual(parse_rule("B2/S/C3"), ({2}, set(), 3))
+
+    def test_invalid(self):
+        for rule in ["B3", "B3/S23/1", "B3/X23", "B3a/S23", "B3/S2/3/4"]:
+            self.assertRaises(ValueError, parse_rule, rule)
+
+#----------------------------------------------------------------------
+
+class TestTable(unittest.TestCase):
+    def test_life(self):
+        table = LifeLikeRule("B3/S23").table()
+        self.assertEqual(table.shape, (2, 9))
+        self.assertEqual(list(np.flatnonzero(table[0])), [3])
+        self.assertEqual(list(np.flatnonzero(table[1])), [2, 3])
+
+    def test_brians_brain(self):
+        table = LifeLikeRule("B2/S/3").table()
+        self.assertEqual(table.shape, (3, 9))
+        self.assertEqual(list(np.flatnonzero(table[0])), [2])
+        # alive cells always start dying, dying cells always die
+        self.assertTrue(np.all(table[1] == 2))
+        self.assertTrue(np.all(table[2] == 0))
+
+#----------------------------------------------------------------------
+
+class TestLookupStep(unittest.TestCase):
+    def setUp(self):
+        self.config = CAConfig('test/testdescriptions/2dbasic.py')
+        self.config.grid_dims = 30, 30
+        self.config.nhood_arr = [[1, 1, 1], [1, 1, 1], [1, 1, 1]]
+
+    def life(self, grid, neighbourstates, neighbourcounts):
+        dead, live = neighbourcounts
+        return (live == 3) | ((live == 2) & (grid == 1))
+
+    def brians_brain(self, grid, neighbourstates, neighbourcounts):
+        dead, live, dying = neighbourcounts
+        new = np.zeros(grid.shape)
+        new[(grid == 0) & (live == 2)] = 1
+        new[grid == 1] = 2
+        return new
+
+    def case(self, rulestring, transfunc, states, wrap=True):
+        self.config.states = states
+        self.config.wrap = wrap
+        self.config.initial_grid = np.random.choice(states,
+                                                    self.config.grid_dims)
+        a = Grid2D(self.config, transfunc)
+        self.config.rule_string = rulestring
+        b = Grid2D(self.config, None)
+        self.assertIsNotNone(b.lookup_values)
+        for i in range(10):
+            a.step()
+            b.step()
+            self.assertTrue(np.array_equal(a.wrapping_grid, b.wrapping_grid))
+
+    def test_life(self):
+        self.case("B3/S23", self.life, (0, 1))
+
+    def test_life_no_wrap(self):
+        self.case("B3/S23", self.life, (0, 1), wrap=False)
+
+    def test_generations(self):
+        self.case("B2/S/3", self.brians_brain, (0, 1, 2))
+
+    def test_rule_as_transition_func(self):
+        self.config.states = 0, 1
+        self.config.initial_grid = np.random.randint(0, 2,
+                                                     self.config.grid_dims)
+        a = Grid2D(self.config, self.life)
+        b = Grid2D(self.config, LifeLikeRule("B3/S23"))
+        a.step()
+        b.step()
+        self.assertTrue(np.array_equal(a.grid, b.grid))
+
+    def test_states_mismatch(self):
+        self.config.states = 0, 1
+        self.config.rule_string = "B2/S/3"
+        self.assertRaises(ValueError, Grid2D, self.config, None)
+
+class TestWolframRule(unittest.TestCase):
+    def test_num_rules(self):
+        self.assertEqual(num_rules(2), 256)
+        self.assertEqual(num_rules(2, 2), 2**32)
+        self.assertEqual(num_rules(3, 1, True), 3**7)
+
+    def test_elementary_table(self):
+        # the table is the binary rule number, least significant first
+        for n in [0, 30, 90, 110, 255]:
+            table = WolframRule(n).table()
+            self.assertTrue(np.array_equal(table, int_to_binary(n)[::-1]))
+
+    def test_out_of_range(self):
+        self.assertRaises(ValueError, WolframRule, 256)
+        self.assertRaises(ValueError, WolframRule, -1)
+        self.assertRaises(ValueError, WolframRule, 3**7, 3, 1, True)
+        WolframRule(3**27 - 1, 3)
+
+#----------------------------------------------------------------------
+
+class TestWolframStep(unittest.TestCase):
+    def setUp(self):
+        self.config = CAConfig("test/testdescriptions/1dbasic.py")
+        self.config.num_generations = 30
+        self.config.dimensions = 1
+
+    def run_both(self, rule, states, nhood):
+        """Step a grid with the rule's lookup table and one calling the rule
+        as a transition function, which must match"""
+        self.config.states = states
+        self.config.nhood_arr = nhood
+        width = 2 * self.config.num_generations + 1
+        self.config.initial_grid = np.array(
+            [np.random.randint(0, len(states), width)])
+        a = Grid1D(self.config, rule)
+        b = Grid1D(self.config, rule.__call__)
+        self.assertIsNotNone(a.lookup_values)
+        self.assertIsNone(b.lookup_values)
+        for i in range(self.config.num_generations):
+            a.step()
+            b.step()
+        self.assertTrue(np.array_equal(a.grid, b.grid))
+        return a
+
+    def test_rule90(self):
+        g = self.run_both(WolframRule(90), (0, 1), [1, 1, 1])
+        for i in range(self.config.num_generations):
+            row = g.wrapping_grid[i]
+            self.assertTrue(np.array_equal(g.grid[i+1], row[:-2] != row[2:]))
+
+    def test_three_states(self):
+        self.run_both(WolframRule(7 * 10**12, 3), (0, 1, 2), [1, 1, 1])
+
+    def test_totalistic(self):
+        self.run_both(WolframRule(1599, 3, totalistic=True), (0, 1, 2),
+                      [1, 1, 1])
+
+    def test_radius_2(self):
+        self.run_both(WolframRule(2**31 + 12345, 2, 2), (0, 1),
+                      [1, 1, 1, 1, 1])
+
+    def test_masked_neighbourhood(self):
+        # masked neighbours are read as state 0
+        self.config.wrap = False
+        g = self.run_both(WolframRule(90), (0, 1), [0, 1, 1])
+        for i in range(self.config.num_generations):
+            self.assertTrue(np.array_equal(g.grid[i+1],
+                                           g.wrapping_grid[i, 2:]))
+
+    def test_masked_centre(self):
+        # the cell's own state is used even if the neighbourhood masks it
+        self.run_both(WolframRule(30), (0, 1), [1, 0, 1])
+        self.run_both(WolframRule(1599, 3, totalistic=True), (0, 1, 2),
+                      [1, 0, 1])
+
+    def test_state_values(self):
+        # states are used by index
+        self.config.states = (3, 7)
+        self.config.nhood_arr = [1, 1, 1]
+        self.config.initial_grid = np.array([[3] * 30 + [7] + [3] * 30])
+        g = Grid1D(self.config, WolframRule(90))
+        g.step()
+        self.assertEqual(list(g.grid[1, 29:32]), [7, 3, 7])
+
+    def test_dead_border_not_a_state(self):
+        # the border is read as the first state when 0 is not a state
+        self.config.states = (3, 7)
+        self.config.nhood_arr = [1, 1, 1]
+        self.config.wrap = False
+        first = np.array([7] + [3] * 59 + [7])
+        self.config.initial_grid = np.array([first])
+        g = Grid1D(self.config, WolframRule(90))
+        g.step()
+        indices = np.concatenate(([0], first == 7, [0]))
+        expected = np.where(indices[:-2] != indices[2:], 7, 3)
+        self.assertTrue(np.array_equal(g.grid[1], expected))
+
+    def test_mismatch(self):
+        self.config.states = (0, 1)
+        self.config.nhood_arr = [1, 1, 1]
+        self.assertRaises(ValueError, Grid1D, self.config, WolframRule(0, 3))
+        self.assertRaises(ValueError, Grid1D, self.config,
+                          WolframRule(0, 2, 2))
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+    unittest.main()
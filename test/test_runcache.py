@@ -0,0 +1,198 @@
+import sys, os, time, inspect, unittest, tempfile, shutil
+import numpy as np
+this_file_loc = (inspect.stack()[0][1])
+main_dir_loc = this_file_loc[:this_file_loc.index('test')]
+sys.path.append(main_dir_loc)
+sys.path.append(main_dir_loc + 'capyle')
+sys.path.append(main_dir_loc + 'capyle/ca')
+sys.path.append(main_dir_loc + 'capyle/guicomponents')
+
+from capyle.ca import CAConfig, Timeline
+from capyle.runcache import RunCache, PrerunCache
+from capyle.worker import DescriptionWorker
+import capyle.utils as utils
+
+#----------------------------------------------------------------------
+
+class TestRunCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = RunCache(os.path.join(self.dir, 'cache'))
+        self.config = CAConfig("test/testdescriptions/2dbasic.py")
+        self.config.states = 0, 1
+        self.config.num_generations = 10
+        self.config.initial_grid = np.random.randint(0, 2, (20, 20))
+        self.config.timeline_path = os.path.join(self.dir, 'timeline.tl')
+        self.config.seed = 1
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def save_run(self, num_frames=5):
+        """Save a timeline as if the config had been run"""
+        frames = np.random.randint(0, 2, (num_frames, 20, 20)).astype(
+            np.uint8)
+        Timeline(frames, (0, 1)).save(self.config.timeline_path)
+        return frames
+
+    def test_key(self):
+        key = self.cache.key(self.config)
+        self.assertEqual(self.cache.key(self.config), key)
+        # display only fields are not part of the key
+        self.config.state_colors = [(0, 0, 0), (1, 1, 1)]
+        self.config.timeline_path = 'elsewhere.tl'
+        self.assertEqual(self.cache.key(self.config), key)
+        self.config.seed = 2
+        self.assertNotEqual(self.cache.key(self.config), key)
+        self.config.initial_grid[0, 0] = 1 - self.config.initial_grid[0, 0]
+        self.assertNotEqual(self.cache.key(self.config), key)
+        # a run without a seed may differ each time, so is not cached
+        self.config.seed = None
+        self.assertIsNone(self.cache.key(self.config))
+        # unless the description uses no random numbers
+        self.config.deterministic = True
+        key = self.cache.key(self.config)
+        self.assertIsNotNone(key)
+        self.config.seed = 2
+        self.assertNotEqual(self.cache.key(self.config), key)
+
+    def test_deterministic_descriptions(self):
+        for path in ('ca_descriptions/gol_2d.py',
+                     'ca_descriptions/wolframs_1d.py'):
+            config = CAConfig(path)
+            config.path = os.path.join(self.dir, 'config.pkl')
+            config = utils.prerun_ca(config)
+            self.assertIsNotNone(self.cache.key(config))
+
+    def test_get_put(self):
+        key = self.cache.key(self.config)
+        self.assertIsNone(self.cache.get(key))
+        frames = self.save_run()
+        self.cache.put(key, self.config, self.config.timeline_path)
+        # the cached timeline outlives the timeline file being replaced
+        self.save_run()
+        config, timeline = self.cache.get(key)
+        self.assertEqual(config.num_generations, 10)
+        self.assertTrue(np.array_equal(list(timeline), frames))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['entries'], 1)
+
+    def test_eviction(self):
+        keys = []
+        for n in range(4):
+            self.config.num_generations = n + 1
+            keys.append(self.cache.key(self.config))
+            self.save_run(20)
+            self.cache.put(keys[-1], self.config, self.config.timeline_path)
+            # oldest first by last use
+            os.utime(self.cache._paths(keys[-1])[0], (n, n))
+        size = self.cache.entries()[0][2]
+        self.cache.get(keys[0])
+        self.cache.max_bytes = size * 2
+        self.cache.evict()
+        # the entry used most recently is kept along with the newest
+        self.assertEqual(sorted(k for k, _, _ in self.cache.entries()),
+                         sorted([keys[0], keys[3]]))
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_run_ca_hit(self):
+        key = self.cache.key(self.config)
+        frames = self.save_run()
+        self.cache.put(key, self.config, self.config.timeline_path)
+        # loaded from the cache without running the description
+        config, timeline = utils.run_ca(self.config, cache=self.cache)
+        self.assertTrue(np.array_equal(list(timeline), frames))
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_pickled_timeline(self):
+        # descriptions saving their timeline with utils.save write over the
+        # timeline file in place, which must not change the cached run
+        os.mkdir(os.path.join(self.dir, 'ca_descriptions'))
+        filepath = os.path.join(self.dir, 'ca_descriptions', 'gol.py')
+        with open("ca_descriptions/gol_2d.py") as f:
+            source = f.read()
+        with open(filepath, 'w') as f:
+            f.write(source.replace("timeline.save(config.timeline_path)",
+                                   "utils.save(timeline, config.timeline_path)"))
+        config = CAConfig(filepath)
+        for name in ('path', 'checkpoint_path', 'last_run_path'):
+            setattr(config, name, os.path.join(
+                self.dir, os.path.basename(getattr(config, name))))
+        # run in a worker, which finds capyle from this process' path
+        worker = DescriptionWorker()
+        try:
+            config = utils.prerun_ca(config, worker=worker)
+            config.timeline_path = self.config.timeline_path
+            config.grid_dims = 20, 20
+            config.num_generations = 10
+            config.initial_grid = np.random.randint(0, 2, (20, 20))
+            config.seed = 1
+            key = self.cache.key(config)
+            _, timeline = utils.run_ca(config, cache=self.cache,
+                                       worker=worker)
+            frames = np.array(list(timeline))
+            config.num_generations = 25
+            _, timeline = utils.run_ca(config, cache=self.cache,
+                                       worker=worker)
+        finally:
+            worker.stop()
+        self.assertEqual(len(timeline), 26)
+        _, cached = self.cache.get(key)
+        self.assertEqual(len(cached), 11)
+        self.assertTrue(np.array_equal(list(cached), frames))
+
+#----------------------------------------------------------------------
+
+class TestPrerunCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = PrerunCache(self.dir)
+        self.filepath = "test/testdescriptions/2dbasic.py"
+        self.stat = os.stat(self.filepath)
+
+    def tearDown(self):
+        os.utime(self.filepath, ns=(self.stat.st_atime_ns,
+                                    self.stat.st_mtime_ns))
+        shutil.rmtree(self.dir)
+
+    def prerun(self):
+        return utils.prerun_ca(CAConfig(self.filepath), cache=self.cache)
+
+    def test_hit(self):
+        config = self.prerun()
+        self.assertEqual(config.states, (0, 1, 2))
+        start = time.time()
+        cached = self.prerun()
+        # no interpreter is started
+        self.assertLess(time.time() - start, 0.1)
+        self.assertEqual(cached.states, (0, 1, 2))
+        self.assertEqual(cached.grid_dims, config.grid_dims)
+        self.assertIsNot(cached, self.prerun())
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_changed(self):
+        self.prerun()
+        # the description is saved again
+        os.utime(self.filepath, ns=(self.stat.st_atime_ns,
+                                    self.stat.st_mtime_ns + 10**9))
+        self.prerun()
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+        self.prerun()
+        self.assertEqual(self.cache.hits, 1)
+        # and one entry kept for the description
+        self.assertEqual(len(os.listdir(self.dir)), 1)
+
+    def test_config_changed(self):
+        self.prerun()
+        config = CAConfig(self.filepath)
+        config.num_generations = 7
+        prerun = utils.prerun_ca(config, cache=self.cache)
+        self.assertEqual(prerun.num_generations, 7)
+        self.assertEqual(self.cache.misses, 2)
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+    unittest.main()
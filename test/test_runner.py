@@ -0,0 +1,177 @@
+import sys, os, inspect, unittest, tempfile, shutil
+import numpy as np
+this_file_loc = (inspect.stack()[0][1])
+main_dir_loc = this_file_loc[:this_file_loc.index('test')]
+sys.path.append(main_dir_loc)
+sys.path.append(main_dir_loc + 'capyle')
+sys.path.append(main_dir_loc + 'capyle/ca')
+sys.path.append(main_dir_loc + 'capyle/guicomponents')
+
+from capyle.ca import CAConfig, Grid2D, LiveTimeline, load_timeline
+from capyle.runner import InProcessRun, BackgroundRun, load_description
+from capyle.worker import DescriptionWorker
+from capyle.runcache import RunCache
+import capyle.runner as runner
+
+#----------------------------------------------------------------------
+
+class TestInProcessRun(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.config = self.make_config("ca_descriptions/gol_2d.py")
+        self.config.states = 0, 1
+        self.config.grid_dims = 20, 20
+        self.config.num_generations = 12
+        self.config.fill_in_defaults()
+        self.config.initial_grid = np.random.randint(0, 2, (20, 20))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def make_config(self, filepath):
+        config = CAConfig(filepath)
+        for name in ('path', 'timeline_path', 'checkpoint_path',
+                     'last_run_path'):
+            path = getattr(config, name)
+            setattr(config, name, os.path.join(self.dir,
+                                               os.path.basename(path)))
+        return config
+
+    def run_config(self, config, cache=None):
+        run = InProcessRun(config, cache)
+        run.start()
+        self.assertTrue(run.wait(30))
+        run.join(30)
+        return run
+
+    def test_run(self):
+        run = self.run_config(self.config)
+        self.assertIsNone(run.error)
+        config, timeline = run.result()
+        self.assertEqual(config.title, "Conway's game of life")
+        self.assertEqual(len(timeline), 13)
+        # the same as running the description's transition function here
+        description = load_description("ca_descriptions/gol_2d.py")
+        g = Grid2D(self.config, description.transition_func)
+        for i in range(12):
+            g.step()
+            self.assertTrue(np.array_equal(timeline[i + 1], g.grid))
+        self.assertGreaterEqual(run.generation, 9)
+        # and saved by the description as usual
+        saved = load_timeline(config.timeline_path)
+        self.assertTrue(np.array_equal(saved[-1], timeline[-1]))
+
+    def test_cache(self):
+        cache = RunCache(os.path.join(self.dir, 'cache'))
+        self.config.seed = 1
+        self.run_config(self.config, cache)
+        self.assertEqual(cache.stats()['entries'], 1)
+        # looked up by the caller before the run, not by the run itself
+        self.assertEqual(cache.stats()['misses'], 0)
+        self.assertIsNotNone(cache.get(cache.key(self.config)))
+
+    def test_cancel(self):
+        cache = RunCache(os.path.join(self.dir, 'cache'))
+        run = InProcessRun(self.config, cache)
+        run.cancel()
+        run.start()
+        self.assertTrue(run.wait(30))
+        run.join(30)
+        config, timeline = run.result()
+        # the frames up to the first check, after the first generation
+        self.assertEqual(len(timeline), 2)
+        self.assertEqual(run.progress()[:2], (1, 12))
+        # and not cached as the run of the config
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_error(self):
+        # the description's main uses an old Grid2D signature
+        config = self.make_config("test/testdescriptions/2dbasic.py")
+        argv = list(sys.argv)
+        run = self.run_config(config)
+        self.assertIn("TypeError", run.error)
+        self.assertEqual(run.result(), (None, None))
+        self.assertEqual(sys.argv, argv)
+
+    def test_concurrent(self):
+        # each description reads its own arguments from sys.argv
+        other = self.make_config("ca_descriptions/gol_2d.py")
+        for name in ('path', 'timeline_path', 'checkpoint_path',
+                     'last_run_path'):
+            setattr(other, name, getattr(other, name) + '.other')
+        other.grid_dims = self.config.grid_dims
+        other.initial_grid = self.config.initial_grid
+        other.num_generations = 6
+        argv = list(sys.argv)
+        runs = [InProcessRun(self.config), InProcessRun(other)]
+        for run in runs:
+            run.start()
+        for run in runs:
+            self.assertTrue(run.wait(30))
+            run.join(30)
+            self.assertIsNone(run.error)
+        self.assertEqual([len(run.result()[1]) for run in runs], [13, 7])
+        self.assertEqual(sys.argv, argv)
+
+    def test_waits_for_argv(self):
+        argv = list(sys.argv)
+        run = InProcessRun(self.config)
+        with runner._argv_lock:
+            # another run is using sys.argv
+            run.start()
+            self.assertFalse(run.wait(0.5))
+            self.assertEqual(sys.argv, argv)
+        self.assertTrue(run.wait(30))
+        run.join(30)
+        self.assertIsNone(run.error)
+        self.assertEqual(sys.argv, argv)
+
+#----------------------------------------------------------------------
+
+class TestBackgroundRun(TestInProcessRun):
+    def setUp(self):
+        super(TestBackgroundRun, self).setUp()
+        # run by the worker rather than a new interpreter, to be quicker
+        self.worker = DescriptionWorker()
+
+    def tearDown(self):
+        self.worker.stop()
+        super(TestBackgroundRun, self).tearDown()
+
+    # runs in the worker are not in this process
+    test_concurrent = None
+    test_waits_for_argv = None
+
+    def run_config(self, config, cache=None):
+        run = BackgroundRun(config, cache, self.worker)
+        run.start()
+        self.assertTrue(run.wait(30))
+        run.join(30)
+        return run
+
+    def test_run(self):
+        self.config.live_timeline = True
+        run = self.run_config(self.config)
+        self.assertIsNone(run.error)
+        config, timeline = run.result()
+        self.assertEqual(len(timeline), 13)
+        self.assertTrue(config.live_timeline)
+        description = load_description("ca_descriptions/gol_2d.py")
+        g = Grid2D(self.config, description.transition_func)
+        for i in range(12):
+            g.step()
+        self.assertTrue(np.array_equal(timeline[-1], g.grid))
+        # streamed while run, and finished with once saved
+        self.assertIsNone(LiveTimeline.open(config.timeline_path))
+
+    def test_error(self):
+        config = self.make_config("test/testdescriptions/2dbasic.py")
+        run = self.run_config(config)
+        # printed by run_ca, as for a run in a new interpreter
+        self.assertIsNone(run.error)
+        self.assertEqual(run.result(), (None, None))
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+    unittest.main()
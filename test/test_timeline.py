@@ -0,0 +1,662 @@
+import sys, os, io, inspect, unittest, tempfile, shutil, pickle
+import contextlib
+import numpy as np
+this_file_loc = (inspect.stack()[0][1])
+main_dir_loc = this_file_loc[:this_file_loc.index('test')]
+sys.path.append(main_dir_loc)
+sys.path.append(main_dir_loc + 'capyle')
+sys.path.append(main_dir_loc + 'capyle/ca')
+sys.path.append(main_dir_loc + 'capyle/guicomponents')
+
+from capyle.ca import (Grid2D, CAConfig, Timeline, DiagramTimeline,
+                       DeltaTimeline, PackedTimeline, RegionTimeline,
+                       LiveTimeline, load_timeline)
+
+#----------------------------------------------------------------------
+
+class TestTimeline(unittest.TestCase):
+    def setUp(self):
+        self.frames = np.random.randint(0, 3, (10, 4, 5)).astype(np.uint8)
+        self.timeline = Timeline(self.frames, (0, 1, 2))
+
+    def test_frames(self):
+        self.assertEqual(len(self.timeline), 10)
+        self.assertTrue(np.array_equal(self.timeline[3], self.frames[3]))
+        self.assertTrue(np.array_equal(list(self.timeline), self.frames))
+
+    def test_slice(self):
+        # slices are views with the generations kept
+        sliced = self.timeline[2::3]
+        self.assertEqual(len(sliced), 3)
+        self.assertEqual(sliced.stride, 3)
+        self.assertEqual([sliced.generation(i) for i in range(3)], [2, 5, 8])
+        self.assertTrue(np.shares_memory(sliced.frames, self.frames))
+        self.assertEqual(sliced[1:].generation(0), 5)
+
+    def test_run(self):
+        config = CAConfig("test/testdescriptions/2dbasic.py")
+        config.states = 0, 1
+        config.grid_dims = 10, 12
+        config.num_generations = 5
+        config.nhood_arr = np.ones((3, 3))
+        config.rule_string = "B3/S23"
+        config.backend = 'array'
+        g = Grid2D(config, None)
+        timeline = g.new_timeline(
+            g.recorded_generations(config.num_generations))
+
+        class Progress(object):
+            def report(self, generation, total, rate):
+                pass
+
+            def cancelled(self):
+                return False
+
+        g._runca(config.num_generations, Progress(), timeline)
+        self.assertIsInstance(timeline, Timeline)
+        self.assertEqual(timeline.frames.shape, (6, 10, 12))
+        self.assertTrue(np.array_equal(timeline[-1], g.grid))
+
+    def test_run_bitboard(self):
+        config = CAConfig("test/testdescriptions/2dbasic.py")
+        config.states = 0, 1
+        config.nhood_arr = np.ones((3, 3))
+        config.rule_string = "B3/S23"
+        config.num_generations = 8
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        config.last_run_path = os.path.join(tmpdir, 'last_run.pkl')
+        for cols in (12, 16):
+            config.grid_dims = 10, cols
+            config.initial_grid = np.random.randint(0, 2, (10, cols))
+            config.backend = 'array'
+            expected = Grid2D(config, None).run()
+            config.backend = 'bitboard'
+            g = Grid2D(config, None)
+            unpacked = []
+            unpack = g.bitboard.unpack
+            g.bitboard.unpack = lambda out: unpacked.append(1) or unpack(out)
+            timeline = g.run()
+            # recorded from the bitboard, only the final grid is unpacked
+            self.assertIsInstance(timeline, PackedTimeline)
+            self.assertLessEqual(len(unpacked), 1)
+            self.assertEqual(len(timeline), 9)
+            for i in range(9):
+                self.assertTrue(np.array_equal(timeline[i], expected[i]))
+
+#----------------------------------------------------------------------
+
+class TestRecording(unittest.TestCase):
+    class Progress(object):
+        def report(self, generation, total, rate):
+            pass
+
+        def cancelled(self):
+            return False
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'timeline.tl')
+        self.config = CAConfig("test/testdescriptions/2dbasic.py")
+        self.config.states = 0, 1
+        self.config.grid_dims = 10, 12
+        self.config.num_generations = 10
+        self.config.nhood_arr = np.ones((3, 3))
+        self.config.rule_string = "B3/S23"
+        self.config.timeline_path = self.path
+        self.config.initial_grid = np.random.randint(0, 2, (10, 12))
+        # every generation of the run
+        g = Grid2D(self.config, None)
+        self.frames = [np.copy(g.grid)]
+        for i in range(self.config.num_generations):
+            g.step()
+            self.frames.append(np.copy(g.grid))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_grid(self):
+        g = Grid2D(self.config, None)
+        generations = g.recorded_generations(self.config.num_generations)
+        timeline = g.new_timeline(generations)
+        g._runca(self.config.num_generations, self.Progress(), timeline, 0,
+                 generations)
+        return generations, timeline
+
+    def check(self, expected):
+        generations, timeline = self.run_grid()
+        self.assertEqual(generations, expected)
+        self.assertEqual(len(timeline), len(expected))
+        for i, gen in enumerate(expected):
+            self.assertEqual(timeline.generation(i), gen)
+            self.assertTrue(np.array_equal(timeline[i], self.frames[gen]))
+        return timeline
+
+    def test_every_generation(self):
+        timeline = self.check(list(range(11)))
+        self.assertIsNone(timeline.generations)
+
+    def test_stride(self):
+        self.config.record_stride = 3
+        self.check([0, 3, 6, 9, 10])
+        self.config.record_stride = 5
+        self.check([0, 5, 10])
+
+    def test_generations(self):
+        self.config.record_generations = [7, 2, 2, 11, -1]
+        self.check([2, 7])
+
+    def test_warned_once(self):
+        self.config.record_generations = [2, 11]
+        self.config.checkpoint_generations = 2
+        self.config.checkpoint_path = os.path.join(self.dir, 'checkpoint.pkl')
+        self.config.last_run_path = os.path.join(self.dir, 'last_run.pkl')
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            timeline = Grid2D(self.config, None).run()
+        self.assertEqual(out.getvalue().count("[WARNING]"), 1)
+        self.assertEqual((len(timeline), timeline.generation(0)), (1, 2))
+
+    def test_final_only(self):
+        self.config.record_final_only = True
+        self.config.record_stride = 3
+        self.check([10])
+
+    def test_delta_and_stream(self):
+        self.config.record_stride = 4
+        self.config.timeline_keyframes = 2
+        self.check([0, 4, 8, 10])
+        self.config.timeline_keyframes = None
+        self.config.stream_timeline = True
+        self.check([0, 4, 8, 10])
+
+    def test_save_load(self):
+        self.config.record_generations = [1, 4, 9]
+        _, timeline = self.run_grid()
+        for pack in (True, False):
+            timeline.save(self.path, pack=pack)
+            loaded = load_timeline(self.path)
+            self.assertEqual([loaded.generation(i) for i in range(3)],
+                             [1, 4, 9])
+            self.assertEqual(loaded[1:].generation(0), 4)
+
+#----------------------------------------------------------------------
+
+class TestRegionTimeline(unittest.TestCase):
+    class Progress(object):
+        def report(self, generation, total, rate):
+            pass
+
+        def cancelled(self):
+            return False
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'timeline.tl')
+        self.config = CAConfig("test/testdescriptions/2dbasic.py")
+        self.config.states = 0, 1
+        self.config.grid_dims = 30, 40
+        self.config.num_generations = 8
+        self.config.nhood_arr = np.ones((3, 3))
+        self.config.rule_string = "B3/S23"
+        self.config.initial_grid = np.random.randint(0, 2, (30, 40))
+        self.config.record_regions = [(0, 0, 5, 6), (20, 30, 10, 10)]
+        self.config.record_downsample = 4
+        g = Grid2D(self.config, None)
+        self.frames = [np.copy(g.grid)]
+        for i in range(self.config.num_generations):
+            g.step()
+            self.frames.append(np.copy(g.grid))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_grid(self):
+        g = Grid2D(self.config, None)
+        timeline = g.new_timeline(
+            g.recorded_generations(self.config.num_generations))
+        g._runca(self.config.num_generations, self.Progress(), timeline)
+        return timeline
+
+    def check(self, timeline, generations):
+        self.assertEqual(len(timeline.labels()), 3)
+        windows = [lambda f: f[0:5, 0:6], lambda f: f[20:30, 30:40],
+                   lambda f: f[::4, ::4]]
+        for view, window in enumerate(windows):
+            timeline.select(view)
+            self.assertEqual(len(timeline), len(generations))
+            for i, gen in enumerate(generations):
+                self.assertEqual(timeline.generation(i), gen)
+                expected = window(self.frames[gen])
+                self.assertTrue(np.array_equal(timeline[i], expected))
+                self.assertTrue(np.array_equal(timeline.frame(i), expected))
+        self.assertEqual(timeline[0].shape, (8, 10))
+
+    def test_run(self):
+        timeline = self.run_grid()
+        self.assertIsInstance(timeline, RegionTimeline)
+        self.check(timeline, range(9))
+
+    def test_save_load(self):
+        self.config.record_stride = 3
+        self.run_grid().save(self.path)
+        self.check(load_timeline(self.path), [0, 3, 6, 8])
+
+    def test_regions_only(self):
+        self.config.record_downsample = None
+        timeline = self.run_grid()
+        self.assertEqual(len(timeline.views), 2)
+        self.assertRaises(IndexError, lambda: timeline.select(2))
+
+    def test_outside_grid(self):
+        self.config.record_regions = [(25, 0, 10, 10)]
+        self.assertRaises(ValueError, self.run_grid)
+
+#----------------------------------------------------------------------
+
+class TestSaveLoad(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'timeline.tl')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_roundtrip(self):
+        for dtype in [np.uint8, np.int16, np.float64]:
+            frames = np.random.randint(0, 3, (6, 7, 9)).astype(dtype)
+            Timeline(frames, (0, 1, 2), stride=2).save(self.path, pack=False)
+            for mmap in [True, False]:
+                loaded = load_timeline(self.path, mmap=mmap)
+                self.assertEqual(loaded.frames.dtype, dtype)
+                self.assertTrue(np.array_equal(loaded.frames, frames))
+                self.assertEqual(loaded.states, [0, 1, 2])
+                self.assertEqual(loaded.stride, 2)
+            del loaded
+
+    def test_mapped(self):
+        Timeline(np.zeros((3, 4, 4), dtype=np.uint8)).save(self.path)
+        loaded = load_timeline(self.path)
+        self.assertIsInstance(loaded.frames, np.memmap)
+        # saving again leaves the mapped timeline intact
+        Timeline(np.ones((2, 4, 4), dtype=np.uint8)).save(self.path)
+        self.assertEqual(np.count_nonzero(loaded.frames), 0)
+        self.assertEqual(len(load_timeline(self.path)), 2)
+
+    def test_diagram(self):
+        diagram = np.random.randint(0, 2, (5, 9))
+        DiagramTimeline(diagram, np.zeros(9)).save(self.path)
+        loaded = load_timeline(self.path)
+        self.assertIsInstance(loaded, DiagramTimeline)
+        self.assertTrue(np.array_equal(loaded.diagram, diagram))
+        self.assertTrue(np.array_equal(loaded[1][2:], np.zeros((3, 9))))
+
+    def test_pickled(self):
+        timeline = np.empty(2, dtype=np.ndarray)
+        timeline[0], timeline[1] = np.zeros((3, 3)), np.ones((3, 3))
+        with open(self.path, 'wb') as f:
+            pickle.dump(timeline, f)
+        loaded = load_timeline(self.path)
+        self.assertTrue(np.array_equal(loaded[1], np.ones((3, 3))))
+
+    def test_newer_version(self):
+        Timeline(np.zeros((1, 3, 3))).save(self.path)
+        with open(self.path, 'r+b') as f:
+            f.seek(7)
+            f.write(bytes([99]))
+        self.assertRaises(ValueError, load_timeline, self.path)
+
+#----------------------------------------------------------------------
+
+class TestStream(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'timeline.tl')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_create(self):
+        timeline = Timeline.create(self.path, 4, (5, 6), np.int16, (0, 1))
+        self.assertIsInstance(timeline.frames, np.memmap)
+        frames = np.random.randint(0, 2, (4, 5, 6))
+        for i in range(4):
+            timeline[i] = frames[i]
+        # nothing at the path until saved
+        self.assertFalse(os.path.exists(self.path))
+        timeline.save(self.path)
+        # packed a frame at a time, and the file recorded into removed
+        loaded = load_timeline(self.path)
+        self.assertIsInstance(loaded, PackedTimeline)
+        self.assertTrue(np.array_equal(list(loaded), frames))
+        self.assertEqual(loaded[0].dtype, np.int16)
+        self.assertEqual(loaded.states, [0, 1])
+        self.assertEqual(os.listdir(self.dir), ['timeline.tl'])
+
+    def test_create_unpackable(self):
+        timeline = Timeline.create(self.path, 2, (5, 6), np.int16, (0, 1))
+        timeline[0] = 0
+        # not one of the states, so the file is saved as it is
+        timeline[1] = 5
+        timeline.save(self.path)
+        loaded = load_timeline(self.path)
+        self.assertIsInstance(loaded.frames, np.memmap)
+        self.assertEqual(loaded[1][0, 0], 5)
+        self.assertEqual(os.listdir(self.dir), ['timeline.tl'])
+
+    def test_mapped_while_recording(self):
+        Timeline(np.zeros((2, 3, 3), dtype=np.uint8)).save(self.path)
+        loaded = load_timeline(self.path)
+        timeline = Timeline.create(self.path, 2, (3, 3), np.uint8)
+        timeline[0] = 1
+        timeline.save(self.path)
+        self.assertEqual(np.count_nonzero(loaded.frames), 0)
+        self.assertEqual(np.count_nonzero(load_timeline(self.path)[0]), 9)
+
+    def test_run(self):
+        config = CAConfig("test/testdescriptions/2dbasic.py")
+        config.states = 0, 1
+        config.grid_dims = 10, 12
+        config.num_generations = 5
+        config.nhood_arr = np.ones((3, 3))
+        config.rule_string = "B3/S23"
+        config.stream_timeline = True
+        config.timeline_path = self.path
+        config.initial_grid = np.random.randint(0, 2, (10, 12))
+        g = Grid2D(config, None)
+        timeline = g.new_timeline(
+            g.recorded_generations(config.num_generations))
+
+        class Progress(object):
+            def report(self, generation, total, rate):
+                pass
+
+            def cancelled(self):
+                return False
+
+        g._runca(config.num_generations, Progress(), timeline)
+        timeline.save(config.timeline_path)
+        loaded = load_timeline(self.path)
+        self.assertEqual(len(loaded), 6)
+        self.assertTrue(np.array_equal(loaded[-1], g.grid))
+
+#----------------------------------------------------------------------
+
+class TestLiveTimeline(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'timeline.tl')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_follow(self):
+        self.assertIsNone(LiveTimeline.open(self.path))
+        timeline = Timeline.create(self.path, 4, (5, 6), np.uint8, (0, 1),
+                                   [0, 2, 4, 5])
+        live = LiveTimeline.open(self.path)
+        self.assertEqual(len(live), 0)
+        self.assertEqual(live.num_frames(), 4)
+        frames = np.random.randint(0, 2, (4, 5, 6))
+        for i in range(4):
+            timeline[i] = frames[i]
+            # grows as each frame is recorded
+            self.assertEqual(len(live), i + 1)
+            self.assertTrue(np.array_equal(live[-1], frames[i]))
+            self.assertEqual(live.generation(i), [0, 2, 4, 5][i])
+        self.assertTrue(live.complete())
+        timeline.save(self.path)
+        # the count is removed once saved, but the frames are still mapped
+        self.assertIsNone(LiveTimeline.open(self.path))
+        self.assertTrue(np.array_equal(list(live), frames))
+        self.assertEqual(live.states, [0, 1])
+
+    def test_clear(self):
+        timeline = Timeline.create(self.path, 2, (3, 3), np.uint8)
+        timeline[0] = 1
+        LiveTimeline.clear(self.path)
+        self.assertIsNone(LiveTimeline.open(self.path))
+        # resuming the stream maps the count again if it is still there
+        timeline = Timeline.create(self.path, 2, (3, 3), np.uint8)
+        timeline[:1] = 1
+        reopened = Timeline.reopen(timeline.stream_path)
+        reopened[1] = 2
+        live = LiveTimeline.open(self.path)
+        self.assertEqual(len(live), 2)
+        self.assertEqual(live[1][0, 0], 2)
+
+    def test_run(self):
+        config = CAConfig("test/testdescriptions/2dbasic.py")
+        config.states = 0, 1
+        config.grid_dims = 10, 12
+        config.num_generations = 5
+        config.nhood_arr = np.ones((3, 3))
+        config.rule_string = "B3/S23"
+        config.live_timeline = True
+        config.timeline_path = self.path
+        config.initial_grid = np.random.randint(0, 2, (10, 12))
+        g = Grid2D(config, None)
+        timeline = g.new_timeline(
+            g.recorded_generations(config.num_generations))
+        live = LiveTimeline.open(self.path)
+        lengths = []
+
+        class Progress(object):
+            def report(self, generation, total, rate):
+                pass
+
+            def cancelled(self):
+                return False
+
+        # the frames available before each step
+        g.step = lambda step=g.step: (lengths.append(len(live)), step())
+        g._runca(config.num_generations, Progress(), timeline)
+        # one more frame recorded with each step
+        self.assertEqual(lengths, [1, 2, 3, 4, 5])
+        self.assertTrue(np.array_equal(live[-1], g.grid))
+
+#----------------------------------------------------------------------
+
+class TestTruncate(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'timeline.tl')
+        self.frames = np.random.randint(0, 3, (12, 5, 6)).astype(np.uint8)
+        self.generations = [0, 1, 3, 4, 6, 7, 9, 10, 12, 13, 15, 16]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def record(self, timeline, num_frames=12):
+        for i in range(num_frames):
+            timeline[i] = self.frames[i]
+        return timeline
+
+    def check(self, timeline, num_frames):
+        self.assertEqual(len(timeline), num_frames)
+        for i in range(num_frames):
+            self.assertTrue(np.array_equal(timeline[i], self.frames[i]))
+            self.assertEqual(timeline.generation(i), self.generations[i])
+
+    def check_saved(self, timeline, num_frames):
+        timeline.save(self.path)
+        self.check(load_timeline(self.path), num_frames)
+
+    def test_timeline(self):
+        timeline = self.record(Timeline.empty(12, (5, 6), np.uint8, (0, 1, 2),
+                                              self.generations), 7)
+        timeline.truncate(7)
+        self.check(timeline, 7)
+        self.check_saved(timeline, 7)
+
+    def test_stream(self):
+        timeline = self.record(Timeline.create(
+            self.path, 12, (5, 6), np.uint8, (0, 1, 2), self.generations), 5)
+        timeline.truncate(5)
+        # cut short in place rather than copied
+        self.assertEqual(os.path.getsize(timeline.stream_path),
+                         timeline.frames.offset + 5 * 30)
+        self.check(timeline, 5)
+        self.check_saved(timeline, 5)
+
+    def test_delta(self):
+        timeline = self.record(DeltaTimeline((5, 6), np.uint8, (0, 1, 2), 4,
+                                             generations=self.generations))
+        timeline.truncate(6)
+        self.check(timeline, 6)
+        self.assertEqual(len(timeline.keyframes), 2)
+        self.check_saved(timeline, 6)
+        # truncating a loaded timeline
+        loaded = load_timeline(self.path)
+        loaded.truncate(3)
+        self.check(loaded, 3)
+
+    def test_regions(self):
+        timeline = self.record(RegionTimeline.empty(
+            12, (5, 6), np.uint8, [(1, 1, 2, 3)], 2, (0, 1, 2),
+            self.generations), 8)
+        timeline.truncate(8)
+        self.assertEqual(len(timeline), 8)
+        self.assertTrue(np.array_equal(timeline[7], self.frames[7][1:3, 1:4]))
+        timeline.select(1)
+        self.assertTrue(np.array_equal(timeline[7], self.frames[7][::2, ::2]))
+        self.assertEqual(timeline.generation(7), 10)
+
+    def test_diagram(self):
+        diagram = np.zeros((8, 5), dtype=np.uint8)
+        timeline = DiagramTimeline(diagram, np.zeros(5))
+        diagram[:4] = 1
+        timeline.truncate(4)
+        self.assertEqual(len(timeline), 4)
+        self.assertTrue(np.array_equal(timeline[-1], diagram))
+
+#----------------------------------------------------------------------
+
+class TestDeltaTimeline(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'timeline.tl')
+        # a few cells change each frame
+        frames = [np.random.randint(0, 3, (20, 30))]
+        for i in range(39):
+            frame = frames[-1].copy()
+            frame[np.random.randint(0, 20, 5), np.random.randint(0, 30, 5)] = (
+                np.random.randint(0, 3, 5))
+            frames.append(frame)
+        self.frames = np.array(frames, dtype=np.uint8)
+        self.timeline = DeltaTimeline((20, 30), np.uint8, (0, 1, 2), 8)
+        for i, frame in enumerate(self.frames):
+            self.timeline[i] = frame
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check(self, timeline):
+        self.assertEqual(len(timeline), 40)
+        for t in [0, 7, 8, 9, 39, -1]:
+            self.assertTrue(np.array_equal(timeline[t], self.frames[t]))
+        self.assertTrue(np.array_equal(list(timeline), self.frames))
+        # seeking the display buffer back and forwards
+        for t in [3, 5, 20, 2, 39, 16, 17]:
+            self.assertTrue(np.array_equal(timeline.frame(t),
+                                           self.frames[t]))
+
+    def test_frames(self):
+        self.check(self.timeline)
+        self.assertLess(self.timeline.nbytes(), self.frames.nbytes / 2)
+
+    def test_in_order(self):
+        self.assertRaises(IndexError, self.timeline.__setitem__, 41,
+                          self.frames[0])
+
+    def test_save_load(self):
+        self.timeline.save(self.path)
+        for mmap in [True, False]:
+            loaded = load_timeline(self.path, mmap=mmap)
+            self.assertIsInstance(loaded, DeltaTimeline)
+            self.assertEqual(loaded.keyframe_interval, 8)
+            self.assertEqual(loaded.states, [0, 1, 2])
+            self.check(loaded)
+        # saving a loaded timeline
+        loaded.save(self.path + '2')
+        self.check(load_timeline(self.path + '2'))
+
+    def test_run(self):
+        config = CAConfig("test/testdescriptions/2dbasic.py")
+        config.states = 0, 1
+        config.grid_dims = 10, 12
+        config.num_generations = 12
+        config.nhood_arr = np.ones((3, 3))
+        config.rule_string = "B3/S23"
+        config.timeline_keyframes = 5
+        config.initial_grid = np.random.randint(0, 2, (10, 12))
+        g = Grid2D(config, None)
+        timeline = g.new_timeline(
+            g.recorded_generations(config.num_generations))
+
+        class Progress(object):
+            def report(self, generation, total, rate):
+                pass
+
+            def cancelled(self):
+                return False
+
+        g._runca(config.num_generations, Progress(), timeline)
+        self.assertIsInstance(timeline, DeltaTimeline)
+        self.assertEqual(len(timeline), 13)
+        self.assertTrue(np.array_equal(timeline[-1], g.grid))
+
+#----------------------------------------------------------------------
+
+class TestPackedTimelineMeta(type):
+    def __new__(mcs, name, bases, dict):
+
+        def gen_test(states, dtype):
+            def test(self):
+                frames = np.random.choice(states, (7, 9, 11)).astype(dtype)
+                Timeline(frames, states, stride=3).save(self.path)
+                for mmap in [True, False]:
+                    loaded = load_timeline(self.path, mmap=mmap)
+                    self.assertIsInstance(loaded, PackedTimeline)
+                    self.assertEqual(loaded.states, list(states))
+                    self.assertEqual(loaded.stride, 3)
+                    self.assertEqual(loaded[0].dtype, dtype)
+                    self.assertTrue(np.array_equal(list(loaded), frames))
+                    self.assertTrue(np.array_equal(loaded.frame(4), frames[4]))
+                    self.assertTrue(np.array_equal(loaded[2::2][1], frames[4]))
+                # the frames take the fewest bits per cell
+                bits = max(1, (len(states) - 1).bit_length())
+                self.assertEqual(loaded.packed.shape, (7, -(-99 * bits // 8)))
+            return test
+
+        cases = [((0, 1), np.uint8), ((0, 1, 2), np.uint8),
+                 ((0, 1, 2, 3), np.int16), ((-1, 0.5, 2), np.float64),
+                 ((5, 3, 9, 1, 0), np.int64), (tuple(range(17)), np.uint8)]
+        for states, dtype in cases:
+            testname = "test_packed_{n}_{d}".format(
+                n=len(states), d=np.dtype(dtype).name)
+            dict[testname] = gen_test(states, dtype)
+        return type.__new__(mcs, name, bases, dict)
+
+
+class TestPackedTimeline(unittest.TestCase, metaclass=TestPackedTimelineMeta):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'timeline.tl')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_unknown_state(self):
+        # cells outside the states are saved unpacked
+        frames = np.zeros((2, 3, 3), dtype=np.uint8)
+        frames[1, 1, 1] = 7
+        Timeline(frames, (0, 1)).save(self.path)
+        loaded = load_timeline(self.path)
+        self.assertIsInstance(loaded, Timeline)
+        self.assertTrue(np.array_equal(loaded.frames, frames))
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+    unittest.main()
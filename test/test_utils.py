@@ -68,6 +68,25 @@ class TestIntToBinary(unittest.TestCase):
         case = 23.4
         self.assertTrue(np.array_equal(utils.int_to_binary(case),utils.int_to_binary(int(case))))
 
+class TestIntToDigits(unittest.TestCase):
+    def test_binary(self):
+        self.assertTrue(np.array_equal(utils.int_to_digits(6, 2, 4), [0,1,1,0]))
+
+    def test_base3(self):
+        self.assertTrue(np.array_equal(utils.int_to_digits(21, 3, 3), [0,1,2]))
+
+    def test_large(self):
+        n = 2**100 + 5
+        digits = utils.int_to_digits(n, 2, 101)
+        self.assertEqual(digits[0], 1)
+        self.assertEqual(digits[2], 1)
+        self.assertEqual(digits[100], 1)
+        self.assertEqual(np.sum(digits), 3)
+
+    def test_out_of_range(self):
+        self.assertRaises(ValueError, utils.int_to_digits, 16, 2, 4)
+        self.assertRaises(ValueError, utils.int_to_digits, -1, 2, 4)
+
 class TestScaleArray(unittest.TestCase):
     def test_scale_up(self):
         a = np.ones((10,10))
@@ -90,5 +109,21 @@ class TestScaleArray(unittest.TestCase):
         self.assertTrue(b.shape == toshape)
         self.assertTrue(np.array_equal(b, a[:b.shape[0], :b.shape[1]]))
 
+class TestStatesDtype(unittest.TestCase):
+    def test_binary(self):
+        self.assertEqual(utils.states_dtype((0, 1)), np.uint8)
+
+    def test_dead_wrap_state(self):
+        self.assertEqual(utils.states_dtype((0, 1, 2), -100), np.int8)
+
+    def test_wide(self):
+        self.assertEqual(utils.states_dtype((0, 300)), np.uint16)
+        self.assertEqual(utils.states_dtype((-1, 40000)), np.int32)
+
+    def test_non_integer(self):
+        self.assertEqual(utils.states_dtype((0, 0.5, 1)), np.float32)
+        self.assertEqual(utils.states_dtype((0, 1 + 2**-20)), np.float32)
+        self.assertEqual(utils.states_dtype((0, 0.1)), np.float64)
+
 if __name__ == '__main__':
     unittest.main()
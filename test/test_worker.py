@@ -0,0 +1,116 @@
+import sys, os, inspect, unittest, tempfile, shutil
+import numpy as np
+this_file_loc = (inspect.stack()[0][1])
+main_dir_loc = this_file_loc[:this_file_loc.index('test')]
+sys.path.append(main_dir_loc)
+sys.path.append(main_dir_loc + 'capyle')
+sys.path.append(main_dir_loc + 'capyle/ca')
+sys.path.append(main_dir_loc + 'capyle/guicomponents')
+
+from capyle.ca import CAConfig, Grid2D, RunProgress
+from capyle.runner import load_description
+from capyle.worker import DescriptionWorker
+import capyle.utils as utils
+
+#----------------------------------------------------------------------
+
+class TestDescriptionWorker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.worker = DescriptionWorker()
+        cls.worker.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.worker.stop()
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        # descriptions find capyle from the ca_descriptions directory
+        os.mkdir(os.path.join(self.dir, 'ca_descriptions'))
+        self.filepath = os.path.join(self.dir, 'ca_descriptions', 'gol.py')
+        with open("ca_descriptions/gol_2d.py") as f:
+            self.source = f.read()
+        self.write_description(self.source)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write_description(self, source, mtime=None):
+        # announces each import of the description
+        source = source.replace("import numpy as np\n",
+                                "import numpy as np\nprint('imported')\n")
+        with open(self.filepath, 'w') as f:
+            f.write(source)
+        if mtime is not None:
+            os.utime(self.filepath, ns=(mtime, mtime))
+
+    def make_config(self):
+        config = CAConfig(self.filepath)
+        for name in ('path', 'timeline_path', 'checkpoint_path',
+                     'last_run_path'):
+            path = getattr(config, name)
+            setattr(config, name, os.path.join(self.dir,
+                                               os.path.basename(path)))
+        return config
+
+    def execute(self, config, args):
+        config.save()
+        return self.worker.execute([self.filepath, config.path] + args)
+
+    def test_prerun(self):
+        config = utils.prerun_ca(self.make_config(), worker=self.worker)
+        self.assertEqual(config.title, "Conway's game of life")
+        self.assertEqual(config.states, (0, 1))
+        self.assertEqual(config.grid_dims, (200, 200))
+
+    def test_run(self):
+        config = utils.prerun_ca(self.make_config(), worker=self.worker)
+        config.grid_dims = 20, 20
+        config.num_generations = 12
+        config.initial_grid = np.random.randint(0, 2, (20, 20))
+        progress = RunProgress.create(os.path.join(self.dir, 'progress'))
+        config, timeline = utils.run_ca(config, worker=self.worker,
+                                        progress=progress)
+        self.assertEqual((progress.generation(), progress.total()), (12, 12))
+        self.assertEqual(len(timeline), 13)
+        description = load_description("ca_descriptions/gol_2d.py")
+        g = Grid2D(config, description.transition_func)
+        for i in range(12):
+            g.step()
+        self.assertTrue(np.array_equal(timeline[-1], g.grid))
+
+    def test_reload(self):
+        config = self.make_config()
+        mtime = os.stat(self.filepath).st_mtime_ns
+        self.execute(config, ['0'])
+        # not imported again while unchanged
+        out_str, _ = self.execute(config, ['0'])
+        self.assertNotIn('imported', out_str)
+        self.write_description(self.source.replace(
+            "Conway's game of life", "Changed"), mtime + 10**9)
+        out_str, errors_str = self.execute(config, ['0'])
+        self.assertIn('imported', out_str)
+        self.assertEqual(errors_str, '')
+        self.assertEqual(utils.load(config.path).title, "Changed")
+
+    def test_error(self):
+        self.write_description(self.source.replace(
+            "config.dimensions = 2", "config.dimensions = undefined"))
+        config = self.make_config()
+        self.assertIsNone(utils.prerun_ca(config, worker=self.worker))
+        # and the worker carries on
+        self.write_description(self.source,
+                               os.stat(self.filepath).st_mtime_ns + 10**9)
+        self.assertIsNotNone(utils.prerun_ca(config, worker=self.worker))
+
+    def test_restart(self):
+        self.worker.process.terminate()
+        self.worker.process.join()
+        config = utils.prerun_ca(self.make_config(), worker=self.worker)
+        self.assertEqual(config.states, (0, 1))
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+    unittest.main()